@@ -0,0 +1,145 @@
+"""
+The benchmark cases. Every case is a function without arguments that
+performs the measured operation once; get_cases() prepares them
+against the seeded database.
+
+The names of the cases are grouped by the measured stage:
+
+- ``parse.*``: QueryParser.parse(), through Searchable.dom_from_query()
+- ``compile.q.*``: rewriting a DOM and serializing it to a Q object
+- ``compile.sql.*``: rewriting a DOM and serializing it to SQL,
+  including the join planning
+- ``plan.*``: refs.get_object_vector_for(), without memoization
+- ``exec.*``: compiling and running a query against the database
+- ``page.*``: PaginatedRawQuerySet pagination and counting
+"""
+from django_find import refs
+from django_find.model_helpers import sql_from_dom
+from django_find.models import Searchable
+from django_find.rawquery import PaginatedRawQuerySet
+from django_find.rewrite import rewrite, model_resolver
+from django_find.serializers.django import DjangoSerializer
+from .graph.models import components, Wide, WIDE_FIELDS
+
+#: The number of terms of the queries in the query length cases.
+QUERY_LENGTHS = 1, 8, 64
+
+#: The number of aliases that a bare word is searched in.
+ALIAS_COUNTS = 1, 8, WIDE_FIELDS
+
+#: The exhaustive join strategy is exponential in the size of the graph,
+#: so it is only measured on the smaller ones.
+ALL_STRATEGY_MAX_SIZE = 16
+
+PAGE_SIZE = 50
+
+term_templates = ('name:{word}',
+                  'rating>{n}',
+                  'code={word}',
+                  'parent:{word}',
+                  'added<20{n:02d}-01-01',
+                  'link:^{word}',
+                  'not code:{word}$',
+                  'rating<={n}')
+
+def make_query(length):
+    """
+    Returns a query with the given number of terms, mixing operators,
+    field types, negations and parentheses.
+    """
+    terms = []
+    for i in range(length):
+        term = term_templates[i % len(term_templates)]
+        terms.append(term.format(word='ab'[i % 2]+str(i), n=i % 100))
+    groups = [' or '.join(terms[i:i+4]) for i in range(0, length, 4)]
+    if len(groups) == 1:
+        return groups[0]
+    return ' and '.join('('+g+')' for g in groups)
+
+def compile_q(model, dom):
+    return rewrite(dom, model_resolver(model)).serialize(DjangoSerializer(model))
+
+def _query_length_cases(model):
+    for length in QUERY_LENGTHS:
+        query = make_query(length)
+        dom = model.dom_from_query(query)
+        suffix = '.terms-{}'.format(length)
+        yield 'parse'+suffix, lambda q=query: model.dom_from_query(q)
+        yield 'compile.q'+suffix, lambda d=dom: compile_q(model, d)
+        yield 'compile.sql'+suffix, lambda d=dom: sql_from_dom(model, d)
+        yield 'exec.q'+suffix, lambda q=query: model.by_query(q).count()
+
+def _alias_count_cases():
+    query = 'ab cd'
+    for count in ALIAS_COUNTS:
+        aliases = ['f{}'.format(i) for i in range(count)]
+        dom = Wide.dom_from_query(query, aliases)
+        suffix = '.aliases-{}'.format(count)
+        yield 'parse'+suffix, lambda a=aliases: Wide.dom_from_query(query, a)
+        yield 'compile.q'+suffix, lambda d=dom: compile_q(Wide, d)
+        yield 'compile.sql'+suffix, lambda d=dom: sql_from_dom(Wide, d)
+        yield 'exec.q'+suffix, lambda a=aliases: Wide.by_query(query, a).count()
+
+def _plan(search_cls_list, strategy):
+    refs.clear_cache()
+    return refs.get_object_vector_for(search_cls_list[0],
+                                      search_cls_list,
+                                      Searchable,
+                                      strategy=strategy)
+
+def _graph_size_cases():
+    for size in sorted(components):
+        component = components[size]
+        # The first, the last, and a model from the middle of the chain.
+        targets = [component[0], component[-1], component[size//2+1]]
+        fullnames = [m.__name__+'.name' for m in targets]
+        suffix = '.graph-{}'.format(size)
+        yield 'plan.shortest'+suffix, lambda t=targets: _plan(t, 'shortest')
+        if size <= ALL_STRATEGY_MAX_SIZE:
+            yield 'plan.all'+suffix, lambda t=targets: _plan(t, 'all')
+
+        model = component[0]
+        query = 'name:a'
+        dom = model.dom_from_query(query)
+        yield 'compile.sql'+suffix, \
+            lambda m=model, d=dom, f=fullnames: sql_from_dom(m, d, fullnames=f)
+        yield 'exec.raw'+suffix, \
+            lambda m=model, f=fullnames: list(m.by_query_raw(query, fullnames=f)[0][:PAGE_SIZE])
+
+def _pagination_cases():
+    fullnames = ['Wide.f0', 'Wide.f1', 'Wide.f2']
+    sql, args, fields = Wide.sql_from_query('f0:a or f1:a', fullnames=fullnames)
+
+    # Every case uses a new query set, as query sets share the rows that
+    # they fetched.
+    def new():
+        return PaginatedRawQuerySet(Wide, sql, args)
+
+    total = new().get_count()
+    key = new().get_columns()
+    depths = ('start', 0), ('10pct', total//10), ('90pct', total*9//10)
+    for name, offset in depths:
+        yield 'page.offset.'+name, \
+            lambda o=offset: list(new()[o:o+PAGE_SIZE])
+
+        cursor = None
+        if offset:
+            cursor = new().seek(key=key)[offset-1:offset].next_cursor
+        yield 'page.seek.'+name, \
+            lambda c=cursor: list(new().seek(c, key=key)[:PAGE_SIZE])
+
+    for strategy in ('exact', 'capped', 'estimate'):
+        yield 'page.count.'+strategy, \
+            lambda s=strategy: new().get_count(strategy=s)
+    yield 'page.iterator', lambda: sum(1 for row in new().iterator())
+
+def get_cases():
+    """
+    Returns a list of (name, func) tuples. The database must be seeded.
+    """
+    cases = []
+    cases += _query_length_cases(components[16][15])
+    cases += _alias_count_cases()
+    cases += _graph_size_cases()
+    cases += _pagination_cases()
+    return cases
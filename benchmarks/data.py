@@ -0,0 +1,81 @@
+"""
+Creates the tables of the benchmark models and fills them with
+reproducible, random data.
+"""
+import datetime
+import random
+from django.apps import apps
+from django.db import connection
+from .graph.models import components, Wide, WIDE_FIELDS
+
+letters = 'abcdefghijklmnopqrstuvwxyz'
+
+def create_tables():
+    app = apps.get_app_config('bench_graph')
+    with connection.schema_editor() as editor:
+        for model in app.get_models():
+            editor.create_model(model)
+
+def _make_words(rng, count):
+    words = set()
+    while len(words) < count:
+        length = rng.randint(2, 6)
+        words.add(''.join(rng.choice(letters) for i in range(length)))
+    return sorted(words)
+
+def _seed_component(rng, words, component, rows):
+    start = datetime.date(2000, 1, 1)
+    previous = None
+    pks = {}
+    for i, model in enumerate(component):
+        objs = []
+        for n in range(rows):
+            obj = model(name=rng.choice(words)+str(n),
+                        code=rng.choice(words),
+                        rating=rng.randint(0, 100),
+                        added=start+datetime.timedelta(days=rng.randint(0, 9000)))
+            if previous is not None:
+                obj.parent_id = rng.choice(pks[previous])
+            if i >= 3 and i % 3 == 0 and rng.random() < .8:
+                obj.link_id = rng.choice(pks[component[i//2]])
+            objs.append(obj)
+        model.objects.bulk_create(objs)
+        pks[model] = list(model.objects.values_list('pk', flat=True))
+        previous = model
+
+    # The foreign keys and relations that point forward can only be set
+    # once all models have rows.
+    first, last = component[0], component[-1]
+    objs = list(first.objects.order_by('pk'))
+    for obj in objs:
+        if rng.random() < .8:
+            obj.last_id = rng.choice(pks[last])
+    first.objects.bulk_update(objs, ['last'])
+    for i, model in enumerate(component):
+        if i % 4 != 2:
+            continue
+        field = model._meta.get_field('peers')
+        through = field.remote_field.through
+        source = field.m2m_field_name()+'_id'
+        target = field.m2m_reverse_field_name()+'_id'
+        links = set()
+        for pk in pks[model]:
+            for n in range(rng.randint(0, 3)):
+                links.add((pk, rng.choice(pks[component[i-2]])))
+        through.objects.bulk_create([through(**{source: s, target: t})
+                                     for s, t in sorted(links)])
+
+def seed(rows=20000, graph_rows=200, seed=0):
+    """
+    Fills every model of the graph with graph_rows rows, and the Wide
+    model with the given number of rows. The same seed always produces
+    the same data.
+    """
+    rng = random.Random(seed)
+    words = _make_words(rng, 500)
+    for size in sorted(components):
+        _seed_component(rng, words, components[size], graph_rows)
+    fields = ['f{}'.format(i) for i in range(WIDE_FIELDS)]
+    objs = [Wide(**dict((f, rng.choice(words)) for f in fields))
+            for n in range(rows)]
+    Wide.objects.bulk_create(objs, batch_size=500)
@@ -0,0 +1,55 @@
+"""
+Measures the memory used by parsed query DOMs.
+
+Usage (from the top level directory of the repository)::
+
+    python benchmarks/dom_memory.py [--queries 10000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+import django
+django.setup()
+
+from django_find.parsers.query import QueryParser
+
+fields = {'host': 'Device.hostname',
+          'model': 'Device.model',
+          'address': 'Device.address',
+          'interface': 'Unit.interface'}
+default = ('host', 'model')
+
+def make_query(i):
+    return 'host:^router{0} and (model:"c{0}" or interface:ge{0}$) ' \
+           'and not address:10.0.{0} foo{0}'.format(i % 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--queries', type=int, default=10000,
+                        help='number of DOMs to keep in memory')
+    args = parser.parse_args()
+
+    queries = [make_query(i) for i in range(args.queries)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    doms = [QueryParser(fields, default).parse(q) for q in queries]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    nodes = sum(1 for dom in doms for node in dom.walk())
+    size = after-before
+    print('DOMs:           {}'.format(len(doms)))
+    print('Nodes:          {}'.format(nodes))
+    print('Total memory:   {:.1f} KiB'.format(size/1024.0))
+    print('Bytes per node: {:.1f}'.format(size/float(nodes)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+from django.apps import AppConfig
+
+class BenchmarkGraphConfig(AppConfig):
+    name = 'benchmarks.graph'
+    label = 'bench_graph'
@@ -0,0 +1,74 @@
+"""
+A synthetic graph of Searchable models for the benchmarks.
+
+There is one connected component for each of the sizes in
+GRAPH_SIZES, so that join planning can be measured against graphs of
+different sizes. The models of the component of size n are named
+S<n>M0 to S<n>M<n-1>. In every component:
+
+- each model has a foreign key ``parent`` to the model before it,
+- every third model has a nullable foreign key ``link`` to the model
+  at half its position, so there is more than one path between most
+  models,
+- the first model has a nullable foreign key ``last`` to the last
+  model, closing the chain into a cycle,
+- every fourth model (starting at the third) has a many-to-many
+  relation ``peers`` to the model two positions before it.
+
+Wide is a single model with WIDE_FIELDS text fields, for measuring
+queries over many aliases.
+"""
+from django.db import models
+from django_find import Searchable
+
+GRAPH_SIZES = 8, 16, 32
+WIDE_FIELDS = 32
+
+def _make_model(name, attrs):
+    attrs['__module__'] = __name__
+    attrs['Meta'] = type('Meta', (), {'app_label': 'bench_graph'})
+    model = type(name, (models.Model, Searchable), attrs)
+    globals()[name] = model
+    return model
+
+def _make_component(size):
+    names = ['S{}M{}'.format(size, i) for i in range(size)]
+    component = []
+    for i, name in enumerate(names):
+        attrs = {'name': models.CharField(max_length=32),
+                 'code': models.CharField(max_length=16),
+                 'rating': models.IntegerField(),
+                 'added': models.DateField()}
+        searchable = [('name', 'name'),
+                      ('code', 'code'),
+                      ('rating', 'rating'),
+                      ('added', 'added')]
+        if i > 0:
+            attrs['parent'] = models.ForeignKey(names[i-1],
+                                                related_name='children',
+                                                on_delete=models.CASCADE)
+            searchable.append(('parent', 'parent__name'))
+        if i >= 3 and i % 3 == 0:
+            attrs['link'] = models.ForeignKey(names[i//2],
+                                              null=True,
+                                              related_name='links',
+                                              on_delete=models.SET_NULL)
+            searchable.append(('link', 'link__name'))
+        if i == 0:
+            attrs['last'] = models.ForeignKey(names[-1],
+                                              null=True,
+                                              related_name='first',
+                                              on_delete=models.SET_NULL)
+            searchable.append(('last', 'last__name'))
+        if i % 4 == 2:
+            attrs['peers'] = models.ManyToManyField(names[i-2],
+                                                    related_name='peers_of')
+            searchable.append(('peers', 'peers__name'))
+        attrs['searchable'] = searchable
+        component.append(_make_model(name, attrs))
+    return component
+
+components = dict((size, _make_component(size)) for size in GRAPH_SIZES)
+
+Wide = _make_model('Wide', dict(('f{}'.format(i), models.CharField(max_length=16))
+                                for i in range(WIDE_FIELDS)))
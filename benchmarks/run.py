@@ -0,0 +1,160 @@
+"""
+Runs the benchmarks and compares the results to a baseline.
+
+Usage (from the top level directory of the repository)::
+
+    python benchmarks/run.py [--filter REGEX] [--save FILE] [--compare FILE]
+
+The benchmarks run against a synthetic graph of Searchable models
+(see benchmarks/graph/models.py) in an in-memory SQLite database that
+is seeded with reproducible data. Each case is repeated --repeat
+times, with enough calls per repetition to run for at least
+--min-time seconds. The time per call of the fastest repetition is
+reported, as it is the least affected by other load on the machine.
+
+--save stores the results as a JSON baseline. --compare prints the
+change relative to a baseline, and exits with status 1 if any case
+got slower by more than --threshold. Baselines are only comparable
+when taken on the same machine with the same --rows and --seed.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+django.setup()
+
+from benchmarks import data
+from benchmarks.cases import get_cases
+
+def _time(func, loops):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for i in range(loops):
+            func()
+        return time.perf_counter()-start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def measure(func, repeat, min_time):
+    """
+    Returns a dict with the minimum and the median time per call of func,
+    in seconds, and the number of calls per repetition.
+    """
+    func() # Warm up.
+    loops = 1
+    elapsed = _time(func, loops)
+    while elapsed < min_time:
+        loops = max(loops*2, int(loops*min_time/max(elapsed, 1e-9)))
+        elapsed = _time(func, loops)
+    times = [elapsed/loops]
+    times += [_time(func, loops)/loops for i in range(repeat-1)]
+    times.sort()
+    return {'median': times[len(times)//2],
+            'min': times[0],
+            'loops': loops}
+
+def format_time(seconds):
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds*factor >= 1:
+            return '{:.3g} {}'.format(seconds*factor, unit)
+    return '{:.3g} ns'.format(seconds*1e9)
+
+def report(results, baseline=None, threshold=.1):
+    """
+    Prints the results, and their change relative to the baseline.
+    Returns the names of the cases that got slower by more than the
+    threshold.
+    """
+    slower = []
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = '{:<{width}}  {:>10}'.format(name, format_time(result['min']), width=width)
+        old = baseline.get(name) if baseline else None
+        if old is not None:
+            change = result['min']/old['min']-1
+            line += '  {:>10}  {:+7.1%}'.format(format_time(old['min']), change)
+            if change > threshold:
+                line += '  slower'
+                slower.append(name)
+            elif change < -threshold:
+                line += '  faster'
+        print(line)
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--filter', metavar='REGEX',
+                        help='only run the cases whose name matches')
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='number of rows of the pagination table')
+    parser.add_argument('--graph-rows', type=int, default=200,
+                        help='number of rows of every model of the graph')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generated data')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of repetitions of every case')
+    parser.add_argument('--min-time', type=float, default=.1,
+                        help='minimum duration of a repetition in seconds')
+    parser.add_argument('--save', metavar='FILE',
+                        help='store the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results to a baseline')
+    parser.add_argument('--threshold', type=float, default=.1,
+                        help='relative change that is reported (default: 0.1)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            stored = json.load(fp)
+        baseline = stored['results']
+        meta = stored['meta']
+        if (meta['rows'], meta['graph_rows'], meta['seed']) \
+                != (args.rows, args.graph_rows, args.seed):
+            parser.error('the baseline was taken with different data')
+
+    data.create_tables()
+    data.seed(rows=args.rows, graph_rows=args.graph_rows, seed=args.seed)
+
+    results = {}
+    for name, func in get_cases():
+        if args.filter and not re.search(args.filter, name):
+            continue
+        results[name] = measure(func, args.repeat, args.min_time)
+    if not results:
+        parser.error('no case matches the filter')
+
+    slower = report(results, baseline, args.threshold)
+
+    if args.save:
+        meta = {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'rows': args.rows,
+                'graph_rows': args.graph_rows,
+                'seed': args.seed}
+        with open(args.save, 'w') as fp:
+            json.dump({'meta': meta, 'results': results}, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+
+    if slower:
+        print('\n{} case(s) slower than the baseline: {}'.format(len(slower), ', '.join(slower)))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
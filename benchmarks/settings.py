@@ -0,0 +1,30 @@
+"""
+Django settings for the benchmarks. The database is an in-memory SQLite
+database that is created and seeded by the benchmark runner.
+"""
+SECRET_KEY = 'django_find_benchmarks'
+DEBUG = False
+
+INSTALLED_APPS = [
+    'django_find',
+    'benchmarks.graph',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'UTC'
+USE_I18N = True
+USE_TZ = True
+
+# Compiled queries are cached by default. The benchmarks measure the
+# work that the caches save, so they are disabled.
+DJANGO_FIND = {
+    'QUERY_CACHE_SIZE': 0,
+    'SQL_CACHE_SIZE': 0,
+}
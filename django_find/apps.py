@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class DjangoFindConfig(AppConfig):
     name = 'django_find'
     verbose_name = "Django Find"
+
+    def ready(self):
+        from .models import searchable_models
+        searchable_models.populate()
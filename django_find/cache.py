@@ -0,0 +1,99 @@
+"""
+Size- and time-bounded caches for compiled queries.
+"""
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .conf import get_setting
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+_missing = object()
+
+class LRUCache(object):
+    """
+    A thread safe, least-recently-used cache. Entries older than ttl
+    seconds are treated as missing; a ttl of None disables expiry. A
+    maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.data = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key, default=None, count=True):
+        """
+        Returns the value of the given key, or default if it is missing.
+        If count is False, the lookup is not counted as a hit or miss.
+        """
+        with self.lock:
+            entry = self.data.get(key, _missing)
+            if entry is not _missing:
+                expires, value = entry
+                if expires is None or expires > time.monotonic():
+                    self.data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+                del self.data[key]
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        expires = None if self.ttl is None else time.monotonic()+self.ttl
+        with self.lock:
+            self.data[key] = expires, value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """
+        Returns a CacheInfo with the hit and miss counters, like
+        functools.lru_cache().
+        """
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self.data))
+
+_caches = {}
+
+def get_cache(name):
+    """
+    Returns the cache with the given name, e.g. ``'QUERY'``. Its size and
+    TTL are taken from the ``<name>_CACHE_SIZE`` and ``<name>_CACHE_TTL``
+    settings.
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = LRUCache(get_setting(name+'_CACHE_SIZE'),
+                                         get_setting(name+'_CACHE_TTL'))
+    return cache
+
+def clear_caches():
+    """
+    Empties all caches.
+    """
+    for cache in list(_caches.values()):
+        cache.clear()
+
+@receiver(setting_changed)
+def _on_setting_changed(sender, setting, **kwargs):
+    if setting == 'DJANGO_FIND':
+        _caches.clear()
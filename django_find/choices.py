@@ -0,0 +1,61 @@
+"""
+Lookup index for searching the choices of a field by code or label.
+"""
+from builtins import str
+
+class ChoiceIndex(object):
+    """
+    Finds the choices of a field whose code or label matches a search
+    string, ignoring the case. The codes and labels are lowercased once,
+    exact matches are looked up in a map, and substring matches are
+    narrowed down using an index of the trigrams (three character
+    sequences) that the codes and labels contain.
+
+    Matches are returned in the order of the choices.
+    """
+
+    def __init__(self, choices):
+        self.codes = []
+        self.texts = []
+        self.exact = {}
+        self.trigrams = {}
+        for index, (code, label) in enumerate(choices):
+            code = str(code)
+            self.codes.append(code)
+            texts = code.lower(), str(label).lower()
+            self.texts.append(texts)
+            for text in set(texts):
+                self.exact.setdefault(text, []).append(index)
+                for start in range(len(text)-2):
+                    self.trigrams.setdefault(text[start:start+3], set()).add(index)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _candidates(self, needle):
+        # Returns the indexes of all choices that contain every trigram
+        # of the needle.
+        if len(needle) < 3:
+            return range(len(self.codes))
+        postings = []
+        for start in range(len(needle)-2):
+            posting = self.trigrams.get(needle[start:start+3])
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        return sorted(postings[0].intersection(*postings[1:]))
+
+    def find(self, needle, exact=False):
+        """
+        Returns the codes of all choices whose code or label is equal to
+        (if exact is True) or contains the given string, ignoring the case.
+        """
+        needle = needle.lower()
+        if exact:
+            indexes = self.exact.get(needle, ())
+        else:
+            texts = self.texts
+            indexes = [i for i in self._candidates(needle)
+                       if needle in texts[i][0] or needle in texts[i][1]]
+        return [self.codes[i] for i in indexes]
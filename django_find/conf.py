@@ -0,0 +1,61 @@
+"""
+Settings of django-find.
+
+All settings are optional and live in a dictionary in your Django
+settings, e.g.::
+
+    DJANGO_FIND = {
+        'QUERY_CACHE_SIZE': 1000,
+    }
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Compiled Q objects of Searchable.q_from_query(), keyed by model,
+    # query string and aliases. Queries on date fields are not cached. A
+    # size of 0 disables the cache; a TTL of None keeps entries until
+    # they are evicted.
+    'QUERY_CACHE_SIZE': 256,
+    'QUERY_CACHE_TTL': 60,
+
+    # The SELECT/FROM/JOIN part of the statements created by the
+    # SQLSerializer, keyed by the selected columns.
+    'SQL_CACHE_SIZE': 256,
+    'SQL_CACHE_TTL': None,
+
+    # Formats (for datetime.strptime()) that dates in queries are parsed
+    # with before falling back to dateparser. ISO 8601 is always
+    # supported.
+    'DATE_FORMATS': (),
+
+    # The settings passed to dateparser. None uses dateparser's defaults,
+    # which accept incomplete dates such as "2018".
+    'DATEPARSER_SETTINGS': None,
+
+    # Dates parsed by dateparser, keyed by the string. The TTL limits how
+    # long relative dates such as "yesterday" are reused.
+    'DATE_CACHE_SIZE': 1024,
+    'DATE_CACHE_TTL': 60,
+
+    # Limits on the complexity of a query, checked before it is run. A
+    # query that exceeds one raises exceptions.QueryTooComplex. None
+    # disables the limit.
+    'MAX_TERMS': None,
+    'MAX_DEPTH': None,
+    'MAX_JOINS': None,
+    'MAX_ALIAS_FANOUT': None,
+
+    # The number of seconds after which the database aborts a query,
+    # raising exceptions.QueryTimeout. None disables the timeout.
+    'STATEMENT_TIMEOUT': None,
+
+    # The PostgreSQL text search configuration of the full-text search
+    # (see Searchable.searchable_fulltext).
+    'FULLTEXT_CONFIG': 'simple',
+}
+
+def get_setting(name):
+    """
+    Returns the value of the given django-find setting.
+    """
+    return getattr(settings, 'DJANGO_FIND', {}).get(name, DEFAULTS[name])
@@ -1,4 +1,6 @@
 from builtins import str
+from hashlib import sha1
+from sys import intern
 from .tree import Node
 
 operators = [
@@ -11,10 +13,98 @@ operators = [
     'gte',
     'lt',
     'lte',
-    'any'
+    'any',
+    'in',
+    'between',
+    'search'
 ]
 
-class Group(Node):
+# Operators whose data is a tuple of values: 'in' matches any of the
+# values exactly, 'between' matches the range (low, high), inclusively.
+multi_value_operators = 'in', 'between'
+
+def _digest(*parts):
+    return sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def canonicalize(dom):
+    """
+    Returns a copy of the given DOM in canonical form, and a hash of it.
+
+    In the canonical form, nested groups of the same kind are flattened,
+    the children of And, Or, Not and the root group are sorted and
+    deduplicated, Group and And are the same, Not(Not(x)) is replaced by
+    x, and empty groups and groups with a single child are removed. Two
+    DOMs with the same canonical form match the same rows.
+    """
+    digests = {}
+
+    def visit(node, children):
+        if isinstance(node, Term):
+            canon = Term(node.name, node.operator, node.data)
+            data = canon.data if isinstance(canon.data, tuple) else (canon.data,)
+            digests[id(canon)] = _digest('Term', canon.name, canon.operator, *data)
+            return canon
+
+        # The children of Group, And and Not are all joined using AND.
+        cls = Or if isinstance(node, Or) else Not if isinstance(node, Not) else And
+        flatten = Or if cls is Or else And
+        members = {}
+        for child in children:
+            if child is None:
+                continue
+            for member in child.children if type(child) is flatten else (child,):
+                members[digests[id(member)]] = member
+        keys = sorted(members)
+        children = [members[key] for key in keys]
+
+        if node.is_root:
+            canon = Group(children, is_root=True)
+        elif not children:
+            return None
+        elif cls is Not and len(children) == 1 and type(children[0]) is Not:
+            children = children[0].children
+            if len(children) == 1:
+                return children[0]
+            keys = [digests[id(child)] for child in children]
+            canon = And(children)
+        elif len(children) == 1 and cls is not Not:
+            return children[0]
+        else:
+            canon = cls(children)
+        canon.children = tuple(canon.children)
+        digests[id(canon)] = _digest(type(canon).__name__, str(canon.is_root), *keys)
+        return canon
+
+    canon = dom.accept(visit)
+    if canon is None:
+        return None, _digest('None')
+    return canon, digests[id(canon)]
+
+class Canonical(object):
+    """
+    Provides the canonical form of DOM nodes, see canonicalize(). As the
+    nodes are modified in place, they are compared by identity; compare
+    their fingerprints to find out whether they match the same rows.
+    """
+    __slots__ = ()
+
+    def canonical(self):
+        """
+        Returns a copy of this node in canonical form, or None if it
+        is an empty group.
+        """
+        return canonicalize(self)[0]
+
+    def fingerprint(self):
+        """
+        Returns a stable hash of the canonical form of this node, as a
+        string of hex digits. It is the same in every process.
+        """
+        return canonicalize(self)[1]
+
+class Group(Canonical, Node):
+    __slots__ = ()
+
     def translate_term_names(self, name_map):
         def translate(dom_obj):
             dom_obj.name = name_map.get(dom_obj.name, dom_obj.name)
@@ -26,39 +116,40 @@ class Group(Node):
         the order in which they appear. Filters duplicates.
         """
         field_names = []
-        def collect_field_names(dom_obj):
-            if not dom_obj.name in field_names:
-                field_names.append(dom_obj.name)
-        self.each(collect_field_names, Term)
+        seen = set()
+        for term in self.walk(Term):
+            if term.name not in seen:
+                seen.add(term.name)
+                field_names.append(term.name)
         return field_names
 
     def auto_leave_scope(self):
         return False
 
-    def optimize(self):
-        children = [c.optimize() for c in self.children]
-        self.children = [c for c in children if c is not None]
-        children = []
-        for child in self.children:
+    def optimize_node(self, children):
+        flat = []
+        for child in children:
+            if child is None:
+                continue
             if type(child) == type(self):
-                for grandchild in child.children:
-                    children.append(grandchild)
+                flat.extend(child.children)
             else:
-                children.append(child)
-        self.children = children
+                flat.append(child)
+        self.children = tuple(flat)
         if not self.children and not self.is_root:
             return None
         if len(self.children) == 1 and not self.is_root:
             return self.children[0]
         return self
 
-    def serialize(self, strategy):
-        results = [c.serialize(strategy) for c in self.children]
+    def serialize_node(self, strategy, results):
         if self.is_root:
             return strategy.logical_root_group(self, results)
         return strategy.logical_group(results)
 
 class And(Group):
+    __slots__ = ()
+
     @classmethod
     def is_logical(self):
         return True
@@ -67,11 +158,12 @@ class And(Group):
     def precedence(self):
         return 2
 
-    def serialize(self, strategy):
-        return strategy.logical_and(c.serialize(strategy)
-                                    for c in self.children)
+    def serialize_node(self, strategy, results):
+        return strategy.logical_and(results)
 
 class Or(Group):
+    __slots__ = ()
+
     @classmethod
     def is_logical(self):
         return True
@@ -80,11 +172,12 @@ class Or(Group):
     def precedence(self):
         return 1
 
-    def serialize(self, strategy):
-        return strategy.logical_or(c.serialize(strategy)
-                                   for c in self.children)
+    def serialize_node(self, strategy, results):
+        return strategy.logical_or(results)
 
 class Not(Group):
+    __slots__ = ()
+
     @classmethod
     def precedence(self):
         return 3
@@ -92,36 +185,35 @@ class Not(Group):
     def auto_leave_scope(self):
         return True
 
-    def optimize(self):
-        children = [c.optimize() for c in self.children]
-        self.children = [c for c in children if c is not None]
+    def optimize_node(self, children):
+        self.children = tuple(c for c in children if c is not None)
         if not self.children and not self.is_root:
             return None
         return self
 
-    def serialize(self, strategy):
-        children = [c.serialize(strategy) for c in self.children]
-        return strategy.logical_not(children)
+    def serialize_node(self, strategy, results):
+        return strategy.logical_not(results)
+
+class Term(Canonical, Node):
+    __slots__ = ('name', 'operator', 'data')
 
-class Term(Node):
     def __init__(self, name, operator, data):
         assert operator in operators, "unsupported operator {}".format(operator)
-        Node.__init__(self)
-        self.name = name
-        self.operator = str(operator)
-        self.data = str(data)
-
-    def optimize(self):
+        self.is_root = False
+        self.children = ()
+        self.name = intern(name)
+        self.operator = intern(str(operator))
+        if operator in multi_value_operators:
+            self.data = tuple(d if type(d) is str else str(d) for d in data)
+        else:
+            self.data = data if type(data) is str else str(data)
+
+    def optimize_node(self, children):
         return self
 
-    def each(self, func, node_type):
-        if node_type is None or isinstance(self, node_type):
-            func(self)
-
-    def dump(self, indent=0):
-        return [(indent * '  ')
-                + self.__class__.__name__ + ': '
-                + self.name + ' ' + self.operator + ' ' + repr(self.data)]
+    def dump_line(self):
+        return self.__class__.__name__ + ': ' \
+             + self.name + ' ' + self.operator + ' ' + repr(self.data)
 
-    def serialize(self, strategy):
+    def serialize_node(self, strategy, results):
         return strategy.term(self.name, self.operator, self.data)
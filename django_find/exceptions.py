@@ -0,0 +1,19 @@
+"""
+Exceptions raised when a search is rejected or aborted.
+"""
+from django.core.exceptions import SuspiciousOperation
+from django.db import OperationalError
+
+class QueryTooComplex(SuspiciousOperation):
+    """
+    Raised before a query is run when it exceeds one of the complexity
+    limits (see the ``MAX_*`` settings). As a SuspiciousOperation, it
+    is turned into a "400 Bad Request" response when it is not handled
+    by the view.
+    """
+
+class QueryTimeout(OperationalError):
+    """
+    Raised when a query is aborted by the database because it ran
+    longer than the ``STATEMENT_TIMEOUT`` setting.
+    """
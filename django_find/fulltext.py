@@ -0,0 +1,186 @@
+"""
+Full-text search for the aliases listed in ``searchable_fulltext``.
+
+Words without a field name are compiled into 'search' terms for these
+aliases, which match whole words using the native full-text search of
+the database:
+
+- On PostgreSQL, ``to_tsvector(config, column) @@
+  plainto_tsquery(config, word)``, which is served by a GIN index on
+  the same expression.
+- On SQLite, a lookup in an FTS5 table that mirrors the columns of the
+  model's table.
+- Other databases fall back to a case-insensitive substring match.
+
+The indexes and FTS5 tables are created by the ``find_fulltext``
+management command.
+"""
+import re
+from django.db import models
+from django.db.backends.utils import truncate_name
+from django.db.models import Lookup
+from django.db.models.expressions import Col
+from django.db.models.lookups import IContains
+from .conf import get_setting
+
+#: The field types that support the 'search' operator.
+fulltext_types = 'STR', 'LCSTR'
+
+#: The model fields that support the 'search' operator.
+fulltext_field_types = models.CharField, models.TextField
+
+def get_config():
+    """
+    Returns the PostgreSQL text search configuration (the
+    ``FULLTEXT_CONFIG`` setting).
+    """
+    config = get_setting('FULLTEXT_CONFIG')
+    if not re.match(r'^[\w.]+$', config):
+        raise ValueError('invalid FULLTEXT_CONFIG: {!r}'.format(config))
+    return config
+
+def fts_table(db_table):
+    """
+    Returns the name of the SQLite FTS5 table of the given table.
+    """
+    return db_table+'_fts'
+
+def search_condition(vendor, column, pk, db_table, column_name, quote=lambda n: n):
+    """
+    Returns an SQL condition with one placeholder (for the value returned
+    by search_value()) that matches the rows whose column contains the
+    searched words, or None if the database has no full-text search.
+
+    column and pk are the SQL expressions of the searched column and of
+    the primary key of its table; db_table and column_name are their
+    names, as used by the indexes.
+    """
+    if vendor == 'postgresql':
+        config = "'{}'::regconfig".format(get_config())
+        return 'to_tsvector({0}, {1}) @@ plainto_tsquery({0}, %s)'.format(config, column)
+    if vendor == 'sqlite':
+        fts = quote(fts_table(db_table))
+        return '{} IN (SELECT rowid FROM {} WHERE {}.{} MATCH %s)'.format(
+            pk, fts, fts, quote(column_name))
+    return None
+
+def search_value(vendor, data):
+    """
+    Returns the argument for the placeholder of search_condition().
+    """
+    if vendor == 'sqlite':
+        # Searched as a phrase, so that FTS5 query syntax in the word is
+        # not interpreted.
+        return '"'+data.replace('"', '""')+'"'
+    return data
+
+class FullTextSearch(Lookup):
+    """
+    The ``find_search`` lookup of text fields, used by the DjangoSerializer
+    for 'search' terms.
+    """
+    lookup_name = 'find_search'
+
+    def as_sql(self, compiler, connection):
+        vendor = connection.vendor
+        if not isinstance(self.lhs, Col) \
+                or not isinstance(self.lhs.target, fulltext_field_types):
+            condition = None
+        else:
+            lhs, lhs_params = self.process_lhs(compiler, connection)
+            model = self.lhs.target.model
+            quote = connection.ops.quote_name
+            pk = compiler.quote_name_unless_alias(self.lhs.alias)+'.'+quote(model._meta.pk.column)
+            condition = search_condition(vendor,
+                                         lhs,
+                                         pk,
+                                         model._meta.db_table,
+                                         self.lhs.target.column,
+                                         quote)
+        if condition is None:
+            return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+        if vendor != 'postgresql':
+            lhs_params = []
+        return condition, list(lhs_params)+[search_value(vendor, self.rhs)]
+
+# Registered on all fields, as field handlers may treat other fields as
+# text. Fields that are not CharFields or TextFields use the fallback.
+models.Field.register_lookup(FullTextSearch)
+
+def get_fulltext_columns(model_list):
+    """
+    Returns a dict that maps each table to the model of the table, and a
+    list of the columns that are searched in full text by the given
+    Searchable models.
+    """
+    result = {}
+    for model in model_list:
+        schema = model.get_schema()
+        for alias in schema.aliases:
+            if alias not in schema.fulltext:
+                continue
+            target_model, field = model.get_field_from_selector(schema.selectors[alias])
+            table = target_model._meta.db_table
+            columns = result.setdefault(table, (target_model, []))[1]
+            if field.column not in columns:
+                columns.append(field.column)
+    return result
+
+def _index_name(connection, table, column):
+    name = '{}_{}_fts'.format(table, column)
+    return truncate_name(name, connection.ops.max_name_length())
+
+def _postgresql_statements(connection, table, columns, drop):
+    quote = connection.ops.quote_name
+    config = "'{}'::regconfig".format(get_config())
+    for column in columns:
+        name = quote(_index_name(connection, table, column))
+        if drop:
+            yield 'DROP INDEX IF EXISTS {}'.format(name)
+            continue
+        yield 'CREATE INDEX IF NOT EXISTS {} ON {} USING gin (to_tsvector({}, {}))'.format(
+            name, quote(table), config, quote(column))
+
+def _sqlite_statements(connection, model, table, columns, drop):
+    # An external content FTS5 table, kept in sync with the table by
+    # triggers. It is always recreated, as the columns may have changed.
+    quote = connection.ops.quote_name
+    fts = fts_table(table)
+    names = ', '.join(quote(c) for c in columns)
+    pk = quote(model._meta.pk.column)
+
+    def values(row):
+        return ', '.join([row+'.'+pk]+[row+'.'+quote(c) for c in columns])
+
+    for suffix in ('_ai', '_ad', '_au'):
+        yield 'DROP TRIGGER IF EXISTS {}'.format(quote(fts+suffix))
+    yield 'DROP TABLE IF EXISTS {}'.format(quote(fts))
+    if drop:
+        return
+    yield 'CREATE VIRTUAL TABLE {} USING fts5({}, content={}, content_rowid={})'.format(
+        quote(fts), names, quote(table), quote(model._meta.pk.column))
+    insert = 'INSERT INTO {}(rowid, {}) VALUES ({});'.format(
+        quote(fts), names, values('new'))
+    delete = 'INSERT INTO {0}({0}, rowid, {1}) VALUES (\'delete\', {2});'.format(
+        quote(fts), names, values('old'))
+    yield 'CREATE TRIGGER {} AFTER INSERT ON {} BEGIN {} END'.format(
+        quote(fts+'_ai'), quote(table), insert)
+    yield 'CREATE TRIGGER {} AFTER DELETE ON {} BEGIN {} END'.format(
+        quote(fts+'_ad'), quote(table), delete)
+    yield 'CREATE TRIGGER {} AFTER UPDATE ON {} BEGIN {} {} END'.format(
+        quote(fts+'_au'), quote(table), delete, insert)
+    yield "INSERT INTO {0}({0}) VALUES ('rebuild')".format(quote(fts))
+
+def get_index_statements(connection, model_list, drop=False):
+    """
+    Returns the SQL statements that create (or, if drop is True, remove)
+    the full-text indexes of the given Searchable models on the given
+    database connection.
+    """
+    statements = []
+    for table, (model, columns) in sorted(get_fulltext_columns(model_list).items()):
+        if connection.vendor == 'postgresql':
+            statements += _postgresql_statements(connection, table, columns, drop)
+        elif connection.vendor == 'sqlite':
+            statements += _sqlite_statements(connection, model, table, columns, drop)
+    return statements
@@ -11,68 +11,160 @@ class FieldHandler(object):
     model field, or if your query contains information that
     requires client-side processing before being passed to
     the database.
+
+    By default, a handler handles all fields that are instances of one
+    of the classes in field_types. Handlers that need to look at the
+    model or the field itself may override handles() instead.
     """
     db_type = None
+    field_types = ()
 
     @classmethod
     def handles(cls, model, field):
-        raise NotImplemented
+        return isinstance(field, cls.field_types)
 
     @classmethod
     def prepare(cls, value):
         return value
 
+    @classmethod
+    def handles_by_type(cls):
+        """
+        Returns True if handles() depends on the type of the field only,
+        i.e. if it is not overridden.
+        """
+        return getattr(cls.handles, '__func__', None) is FieldHandler.handles.__func__
+
 class StrFieldHandler(FieldHandler):
     db_type = 'STR'
-
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, (models.CharField, models.TextField))
+    field_types = models.CharField, models.TextField
 
 class LowerCaseStrFieldHandler(StrFieldHandler):
     db_type = 'LCSTR'
 
 class IPAddressFieldHandler(LowerCaseStrFieldHandler):
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, models.GenericIPAddressField)
+    field_types = models.GenericIPAddressField,
 
 class BooleanFieldHandler(FieldHandler):
     db_type = 'BOOL'
-
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, models.BooleanField)
+    field_types = models.BooleanField,
 
 class IntegerFieldHandler(FieldHandler):
     db_type = 'INT'
-
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, (models.IntegerField, models.AutoField))
+    field_types = models.IntegerField, models.AutoField
 
 class DateFieldHandler(FieldHandler):
     db_type = 'DATE'
-
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, models.DateField)
+    field_types = models.DateField,
 
 class DateTimeFieldHandler(FieldHandler):
     db_type = 'DATETIME'
-
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, models.DateTimeField)
+    field_types = models.DateTimeField,
 
 class JSONFieldHandler(FieldHandler):
     db_type = 'JSON'
+    field_types = models.JSONField,
+
+def _modifies(name):
+    method = getattr(list, name)
+    def modify(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.changed()
+        return result
+    modify.__name__ = name
+    return modify
+
+class HandlerRegistry(list):
+    """
+    The list of field handlers, in the order in which they are asked
+    whether they handle a field. The first handler that does is used.
 
-    @classmethod
-    def handles(cls, model, field):
-        return isinstance(field, models.JSONField)
+    Lookups are memoized per model and field. For handlers that do not
+    override FieldHandler.handles(), the candidates are looked up by
+    the type of the field (and, for subclasses of the field types, its
+    MRO), so only handlers with a custom handles() method are called.
+
+    The memo is dropped whenever the registry is modified, either
+    through register() and unregister(), or through any of the list
+    methods. version is incremented on every change.
+    """
 
-type_registry = [
+    def __init__(self, handlers=()):
+        list.__init__(self, handlers)
+        self.version = 0
+        self.changed()
+
+    def changed(self):
+        self.version += 1
+        self.by_field = {}
+        self.by_type = {}
+
+    __setitem__ = _modifies('__setitem__')
+    __delitem__ = _modifies('__delitem__')
+    __iadd__ = _modifies('__iadd__')
+    __imul__ = _modifies('__imul__')
+    append = _modifies('append')
+    extend = _modifies('extend')
+    insert = _modifies('insert')
+    pop = _modifies('pop')
+    remove = _modifies('remove')
+    clear = _modifies('clear')
+    sort = _modifies('sort')
+    reverse = _modifies('reverse')
+
+    def register(self, handler, index=0):
+        """
+        Adds the given FieldHandler at the given position. By default, it
+        is inserted first, so that it takes precedence over the built-in
+        handlers.
+        """
+        self.insert(index, handler)
+
+    def unregister(self, handler):
+        """
+        Removes the given FieldHandler.
+        """
+        self.remove(handler)
+
+    def _get_candidates(self, field_type):
+        # Returns the handlers that may handle fields of the given type,
+        # in order. These are the handlers with a custom handles() method,
+        # and the ones whose field_types match the exact type of the field
+        # or one of its base classes. Nothing after the first handler of
+        # the latter kind is ever used.
+        candidates = self.by_type.get(field_type)
+        if candidates is not None:
+            return candidates
+        mro = set(field_type.__mro__)
+        candidates = []
+        for handler in self:
+            if not handler.handles_by_type():
+                candidates.append((handler, False))
+            elif mro.intersection(handler.field_types):
+                candidates.append((handler, True))
+                break
+        candidates = self.by_type[field_type] = tuple(candidates)
+        return candidates
+
+    def get_handler(self, model, field):
+        """
+        Returns the first handler that handles the given field of the
+        given model, or None.
+        """
+        key = model, field
+        try:
+            return self.by_field[key]
+        except KeyError:
+            pass
+        result = None
+        for handler, by_type in self._get_candidates(type(field)):
+            if by_type or handler.handles(model, field):
+                result = handler
+                break
+        self.by_field[key] = result
+        return result
+
+type_registry = HandlerRegistry([
         LowerCaseStrFieldHandler,
         IPAddressFieldHandler,
         BooleanFieldHandler,
@@ -80,4 +172,4 @@ type_registry = [
         DateTimeFieldHandler,
         DateFieldHandler,
         JSONFieldHandler,
-]
+])
@@ -0,0 +1,305 @@
+"""
+Guards against queries that are too expensive to run: complexity
+limits that are checked before a query is run, and statement timeouts
+that are enforced by the database.
+"""
+import re
+from contextlib import contextmanager
+from time import monotonic
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, models, \
+        transaction
+from .conf import get_setting
+from .dom import Term
+from .exceptions import QueryTooComplex, QueryTimeout
+
+#: The number of SQLite virtual machine instructions between two checks
+#: of the timeout.
+SQLITE_PROGRESS_STEPS = 1000
+
+_missing = object()
+
+_select = re.compile(r'^(\s*SELECT)\b', re.IGNORECASE)
+
+def _check(setting, value, what):
+    limit = get_setting(setting)
+    if limit is not None and value > limit:
+        raise QueryTooComplex('the query has {} {}, the maximum is {}'.format(
+            value, what, limit))
+
+def check_dom(dom):
+    """
+    Raises QueryTooComplex if the given DOM has more terms than the
+    ``MAX_TERMS`` setting, or is nested deeper than ``MAX_DEPTH``.
+    """
+    max_terms = get_setting('MAX_TERMS')
+    max_depth = get_setting('MAX_DEPTH')
+    if max_terms is None and max_depth is None:
+        return
+    terms = depth = 0
+    for node, node_depth in dom.walk_depth():
+        if isinstance(node, Term):
+            terms += 1
+        depth = max(depth, node_depth)
+    _check('MAX_TERMS', terms, 'terms')
+    _check('MAX_DEPTH', depth, 'levels of nesting')
+
+def check_joins(joins):
+    """
+    Raises QueryTooComplex if the given number of joins exceeds the
+    ``MAX_JOINS`` setting.
+    """
+    _check('MAX_JOINS', joins, 'joins')
+
+def check_fanout(aliases):
+    """
+    Raises QueryTooComplex if a word without a field name would be
+    searched in more than ``MAX_ALIAS_FANOUT`` of the given aliases.
+    """
+    _check('MAX_ALIAS_FANOUT', len(aliases), 'default fields')
+
+def _timeout_error(seconds):
+    return QueryTimeout('the query was aborted after {} seconds'.format(seconds))
+
+@contextmanager
+def _postgresql_timeout(connection, seconds):
+    # SET LOCAL only lasts until the end of the transaction. Within an
+    # existing transaction, the previous value is restored afterwards.
+    nested = connection.in_atomic_block
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('statement_timeout'), "
+                           "set_config('statement_timeout', %s, true)",
+                           [str(max(1, int(seconds*1000)))])
+            previous = cursor.fetchone()[0]
+        try:
+            yield
+        except OperationalError as e:
+            cause = e.__cause__
+            code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+            if code == '57014': # query_canceled
+                raise _timeout_error(seconds) from e
+            raise
+        if nested:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)",
+                               [previous])
+
+def _mysql_variable(connection, seconds):
+    # Returns the name and value of the timeout variable, and the error
+    # code of a timeout.
+    if connection.mysql_is_mariadb:
+        return 'max_statement_time', seconds, 1969
+    return 'max_execution_time', max(1, int(seconds*1000)), 3024
+
+@contextmanager
+def _mysql_errors(code, seconds):
+    try:
+        yield
+    except OperationalError as e:
+        if e.args and e.args[0] == code:
+            raise _timeout_error(seconds) from e
+        raise
+
+@contextmanager
+def _mysql_timeout(connection, seconds):
+    # The session variable is restored afterwards, so the context must
+    # not be left open across the yields of a generator.
+    variable, value, code = _mysql_variable(connection, seconds)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT @@SESSION.{0}'.format(variable))
+        previous = cursor.fetchone()[0]
+        cursor.execute('SET SESSION {0} = %s'.format(variable), [value])
+    try:
+        with _mysql_errors(code, seconds):
+            yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SET SESSION {0} = %s'.format(variable), [previous])
+
+@contextmanager
+def _sqlite_timeout(connection, seconds):
+    deadline = monotonic()+seconds
+    expired = []
+
+    def progress():
+        if monotonic() > deadline:
+            expired.append(True)
+            return 1 # Abort the query.
+        return 0
+
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(progress, SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    except OperationalError as e:
+        if expired:
+            raise _timeout_error(seconds) from e
+        raise
+    finally:
+        connection.connection.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+
+_timeouts = {'postgresql': _postgresql_timeout,
+             'mysql': _mysql_timeout,
+             'sqlite': _sqlite_timeout}
+
+@contextmanager
+def statement_timeout(seconds=None, using=None):
+    """
+    Aborts the queries run within the context with a QueryTimeout once
+    they run longer than the given number of seconds, which defaults to
+    the ``STATEMENT_TIMEOUT`` setting. Does nothing if the timeout is
+    None, or on database backends other than PostgreSQL, MySQL, MariaDB
+    and SQLite.
+
+    On PostgreSQL, the queries run in a transaction (or a savepoint).
+    On SQLite, the timeout applies to the whole context rather than to
+    every single query.
+    """
+    if seconds is None:
+        seconds = get_setting('STATEMENT_TIMEOUT')
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    func = _timeouts.get(connection.vendor)
+    if not seconds or func is None:
+        yield
+        return
+    with func(connection, seconds):
+        yield
+
+@contextmanager
+def mysql_statement_timeout(sql, seconds=None, using=None):
+    """
+    Yields the given SELECT statement, changed such that MySQL or
+    MariaDB abort it with a QueryTimeout after the given number of
+    seconds, which defaults to the ``STATEMENT_TIMEOUT`` setting. Unlike
+    statement_timeout(), it leaves no state behind in the session, so it
+    works with unbuffered cursors, and the context may be left open
+    while the rows are read. On MySQL, the statement must start with
+    SELECT. Other statements, and other databases, are left unchanged.
+    """
+    if seconds is None:
+        seconds = get_setting('STATEMENT_TIMEOUT')
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if not seconds or connection.vendor != 'mysql':
+        yield sql
+        return
+    variable, value, code = _mysql_variable(connection, seconds)
+    if connection.mysql_is_mariadb:
+        sql = 'SET STATEMENT {}={} FOR {}'.format(variable, value, sql)
+    else:
+        sql = _select.sub(r'\1 /*+ MAX_EXECUTION_TIME({}) */'.format(value), sql, count=1)
+    with _mysql_errors(code, seconds):
+        yield sql
+
+class _TimeoutWrapper(object):
+    # An execute wrapper (see connection.execute_wrapper()) that runs each
+    # query with statement_timeout(). The queries that statement_timeout()
+    # runs itself are passed through.
+
+    def __init__(self, using):
+        self.using = using
+        self.running = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.running:
+            return execute(sql, params, many, context)
+        self.running = True
+        try:
+            with statement_timeout(using=self.using):
+                return execute(sql, params, many, context)
+        finally:
+            self.running = False
+
+def _timeout_wrapper(using):
+    return connections[using].execute_wrapper(_TimeoutWrapper(using))
+
+class TimeoutQuerySetMixin(object):
+    """
+    A mixin for Django QuerySets that runs their queries with
+    statement_timeout(). See with_statement_timeout().
+    """
+
+    def _fetch_all(self):
+        if self._result_cache is not None:
+            return super()._fetch_all()
+        with _timeout_wrapper(self.db):
+            return super()._fetch_all()
+
+    def iterator(self, *args, **kwargs):
+        rows = super().iterator(*args, **kwargs)
+        # The query is run when the first row is fetched. The timeout is
+        # removed before the rows are yielded, so that it does not stay
+        # in effect if the iterator is abandoned.
+        with _timeout_wrapper(self.db):
+            row = next(rows, _missing)
+        if row is _missing:
+            return
+        yield row
+        yield from rows
+
+    def count(self):
+        if self._result_cache is not None:
+            return super().count()
+        with _timeout_wrapper(self.db):
+            return super().count()
+
+    def exists(self):
+        if self._result_cache is not None:
+            return super().exists()
+        with _timeout_wrapper(self.db):
+            return super().exists()
+
+    def aggregate(self, *args, **kwargs):
+        with _timeout_wrapper(self.db):
+            return super().aggregate(*args, **kwargs)
+
+    def __reduce_ex__(self, protocol):
+        # The classes created by with_statement_timeout() cannot be
+        # imported, so they are pickled by their base class.
+        base = type(self).__dict__.get('_timeout_base')
+        if base is None:
+            return super().__reduce_ex__(protocol)
+        return _new_queryset, (base,), self.__getstate__()
+
+class TimeoutQuerySet(TimeoutQuerySetMixin, models.QuerySet):
+    """
+    A QuerySet that runs its queries with statement_timeout().
+    """
+
+_timeout_classes = {models.QuerySet: TimeoutQuerySet}
+
+def _timeout_class(base):
+    # Returns the subclass of the given QuerySet class that includes
+    # TimeoutQuerySetMixin. It is created once per class.
+    if issubclass(base, TimeoutQuerySetMixin):
+        return base
+    cls = _timeout_classes.get(base)
+    if cls is None:
+        cls = type('Timeout'+base.__name__, (TimeoutQuerySetMixin, base),
+                   {'__module__': __name__, '_timeout_base': base})
+        _timeout_classes[base] = cls
+    return cls
+
+def _new_queryset(base):
+    # Unpickles a QuerySet of a class created by _timeout_class().
+    cls = _timeout_class(base)
+    return cls.__new__(cls)
+
+def with_statement_timeout(queryset):
+    """
+    Returns a copy of the given QuerySet whose queries are run with
+    statement_timeout(), if the ``STATEMENT_TIMEOUT`` setting is
+    enabled. Otherwise, it is returned unchanged.
+
+    Plain QuerySets become a TimeoutQuerySet. For custom QuerySet
+    classes, a subclass that includes TimeoutQuerySetMixin is created
+    once per class; its instances are pickled by their base class.
+    """
+    if not get_setting('STATEMENT_TIMEOUT'):
+        return queryset
+    cls = _timeout_class(type(queryset))
+    if cls is type(queryset):
+        return queryset
+    # The mixin adds no state to the QuerySet.
+    queryset = queryset._chain()
+    queryset.__class__ = cls
+    return queryset
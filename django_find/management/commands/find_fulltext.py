@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from ...fulltext import get_index_statements
+from ...models import Searchable
+
+class Command(BaseCommand):
+    help = ('Creates the indexes for the full-text search of the aliases in '
+            'searchable_fulltext: GIN indexes on PostgreSQL, and FTS5 '
+            'tables on SQLite. Run it again after changing '
+            'searchable_fulltext; on SQLite, the FTS5 tables are rebuilt.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_label', nargs='*',
+                            help='only index the models of the given apps')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='the database to create the indexes in')
+        parser.add_argument('--drop', action='store_true',
+                            help='remove the indexes instead')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='print the SQL statements instead of running them')
+
+    def handle(self, *app_labels, **options):
+        try:
+            configs = [apps.get_app_config(label) for label in app_labels]
+        except LookupError as e:
+            raise CommandError(str(e))
+        if configs:
+            model_list = [m for c in configs for m in c.get_models()]
+        else:
+            model_list = apps.get_models()
+        model_list = [m for m in model_list
+                      if issubclass(m, Searchable)]
+
+        connection = connections[options['database']]
+        statements = get_index_statements(connection, model_list, options['drop'])
+        if options['dry_run']:
+            for statement in statements:
+                self.stdout.write(statement+';')
+            return
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        if options['verbosity'] > 0:
+            self.stdout.write('Executed {} statement(s).'.format(len(statements)))
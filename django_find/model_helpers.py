@@ -1,14 +1,29 @@
+from .dom import Term
+from .rewrite import rewrite, model_resolver
 from .serializers.sql import SQLSerializer
+from .signals import stage
 
-def sql_from_dom(cls, dom, mode='SELECT', fullnames=None, extra_model=None):
+def sql_from_dom(cls, dom, mode='SELECT', fullnames=None, extra_model=None,
+                 using=None):
     if not fullnames:
         fullnames = dom.get_term_names()
     if not fullnames:
         return 'SELECT * FROM (SELECT NULL) tbl WHERE 0', [], [] # Empty set
-    primary_cls = cls.get_primary_class_from_fullnames(fullnames)
-    serializer = SQLSerializer(primary_cls,
-                               mode=mode,
-                               fullnames=fullnames,
-                               extra_model=extra_model)
-    sql, args = dom.serialize(serializer)
+    # The rewrite may remove terms, so the columns are taken from the
+    # original DOM.
+    with stage(cls, 'optimize') as info:
+        dom = rewrite(dom, model_resolver(cls))
+        if info is not None:
+            info['terms'] = sum(1 for term in dom.walk(Term))
+    with stage(cls, 'compile') as info:
+        primary_cls = cls.get_primary_class_from_fullnames(fullnames)
+        serializer = SQLSerializer(primary_cls,
+                                   mode=mode,
+                                   fullnames=fullnames,
+                                   extra_model=extra_model,
+                                   using=using)
+        sql, args = dom.serialize(serializer)
+        if info is not None:
+            info['target'] = 'sql'
+            info['joins'] = sql.count(' LEFT JOIN ')
     return sql, args, fullnames
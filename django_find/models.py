@@ -3,15 +3,32 @@ This module contains the Searchable mixin, the main public API of
 django-find.
 """
 from collections import OrderedDict
+from copy import deepcopy
 from django.apps import AppConfig
 from django.db import models
 from .parsers.query import QueryParser
-from .parsers.json import JSONParser
 from .serializers.django import DjangoSerializer
-from .refs import get_subclasses, get_object_vector_to, get_object_vector_for
-from .rawquery import PaginatedRawQuerySet
-from .model_helpers import sql_from_dom
+from .refs import get_object_vector_to, get_object_vector_for
 from .handlers import type_registry
+from .cache import get_cache
+from .registry import ModelRegistry
+from .rewrite import rewrite, model_resolver
+from .schema import get_schema
+from .signals import stage
+from .dom import Term
+from .limits import check_dom, with_statement_timeout
+
+#: The field types whose query values may be relative to the current
+#: time, e.g. "yesterday".
+_date_types = 'DATE', 'DATETIME'
+
+def _has_dates(dom, resolve):
+    # True if the given DOM contains terms on date fields.
+    for term in dom.walk(Term):
+        resolved = resolve(term.name)
+        if resolved is not None and resolved[1] in _date_types:
+            return True
+    return False
 
 class Searchable(object):
     """
@@ -22,6 +39,17 @@ class Searchable(object):
     searchable_labels = {} # Override the verbose_name for the given aliases
     searchable = () # Contains two-tuples, mapping aliases to Django selectors
 
+    # How to find the join path between models, see
+    # refs.get_object_vector_for(). 'shortest' is much faster on densely
+    # connected models, optionally bounded to the given number of joins.
+    searchable_join_strategy = 'all'
+    searchable_join_max_depth = None
+
+    # Aliases of text fields in which words without a field name are
+    # searched using the full-text search of the database, see
+    # django_find.fulltext.
+    searchable_fulltext = ()
+
     @classmethod
     def get_default_searchable(cls):
         return OrderedDict((f.name, f.name) for f in cls._meta.get_fields()
@@ -34,6 +62,16 @@ class Searchable(object):
             result.update(OrderedDict(cls.searchable))
         return tuple(i for i in result.items() if i[1])
 
+    @classmethod
+    def get_schema(cls):
+        """
+        Returns the precompiled schema.SearchSchema of this model. It is
+        built on first use and rebuilt when the app registry, the settings,
+        the handler registry or the searchable attributes of the model
+        change.
+        """
+        return get_schema(cls)
+
     @classmethod
     def get_caption_from_selector(cls, selector):
         if isinstance(selector, (list, tuple)):
@@ -50,9 +88,9 @@ class Searchable(object):
     def get_field_handler_from_field(cls, field):
         if isinstance(field, models.ForeignKey):
             field = field.target_field
-        for handler in type_registry:
-            if handler.handles(cls, field):
-                return handler
+        handler = type_registry.get_handler(cls, field)
+        if handler is not None:
+            return handler
         msg = 'field {}.{} is of type {}'.format(cls.get_classname(),
                                                  field.name,
                                                  type(field))
@@ -67,7 +105,7 @@ class Searchable(object):
         Returns a list of the aliases, that is, the names of the
         fields that can be used in a query.
         """
-        return list(OrderedDict(cls.get_searchable()).keys())
+        return list(cls.get_schema().aliases)
     
     @classmethod
     def get_classname(cls):
@@ -81,14 +119,10 @@ class Searchable(object):
         disambiguate (e.g. ``"myapp.Author"``), matching the format
         accepted by :meth:`get_class_from_fullname`.
         """
-        short = cls.__name__
-        # Check if any *other* Searchable subclass shares our __name__.
-        for sub in get_subclasses(Searchable):
-            if sub is cls or sub.__module__ == '__fake__':
-                continue
-            if sub.__name__ == short:
+        for model in searchable_models.get_by_name(cls.__name__):
+            if model is not cls:
                 return cls._meta.label   # e.g. "search_tests.Author"
-        return short
+        return cls.__name__
 
     @classmethod
     def get_fullnames(cls, unique=False):
@@ -99,7 +133,7 @@ class Searchable(object):
         if unique:
             seen = set()
             result = []
-            for item in cls.get_searchable():
+            for item in cls.get_schema().searchable:
                 selector = item[1]
                 key = tuple(selector) if isinstance(selector, (list, tuple)) else selector
                 if key in seen:
@@ -115,13 +149,16 @@ class Searchable(object):
     def table_headers(cls):
         seen = set()
         result = []
-        for item in cls.get_searchable():
-            selector = item[1]
+        schema = cls.get_schema()
+        for alias, selector in schema.searchable:
             key = tuple(selector) if isinstance(selector, (list, tuple)) else selector
             if key in seen:
                 continue
             seen.add(key)
-            result.append(cls.get_caption_from_selector(selector))
+            caption = schema.captions.get(alias)
+            if caption is None:
+                caption = cls.get_caption_from_selector(selector)
+            result.append(caption)
         return result
 
     @classmethod
@@ -166,6 +203,9 @@ class Searchable(object):
         field of the first selector is returned; all selectors of such an
         alias are expected to share the same field type.
         """
+        field = cls.get_schema().fields.get(alias)
+        if field is not None:
+            return field
         selector = cls.get_selector_from_alias(alias)
         if isinstance(selector, (list, tuple)):
             selector = selector[0]
@@ -180,6 +220,9 @@ class Searchable(object):
         @type name: str
         @param name: e.g. 'address', or 'name'
         """
+        handler = cls.get_schema().handlers.get(alias)
+        if handler is not None:
+            return handler
         field = cls.get_field_from_alias(alias)
         return cls.get_field_handler_from_field(field)
 
@@ -214,7 +257,7 @@ class Searchable(object):
         @type name: str
         @param name: e.g. 'address', or 'name'
         """
-        searchable = dict(cls.get_searchable())
+        searchable = cls.get_schema().selectors
         if alias in searchable:
             return searchable[alias]
         if '__' in alias:
@@ -232,7 +275,9 @@ class Searchable(object):
 
     @classmethod
     def get_object_vector_for(cls, search_cls_list):
-        return get_object_vector_for(cls, search_cls_list, Searchable)
+        return get_object_vector_for(cls, search_cls_list, Searchable,
+                                     strategy=cls.searchable_join_strategy,
+                                     max_depth=cls.searchable_join_max_depth)
 
     @classmethod
     def get_class_from_fullname(cls, fullname):
@@ -263,21 +308,15 @@ class Searchable(object):
         clsname = ".".join(names[:-1])  # e.g. "Author" or "myapp.Author"
         alias = names[-1]
 
-        # Collect all Searchable subclasses, skipping Django internals.
-        candidates = [
-            sub for sub in get_subclasses(Searchable)
-            if sub.__module__ != '__fake__'
-        ]
-
         # First, try an exact match against the Django app label
         # (e.g. "myapp.Author" == Model._meta.label).  This is the
         # unambiguous, qualified form.
-        for sub in candidates:
-            if sub._meta.label == clsname:
-                return sub, alias
+        model = searchable_models.get_by_label(clsname)
+        if model is not None:
+            return model, alias
 
         # Fall back to matching the short class name.
-        matches = [sub for sub in candidates if sub.__name__ == clsname]
+        matches = searchable_models.get_by_name(clsname)
         if len(matches) == 1:
             return matches[0], alias
         if len(matches) > 1:
@@ -360,38 +399,93 @@ class Searchable(object):
         fields = {}
         for alias in aliases:
             fields[alias] = cls.get_classname()+'.'+alias
-        query_parser = QueryParser(fields, aliases)
-        return query_parser.parse(query)
+        query_parser = QueryParser(fields, aliases, cls.get_schema().fulltext)
+        with stage(cls, 'parse') as info:
+            dom = query_parser.parse(query)
+            if info is not None:
+                info['query'] = query
+                info['terms'] = sum(1 for term in dom.walk(Term))
+        check_dom(dom)
+        return dom
 
     @classmethod
     def q_from_query(cls, query, aliases=None):
         """
         Returns a Q-Object for the given query.
+
+        Compiled queries are kept in the ``'QUERY'`` cache (see
+        cache.get_cache()) by the fingerprint of their canonical DOM (see
+        dom.canonicalize()), so different query strings that produce the
+        same DOM, e.g. "a b" and "b a", share their entry. The
+        fingerprint of a query string is cached as well, so repeating a
+        query string skips parsing and serialization. Every call counts
+        as one hit or miss of the cache. Entries compiled against an
+        outdated search schema are ignored.
+
+        Queries that search date fields are not cached, as relative dates
+        such as "yesterday" are resolved when the query is compiled.
         """
-        dom = cls.dom_from_query(query, aliases)
-        serializer = DjangoSerializer(cls)
-        return dom.serialize(serializer)
+        cache = get_cache('QUERY')
+        key = cls, query, tuple(aliases) if aliases else None
+        schema = cls.get_schema()
+        dom = None
+        entry = cache.get(key, count=False)
+        if entry is not None and entry[0] is schema:
+            fingerprint = entry[1]
+        else:
+            dom = cls.dom_from_query(query, aliases)
+            fingerprint = dom.fingerprint()
+            cache.set(key, (schema, fingerprint))
+
+        dom_key = cls, fingerprint
+        entry = cache.get(dom_key)
+        if entry is not None and entry[0] is schema:
+            q_obj = entry[1]
+        else:
+            if dom is None:
+                dom = cls.dom_from_query(query, aliases)
+            resolve = model_resolver(cls)
+            with stage(cls, 'optimize') as info:
+                dom = rewrite(dom, resolve)
+                if info is not None:
+                    info['terms'] = sum(1 for term in dom.walk(Term))
+            with stage(cls, 'compile') as info:
+                serializer = DjangoSerializer(cls)
+                q_obj = dom.serialize(serializer)
+                if info is not None:
+                    info['target'] = 'q'
+            if _has_dates(dom, resolve):
+                return q_obj
+            cache.set(dom_key, (schema, q_obj))
+        return deepcopy(q_obj)
 
     @classmethod
     def by_query(cls, query, aliases=None):
-        return cls.objects.filter(cls.q_from_query(query, aliases))
+        queryset = cls.objects.filter(cls.q_from_query(query, aliases))
+        return with_statement_timeout(queryset)
 
     @classmethod
-    def sql_from_query(cls, query, mode='SELECT', fullnames=None, extra_model=None):
+    def sql_from_query(cls, query, mode='SELECT', fullnames=None, extra_model=None,
+                       using=None):
         """
-        Returns an SQL statement for the given query.
+        Returns an SQL statement for the given query, in the dialect of
+        the database with the given alias (by default, the default
+        database).
         """
+        from .model_helpers import sql_from_dom
         dom = cls.dom_from_query(query)
         return sql_from_dom(cls, dom,
                             mode=mode,
                             fullnames=fullnames,
-                            extra_model=extra_model)
+                            extra_model=extra_model,
+                            using=using)
 
     @classmethod
     def by_query_raw(cls, query, mode='SELECT', fullnames=None, extra_model=None):
         """
         Returns a PaginatedRawQuerySet for the given query.
         """
+        from .rawquery import PaginatedRawQuerySet
         sql, args, fields = cls.sql_from_query(query,
                                                mode=mode,
                                                fullnames=fullnames,
@@ -399,12 +493,21 @@ class Searchable(object):
         return PaginatedRawQuerySet(cls, sql, args), fields
 
     @classmethod
-    def sql_from_json(cls, json_string, mode='SELECT', extra_model=None):
+    def sql_from_json(cls, json_string, mode='SELECT', extra_model=None, using=None):
+        # The JSON parser, the SQL serializer and the raw query set are
+        # only needed by the raw SQL methods, so they are imported on use.
+        from .model_helpers import sql_from_dom
+        from .parsers.json import JSONParser
         dom = JSONParser().parse(json_string)
-        return sql_from_dom(cls, dom, extra_model=extra_model)
+        check_dom(dom)
+        return sql_from_dom(cls, dom, extra_model=extra_model, using=using)
 
     @classmethod
     def by_json_raw(cls, json_string, extra_model=None):
+        from .rawquery import PaginatedRawQuerySet
         sql, args, fields = cls.sql_from_json(json_string,
                                               extra_model=extra_model)
         return PaginatedRawQuerySet(cls, sql, args), fields
+
+#: All Searchable models, indexed by class name and app label.
+searchable_models = ModelRegistry(Searchable)
@@ -1,3 +1,55 @@
+import re
+from functools import lru_cache
+
+# Flags that can be scoped to a part of a pattern, e.g. (?i:...).
+_scoped_flags = ((re.I, 'i'), (re.M, 'm'), (re.S, 's'), (re.X, 'x'))
+
+class TokenMatch(object):
+    """
+    The match of a single token within the combined regular expression.
+    Like a re.Match object, group(0) is the matched string, and group(n)
+    is the n-th group of the token's own regular expression.
+    """
+    __slots__ = ('match', 'index', 'groups')
+
+    def __init__(self, match, index, groups):
+        self.match = match
+        self.index = index
+        self.groups = groups
+
+    def group(self, n=0):
+        if not 0 <= n <= self.groups:
+            raise IndexError('no such group')
+        return self.match.group(self.index+n)
+
+    def start(self, n=0):
+        return self.match.start(self.index+n)
+
+    def end(self, n=0):
+        return self.match.end(self.index+n)
+
+@lru_cache(maxsize=None)
+def compile_tokens(token_list):
+    """
+    Combines the regular expressions of the given (name, regex) tuples
+    into a single alternation, such that the first token that matches
+    at a given offset wins, as if they were tried one by one.
+
+    Returns the compiled expression and a map from the number of the
+    group that encloses each token to the token's name and number of
+    groups.
+    """
+    parts = []
+    names = {}
+    group = 1
+    for name, regex in token_list:
+        flags = ''.join(c for flag, c in _scoped_flags if regex.flags & flag)
+        pattern = '(?{}:{})'.format(flags, regex.pattern) if flags else regex.pattern
+        parts.append('(' + pattern + ')')
+        names[group] = name, regex.groups
+        group += regex.groups+1
+    return re.compile('|'.join(parts)), names
+
 class Parser(object):
     """
     The base class for all parsers.
@@ -5,27 +57,38 @@ class Parser(object):
 
     def __init__(self, token_list):
         self.token_list = token_list
+        self.regex, self.token_names = compile_tokens(tuple(token_list))
         self._reset()
 
     def _reset(self):
         self.offset = 0
         self.line = 0
         self.error = ''
+        self.tokens = None
 
-    def _get_next_token(self):
-        if len(self.input) <= self.offset:
-            return 'EOF', None
-
-        # Walk through the list of tokens, trying to find a match.
-        for token_name, token_regex in self.token_list:
-            match = token_regex.match(self.input, self.offset)
+    def _tokenize(self):
+        # Yields (token_name, match) tuples for self.input, followed by
+        # ('EOF', None) forever. Since the enclosing group of a token is
+        # the last one to close, match.lastindex identifies the token.
+        names = self.token_names
+        match_at = self.regex.scanner(self.input, self.offset).match
+        end = len(self.input)
+        while self.offset < end:
+            match = match_at()
             if not match:
-                continue
-
+                # Ending up here no matching token was found.
+                yield None, None
+                break
             string = match.group(0)
             self.offset += len(string)
             self.line += string.count('\n')
-            return token_name, match
+            index = match.lastindex
+            name, groups = names[index]
+            yield name, TokenMatch(match, index, groups)
+        while True:
+            yield 'EOF', None
 
-        # Ending up here no matching token was found.
-        return None, None
+    def _get_next_token(self):
+        if self.tokens is None:
+            self.tokens = self._tokenize()
+        return next(self.tokens)
@@ -1,9 +1,9 @@
 import re
-from django.db.models import JSONField
 from django_find import models
 from collections import OrderedDict
 from .parser import Parser
 from ..dom import Group, And, Or, Not, Term
+from ..limits import check_fanout
 
 operators = OrderedDict((
     ('!=', 'notequals'),
@@ -19,6 +19,9 @@ operators = OrderedDict((
     ('=', 'equals'),
 ))
 
+# The field types whose terms support the 'in' operator.
+in_types = 'INT', 'STR', 'LCSTR'
+
 operators_str = '|'.join(list(operators.keys()))
 tokens = [
     ('and', re.compile(r'and\b', re.I)),
@@ -63,25 +66,33 @@ def get_term_from_op(field, operator, value):
     return Term(field, op, value)
 
 class QueryParser(Parser):
-    def __init__(self, fields, default):
+    def __init__(self, fields, default, fulltext=()):
         """
         Fields is a map that translates aliases to something like
-        Book.author.
+        Book.author. Words without a field name are searched in the
+        fields in default, and in full text (using the 'search'
+        operator) in those that are also in fulltext.
         """
         Parser.__init__(self, tokens)
+        self.dispatch = dict((name, getattr(self, 'parse_'+name, None))
+                             for name, regex in tokens)
         self.fields = fields
         self.default = default or fields
+        self.fulltext = fulltext
         for name in self.default:
             if name not in self.fields:
                 raise AttributeError('constructor argument "default" contains'\
                     +' "{}", which is not also in "fields"'.format(name))
 
     def parse_word(self, scopes, match):
+        check_fanout(self.default)
         self.parse_or(scopes, ())
         child = Or()
-        for name in self.default:
-            name = self.fields[name]
+        for alias in self.default:
+            name = self.fields[alias]
             value, operator = op_from_word(match.group(1))
+            if operator == 'contains' and alias in self.fulltext:
+                operator = 'search'
             child.add(Term(name, operator, value))
         scopes[-1].add(child)
         close_scope(scopes)
@@ -117,7 +128,7 @@ class QueryParser(Parser):
 
         # When the field has choices, let the user search by the human-readable
         # display label, expanding to every matching stored value, e.g.
-        # format:edition -> (format=HC OR format=PB OR format=EB).
+        # format:edition -> format IN (HC, PB, EB).
         node = self._build_choice_node(field, op, value)
         if node is not None:
             scopes[-1].add(node)
@@ -129,15 +140,40 @@ class QueryParser(Parser):
         close_scope(scopes)
 
     @staticmethod
-    def _field_from_fullname(fullname):
+    def _is_json_fullname(fullname):
         """
-        Resolve a fullname (e.g. 'Copy.format') to its Django field, or
-        None when it cannot be resolved (e.g. the parser was built with a
-        synthetic name map that does not map to real Searchable models).
+        Returns True if the given fullname (e.g. 'Copy.metadata') refers
+        to a JSONField, and False if it does not or cannot be resolved
+        (e.g. the parser was built with a synthetic name map that does not
+        map to real Searchable models).
         """
         try:
             cls, alias = models.Searchable.get_class_from_fullname(fullname)
-            return cls.get_field_from_alias(alias)
+            return alias in cls.get_schema().json_aliases
+        except Exception:
+            return False
+
+    @staticmethod
+    def _choice_index_from_fullname(fullname):
+        """
+        Returns the ChoiceIndex of the field with the given fullname, or
+        None if it has no choices or cannot be resolved.
+        """
+        try:
+            cls, alias = models.Searchable.get_class_from_fullname(fullname)
+            return cls.get_schema().get_choice_index(alias)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _db_type_from_fullname(fullname):
+        """
+        Returns the db_type of the handler of the field with the given
+        fullname, or None if it cannot be resolved.
+        """
+        try:
+            cls, alias = models.Searchable.get_class_from_fullname(fullname)
+            return cls.get_field_handler_from_alias(alias).db_type
         except Exception:
             return None
 
@@ -153,17 +189,17 @@ class QueryParser(Parser):
         base_fullname = self.fields.get(base)
         if base_fullname is None:
             return None
-        field = self._field_from_fullname(base_fullname)
-        if not isinstance(field, JSONField):
+        if not self._is_json_fullname(base_fullname):
             return None
         return base_fullname + '__' + path
 
     def _build_choice_node(self, fullname, operator, value):
         """
-        For a choices field, expand a search by display label into an OR of
-        exact-match terms over the matching stored codes. Returns a DOM node
-        (Or, or Not(Or)), or None when no translation applies so the caller
-        falls back to the normal term.
+        For a choices field, expand a search by display label into an 'in'
+        term over the matching stored codes. Returns a DOM node (Term, or
+        Not(Term)), or None when no translation applies so the caller
+        falls back to the normal term. Fields whose type does not support
+        'in' get an Or of 'equals' terms (or Not(Or)) instead.
 
         ``:`` / ``!:`` (contains) match the label or code as a case-insensitive
         substring; ``=`` / ``!=`` (equals) require a full case-insensitive
@@ -172,35 +208,23 @@ class QueryParser(Parser):
         op = operators.get(operator)
         if op not in ('contains', 'equals', 'notcontains', 'notequals'):
             return None
-        field = self._field_from_fullname(fullname)
-        if field is None:
-            return None
-        choices = field.flatchoices or []
-        if not choices:
+        index = self._choice_index_from_fullname(fullname)
+        if index is None:
             return None
-        needle = value.lower()
-        exact = op in ('equals', 'notequals')
-        codes = []
-        for code, label in choices:
-            code_s, label_s = str(code), str(label)
-            if exact:
-                matched = needle == code_s.lower() or needle == label_s.lower()
-            else:
-                matched = needle in code_s.lower() or needle in label_s.lower()
-            if matched:
-                codes.append(code_s)
+        codes = index.find(value, exact=op in ('equals', 'notequals'))
         if not codes:
             # Nothing matched; fall back to the untranslated term, which yields
             # no rows just like before (stored values are the codes).
             return None
-        or_group = Or()
-        for code in codes:
-            or_group.add(Term(fullname, 'equals', code))
+        if self._db_type_from_fullname(fullname) in in_types:
+            node = Term(fullname, 'in', codes)
+        else:
+            node = Or()
+            for code in codes:
+                node.add(Term(fullname, 'equals', code))
         if op in ('notcontains', 'notequals'):
-            not_group = Not()
-            not_group.add(or_group)
-            return not_group
-        return or_group
+            return Not(node)
+        return node
 
     def parse_boolean(self, scopes, dom_cls, match):
         try:
@@ -221,11 +245,9 @@ class QueryParser(Parser):
         self.parse_boolean(scopes, Or, match)
 
     def parse_term(self, token, scopes, match):
-        try:
-            parse_func = getattr(self, 'parse_'+token)
+        parse_func = self.dispatch.get(token)
+        if parse_func is not None:
             parse_func(scopes, match)
-        except AttributeError:
-            pass
 
     def add_logical_scope(self, scopes, match):
         """
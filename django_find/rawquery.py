@@ -1,4 +1,10 @@
+import base64
+import datetime
+import decimal
+import json
 from django.db import connection
+from .limits import statement_timeout, mysql_statement_timeout
+from .signals import stage
 
 SQL_MAXINT=9223372036854775807 # SQLite maxint
 
@@ -7,22 +13,187 @@ def assert_positive_slice(slc):
        (slc.stop is not None and slc.stop < 0):
        raise IndexError("Negative indexing is not supported")
 
+# Values that JSON cannot represent are encoded as an object with one
+# of these keys, and converted back when the cursor is decoded.
+_cursor_types = (('datetime', datetime.datetime, datetime.datetime.fromisoformat),
+                 ('date', datetime.date, datetime.date.fromisoformat),
+                 ('time', datetime.time, datetime.time.fromisoformat),
+                 ('decimal', decimal.Decimal, decimal.Decimal))
+
+def _json_default(value):
+    for name, cls, parse in _cursor_types:
+        if isinstance(value, cls):
+            return {name: str(value) if name == 'decimal' else value.isoformat()}
+    raise ValueError('cannot encode {!r} in a cursor'.format(value))
+
+def _json_object_hook(obj):
+    if len(obj) == 1:
+        name, value = next(iter(obj.items()))
+        for type_name, cls, parse in _cursor_types:
+            if name == type_name and isinstance(value, str):
+                return parse(value)
+    raise ValueError('invalid cursor value: {!r}'.format(obj))
+
+def encode_cursor(values):
+    """
+    Returns an opaque, URL safe string that encodes the given key values.
+    Raises ValueError if a value cannot be encoded. Besides the types
+    supported by JSON, dates, times and decimals are supported.
+    """
+    data = json.dumps(list(values), default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """
+    The reverse of encode_cursor(). Raises ValueError if the cursor is
+    invalid.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        values = json.loads(data, object_hook=_json_object_hook)
+    except (TypeError, ValueError, UnicodeError, decimal.InvalidOperation):
+        raise ValueError('invalid cursor: {!r}'.format(cursor))
+    if not isinstance(values, list):
+        raise ValueError('invalid cursor: {!r}'.format(cursor))
+    return tuple(values)
+
+def _seek_condition(columns, values):
+    """
+    Returns a condition (and its arguments) that matches all rows that
+    come after the given key values, in the order created by
+    _seek_order(), i.e. with NULL values first.
+    """
+    condition, args = None, []
+    for column, value in reversed(list(zip(columns, values))):
+        if value is None:
+            greater, equal, value_args = column+' IS NOT NULL', column+' IS NULL', []
+        else:
+            greater, equal, value_args = column+'>%s', column+'=%s', [value]
+        if condition is None:
+            condition, args = greater, value_args
+        else:
+            condition = '{} OR ({} AND ({}))'.format(greater, equal, condition)
+            args = value_args+value_args+args
+    return condition, args
+
+def _seek_order(columns, nullable):
+    # Sorts NULL values first on all databases. Columns that cannot be
+    # NULL are sorted as they are, so that an index can serve the order.
+    return ', '.join('{} IS NOT NULL, {}'.format(c, c) if null else c
+                     for c, null in zip(columns, nullable))
+
+def _unbuffered_cursor():
+    # Returns an unbuffered MySQL cursor, which streams the rows. It is
+    # wrapped like the cursors of Django, so that execute wrappers, query
+    # logging and error translation still apply.
+    from MySQLdb.cursors import SSCursor
+    from django.db.backends.mysql.base import CursorWrapper
+    connection.ensure_connection()
+    connection.validate_thread_sharing()
+    with connection.wrap_database_errors:
+        cursor = CursorWrapper(connection.connection.cursor(SSCursor))
+    if connection.queries_logged:
+        return connection.make_debug_cursor(cursor)
+    return connection.make_cursor(cursor)
+
+class CappedCount(int):
+    """
+    A row count that may have been cut off at an upper limit, as
+    returned by PaginatedRawQuerySet.get_count('capped'). If capped is
+    True, the real count is higher, and str() returns e.g. "1000+".
+    """
+
+    def __new__(cls, value, capped=False):
+        count = int.__new__(cls, value)
+        count.capped = capped
+        return count
+
+    def __str__(self):
+        return int.__str__(self)+('+' if self.capped else '')
+
+class _SharedState(object):
+    """
+    Results that are shared between all slices of the same base query:
+    the counts, and the windows of rows that were already fetched.
+    """
+    max_windows = 16
+
+    def __init__(self):
+        self.counts = {}
+        self.columns = None
+        self.windows = []
+
+    def add_window(self, offset, rows, exhausted):
+        # If exhausted is True, there are no rows after the window.
+        self.windows.append((offset, rows, exhausted))
+        del self.windows[:-self.max_windows]
+
+    def get_rows(self, offset, limit):
+        """
+        Returns the given range of rows if a fetched window covers it,
+        or None otherwise.
+        """
+        for start, rows, exhausted in self.windows:
+            if start > offset:
+                continue
+            if limit is None:
+                if exhausted:
+                    return rows[offset-start:]
+            elif offset+limit <= start+len(rows) or exhausted:
+                return rows[offset-start:offset-start+limit]
+        return None
+
+    def get_total(self):
+        """
+        Returns the number of rows if a fetched window reaches the end,
+        or None otherwise.
+        """
+        for start, rows, exhausted in self.windows:
+            if exhausted and (rows or start == 0):
+                return start+len(rows)
+        return None
+
 class PaginatedRawQuerySet(object):
-    def __init__(self, model, raw_query, args=None, limit=None, offset=None):
+    """
+    A row-based, sliceable result set of a raw SQL query.
+
+    By default, slices are fetched using LIMIT and OFFSET. For deep
+    pagination, use seek() instead: it orders the rows by a key and
+    fetches the rows after a given cursor, so that every page costs
+    the same.
+
+    Slices share the rows that were already fetched, and the count, with
+    the query set they were taken from, so indexing into a fetched page
+    does not hit the database again.
+    """
+
+    def __init__(self, model, raw_query, args=None, limit=None, offset=None,
+                 key=None, after=None, not_null=()):
         self.model = model
         self.raw_query = raw_query
         self.args = args if args else []
         self.limit = limit
         self.offset = offset or 0
+        self.key = tuple(key) if key else None
+        self.after = tuple(after) if after is not None else None
+        self.not_null = frozenset(not_null)
         self.result_cache = None
         self.count_cache = None
+        self.columns = None
+        self.shared = _SharedState()
 
     def __copy__(self):
-        return self.__class__(self.model,
-                              self.raw_query,
-                              self.args,
-                              limit=self.limit,
-                              offset=self.offset)
+        qs = self.__class__(self.model,
+                            self.raw_query,
+                            self.args,
+                            limit=self.limit,
+                            offset=self.offset,
+                            key=self.key,
+                            after=self.after,
+                            not_null=self.not_null)
+        qs.columns = self.columns
+        qs.shared = self.shared
+        return qs
 
     def _getslice(self, slc):
         assert_positive_slice(slc)
@@ -37,7 +208,10 @@ class PaginatedRawQuerySet(object):
         qs = self.__copy__()
         qs.offset = self.offset+idx if self.offset else idx
         qs.limit = 1
-        return list(qs)[idx]
+        rows = list(qs)
+        if not rows:
+            raise IndexError("Index out of range")
+        return rows[0]
 
     def __getitem__(self, k):
         """
@@ -49,30 +223,297 @@ class PaginatedRawQuerySet(object):
             return self._getindex(k)
         raise TypeError
 
+    def get_columns(self):
+        """
+        Returns the names of the columns of the raw query.
+        """
+        if self.columns is None:
+            query = 'SELECT * FROM (' + self.raw_query + ') c LIMIT 0'
+            with statement_timeout(), connection.cursor() as cursor:
+                cursor.execute(query, self.args)
+                self.columns = tuple(col[0] for col in cursor.description)
+        return self.columns
+
+    def seek(self, cursor=None, key=None, not_null=()):
+        """
+        Returns a copy of this query set that uses keyset pagination:
+        the rows are ordered by the given key, and only rows after the
+        given cursor (as returned by next_cursor) are included. Slicing
+        the result works as usual, e.g.::
+
+            page = query.seek()[:50]
+            rows = list(page)
+            page = query.seek(page.next_cursor)[:50]
+
+        The key is a list of column names of the raw query, and should
+        identify a row uniquely. NULL values are sorted first, which
+        requires an expression that no index can serve; list the key
+        columns that cannot be NULL in not_null to avoid it.
+
+        The key defaults to all columns, which is unique for the SELECT
+        DISTINCT statements created by django-find, but requires sorting
+        the whole result. The primary key of the model is a faster key
+        only if the query does not join any to-many relation, as each
+        joined row repeats it.
+        """
+        qs = self.__copy__()
+        if key:
+            qs.key, qs.not_null = tuple(key), frozenset(not_null)
+        elif self.key is None:
+            qs.key, qs.not_null = self.get_columns(), frozenset(not_null)
+        qs.after = decode_cursor(cursor) if cursor else None
+        if qs.after is not None and len(qs.after) != len(qs.key):
+            raise ValueError('cursor does not match the key {}'.format(qs.key))
+        qs.limit = None
+        qs.offset = 0
+        qs.shared = _SharedState()
+        return qs
+
+    def _get_base_query(self, counting=False):
+        # Returns the query without LIMIT and OFFSET, and its arguments.
+        # When counting, only the key is selected, and the rows are not
+        # ordered.
+        if self.key is None:
+            return self.raw_query, self.args
+        quote = connection.ops.quote_name
+        columns = ['seek.'+quote(c) for c in self.key]
+        select = ', '.join(columns) if counting else '*'
+        query = 'SELECT ' + select + ' FROM (' + self.raw_query + ') seek'
+        args = list(self.args)
+        if self.after is not None:
+            condition, seek_args = _seek_condition(columns, self.after)
+            query += ' WHERE ' + condition
+            args += seek_args
+        if not counting:
+            nullable = [c not in self.not_null for c in self.key]
+            query += ' ORDER BY ' + _seek_order(columns, nullable)
+        return query, args
+
     @property
     def query(self):
-        query = self.raw_query
+        query = self._get_base_query()[0]
         if self.limit is None:
             query += ' LIMIT '+str(SQL_MAXINT-self.offset)+' OFFSET '+str(int(self.offset))
         else:
             query += ' LIMIT '+str(int(self.limit))+' OFFSET '+str(int(self.offset))
         return query
 
+    @property
+    def query_args(self):
+        """
+        The arguments that belong to the placeholders in query.
+        """
+        return self._get_base_query()[1]
+
     def __iter__(self):
         if self.result_cache is None:
-            with connection.cursor() as cursor:
-                cursor.execute(self.query, self.args)
-                self.result_cache = cursor.fetchall()
+            rows = self.shared.get_rows(self.offset, self.limit)
+            if rows is None:
+                with stage(self.model, 'execute') as info, \
+                        statement_timeout(), \
+                        connection.cursor() as cursor:
+                    cursor.execute(self.query, self.query_args)
+                    rows = cursor.fetchall()
+                    self.shared.columns = tuple(col[0] for col in cursor.description)
+                    if info is not None:
+                        info['kind'] = 'fetch'
+                        info['rows'] = len(rows)
+                exhausted = self.limit is None or len(rows) < self.limit
+                self.shared.add_window(self.offset, rows, exhausted)
+            self.columns = self.shared.columns
+            self.result_cache = rows
         return iter(self.result_cache)
 
-    def __len__(self):
-        if self.count_cache is not None:
-            return self.count_cache
-        query = 'SELECT COUNT(*) FROM (' + self.query + ') c'
+    def iterator(self, chunk_size=2000):
+        """
+        Iterates over the rows without filling the result cache. The
+        rows are fetched in chunks of the given size from the cursor
+        returned by Django's connection.chunked_cursor(), which is a
+        server-side (named) cursor on PostgreSQL, or from an unbuffered
+        cursor on MySQL. On these databases, the rows are not loaded into
+        memory all at once. Other backends load the whole result into the
+        client's memory.
+
+        The ``STATEMENT_TIMEOUT`` applies to the query until the first
+        chunk is fetched, or, on MySQL, to the whole statement. As no
+        other statement can run on a MySQL connection while the rows are
+        read, consume or close the iterator before running other queries.
+        """
+        if self.result_cache is not None:
+            for row in self.result_cache:
+                yield row
+            return
+        # The duration of the 'execute' stage includes the time that the
+        # caller spends between the rows.
+        with stage(self.model, 'execute') as info:
+            if info is not None:
+                info['kind'] = 'iterator'
+                info['rows'] = 0
+            if connection.vendor == 'mysql':
+                chunks = self._fetch_unbuffered(chunk_size)
+            else:
+                chunks = self._fetch_chunked(chunk_size)
+            for rows in chunks:
+                if info is not None:
+                    info['rows'] += len(rows)
+                for row in rows:
+                    yield row
+
+    def _fetch_chunked(self, chunk_size):
+        # Yields the rows of the query in chunks, see iterator().
+        cursor = connection.chunked_cursor()
+        try:
+            # The timeout only covers the query and the first chunk. It is
+            # removed before the rows are yielded, so that it does not stay
+            # in effect if the iterator is abandoned.
+            with statement_timeout():
+                cursor.execute(self.query, self.query_args)
+                rows = cursor.fetchmany(chunk_size)
+            # The description of a named cursor is only available once
+            # the first rows were fetched.
+            self.columns = tuple(col[0] for col in cursor.description)
+            while rows:
+                yield rows
+                rows = cursor.fetchmany(chunk_size)
+        finally:
+            cursor.close()
+
+    def _fetch_unbuffered(self, chunk_size):
+        # Like _fetch_chunked(), on MySQL. No other statement can run on
+        # the connection until all rows of an unbuffered cursor were read,
+        # so the statement sets its own timeout.
+        with mysql_statement_timeout(self.query) as query, \
+                _unbuffered_cursor() as cursor:
+            cursor.execute(query, self.query_args)
+            self.columns = tuple(col[0] for col in cursor.description)
+            rows = cursor.fetchmany(chunk_size)
+            while rows:
+                yield rows
+                rows = cursor.fetchmany(chunk_size)
+
+    def get_cursor(self, row):
+        """
+        Returns the cursor that points behind the given row of this
+        query set, for use with seek().
+        """
+        if self.key is None:
+            raise ValueError('get_cursor() requires a query set returned by seek()')
+        return encode_cursor(row[self.columns.index(name)] for name in self.key)
+
+    @property
+    def next_cursor(self):
+        """
+        The cursor pointing behind the last row of this query set, or
+        None if it is empty.
+        """
+        rows = list(self)
+        if not rows:
+            return None
+        return self.get_cursor(rows[-1])
+
+    def _count_exact(self, query, args):
+        query = 'SELECT COUNT(*) FROM (' + query + ') c'
+        with connection.cursor() as cursor:
+            cursor.execute(query, args)
+            return int(cursor.fetchone()[0])
+
+    def _count_capped(self, query, args, cap):
+        query = 'SELECT COUNT(*) FROM (' + query + ' LIMIT ' + str(int(cap)+1) + ') c'
         with connection.cursor() as cursor:
-            cursor.execute(query, self.args)
-            row = cursor.fetchone()
-            self.count_cache = int(row[0])
+            cursor.execute(query, args)
+            count = int(cursor.fetchone()[0])
+        if count > cap:
+            return CappedCount(cap, capped=True)
+        return CappedCount(count)
+
+    def _count_estimate(self, query, args):
+        # Asks the query planner for the number of rows. Backends that do
+        # not provide an estimate are counted exactly.
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + query, args)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        if connection.vendor == 'mysql':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + query, args)
+                names = [col[0].lower() for col in cursor.description]
+                rows = cursor.fetchall()
+            estimate = 1.0
+            for row in rows:
+                row = dict(zip(names, row))
+                estimate *= (row.get('rows') or 1)*(row.get('filtered') or 100)/100.0
+            return int(estimate)
+        return self._count_exact(query, args)
+
+    def get_count(self, strategy='exact', cap=1000):
+        """
+        Returns the number of rows in this query set.
+
+        The strategy selects how the rows are counted:
+
+        - ``'exact'`` counts all rows, without LIMIT and OFFSET, and
+          selecting only the key if the query set was returned by seek().
+        - ``'estimate'`` returns the estimate of the query planner on
+          PostgreSQL and MySQL, and an exact count elsewhere.
+        - ``'capped'`` counts at most cap rows, and returns a CappedCount,
+          which is shown as e.g. "1000+" when there are more rows.
+
+        The rows of the base query (without LIMIT and OFFSET) are counted
+        once, and the result is shared between all slices of it. If the
+        rows were already fetched up to the end, they are not counted
+        again.
+        """
+        strategies = 'exact', 'estimate', 'capped'
+        if strategy not in strategies:
+            raise ValueError('invalid strategy: {}. Must be one of {}'.format(
+                strategy, strategies))
+        key = (strategy, cap) if strategy == 'capped' else strategy
+        total = self.shared.counts.get(key)
+        if total is None and strategy != 'capped':
+            total = self.shared.get_total()
+        if total is None:
+            query, args = self._get_base_query(counting=True)
+            with stage(self.model, 'execute') as info, statement_timeout():
+                if strategy == 'capped':
+                    total = self._count_capped(query, args, cap)
+                elif strategy == 'estimate':
+                    total = self._count_estimate(query, args)
+                else:
+                    total = self._count_exact(query, args)
+                if info is not None:
+                    info['kind'] = 'count'
+                    info['rows'] = total
+            self.shared.counts[key] = total
+
+        count = max(0, total-self.offset)
+        if self.limit is not None:
+            count = min(count, self.limit)
+        if strategy == 'capped':
+            return CappedCount(count, capped=total.capped and
+                               (self.limit is None or count < self.limit))
+        return count
+
+    def __len__(self):
+        # Note that list() calls this before iterating. Rows that were
+        # already fetched are not counted again. Otherwise, the rows of a
+        # slice are counted with the 'capped' strategy, which stops at the
+        # end of the slice.
+        if self.result_cache is not None:
+            return len(self.result_cache)
+        if self.count_cache is None:
+            rows = self.shared.get_rows(self.offset, self.limit)
+            if rows is not None:
+                self.count_cache = len(rows)
+            elif self.limit is None \
+                    or 'exact' in self.shared.counts \
+                    or self.shared.get_total() is not None:
+                self.count_cache = self.get_count()
+            else:
+                cap = self.offset+self.limit
+                self.count_cache = int(self.get_count('capped', cap=cap))
         return self.count_cache
 
     count = property(__len__) # For better compatibility to Django's QuerySet
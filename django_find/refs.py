@@ -1,7 +1,10 @@
-from copy import copy
-from itertools import chain
+import heapq
+from itertools import chain, count
+from django.core.signals import setting_changed
 from django.db import models
 from django.db.models.fields.related import ManyToOneRel, ManyToManyRel
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
 
 
 def _get_joining_columns(field, reverse=False):
@@ -65,7 +68,7 @@ def parent_classes(cls):
             parents.append(field.remote_field.model)
     return parents
 
-def get_field_to(cls, target_cls):
+def _get_field_to(cls, target_cls):
     for field in cls._meta.get_fields():
         if not isinstance(field, (models.ForeignKey, models.ManyToManyField)):
             continue
@@ -73,39 +76,110 @@ def get_field_to(cls, target_cls):
             return field
     return None
 
-def get_object_vector_to(cls, search_cls, subtype, avoid=None):
+class ModelGraph(object):
     """
-    Returns a list of all possible paths to the given class.
-    Only searches classes that are subtype of the given class.
+    A memoized view on the relations between models.
+
+    The neighbours of a model, the fields connecting two models, and the
+    paths found by get_object_vector_to() and get_object_vector_for() are
+    computed once and then served from memory. The graph is cleared
+    whenever a model class is created or the settings change.
     """
-    # Does the name point to this class? Then we are done.
-    if search_cls == cls:
-        return [(cls,)]
 
-    # Avoid endless recursion.
-    if avoid is None:
-        avoid = set()
-    else:
-        avoid = copy(avoid)
-    avoid.add(cls)
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.neighbours = {}
+        self.fields_to = {}
+        self.vectors_to = {}
+        self.vectors_for = {}
+
+    def get_neighbours(self, cls):
+        """
+        Returns the children of cls, followed by its parents.
+        """
+        neighbours = self.neighbours.get(cls)
+        if neighbours is None:
+            neighbours = tuple(chain(child_classes(cls), parent_classes(cls)))
+            self.neighbours[cls] = neighbours
+        return neighbours
+
+    def get_field_to(self, cls, target_cls):
+        key = cls, target_cls
+        try:
+            return self.fields_to[key]
+        except KeyError:
+            field = self.fields_to[key] = _get_field_to(cls, target_cls)
+            return field
+
+graph = ModelGraph()
 
-    # So the name does not point to this class. Delegate the request to
-    # each of our connected classes, collecting all possible paths.
+def clear_cache():
+    """
+    Drops all memoized relations and join paths.
+    """
+    graph.clear()
+
+@receiver(class_prepared)
+def _on_class_prepared(sender, **kwargs):
+    clear_cache()
+
+@receiver(setting_changed)
+def _on_setting_changed(sender, **kwargs):
+    clear_cache()
+
+def get_field_to(cls, target_cls):
+    """
+    Returns the ForeignKey or ManyToManyField of cls that references
+    target_cls, or None.
+    """
+    return graph.get_field_to(cls, target_cls)
+
+def _find_vectors_to(cls, search_cls, subtype, avoid):
+    # Depth-first walk over all simple paths starting at cls, in the order
+    # of ModelGraph.get_neighbours(). Only classes that are a subtype of
+    # the given class are passed through; search_cls itself may be any
+    # class.
+    if search_cls == cls:
+        return [(cls,)]
     path_list = []
-    for thecls in chain(child_classes(cls), parent_classes(cls)):
-        if thecls in avoid:
+    path = [cls]
+    on_path = set(avoid)
+    on_path.add(cls)
+    stack = [iter(graph.get_neighbours(cls))]
+    while stack:
+        thecls = next(stack[-1], None)
+        if thecls is None:
+            stack.pop()
+            on_path.discard(path.pop())
             continue
-        if subtype in thecls.__mro__:
-            child_path_list = get_object_vector_to(thecls, search_cls, subtype, copy(avoid))
-        elif thecls == search_cls:
-            child_path_list = [(thecls,)]
-        else:
+        if thecls in on_path:
             continue
-        for path in child_path_list:
-            path_list.append((cls,)+path)
+        if thecls == search_cls:
+            path_list.append(tuple(path)+(thecls,))
+        elif subtype in thecls.__mro__:
+            path.append(thecls)
+            on_path.add(thecls)
+            stack.append(iter(graph.get_neighbours(thecls)))
     path_list.sort(key=len)
     return path_list
 
+def get_object_vector_to(cls, search_cls, subtype, avoid=None):
+    """
+    Returns a list of all possible paths to the given class.
+    Only searches classes that are subtype of the given class.
+    The result is sorted by the path length.
+    """
+    if avoid:
+        return _find_vectors_to(cls, search_cls, subtype, avoid)
+    key = cls, search_cls, subtype
+    path_list = graph.vectors_to.get(key)
+    if path_list is None:
+        path_list = _find_vectors_to(cls, search_cls, subtype, ())
+        graph.vectors_to[key] = path_list
+    return list(path_list)
+
 def yield_all_vectors(search_cls_list, subtype):
     """ 
     Yields all possible vectors between all given classes.
@@ -178,12 +252,116 @@ def count_lossy_edges(vector):
     return sum(relation_is_lossy(vector[pos], thecls)
                for pos, thecls in enumerate(vector[1:]))
 
-def get_object_vector_for(cls, search_cls_list, subtype, avoid=None):
+def get_object_vector_for(cls, search_cls_list, subtype, avoid=None,
+                          strategy='all', max_depth=None):
     """
     Like get_object_vector_to(), but returns a single vector that reaches
     all of the given classes, if it exists.
     Only searches classes that are subtype of the given class.
+    The result is memoized per list of classes.
+
+    The strategy selects how the vector is found:
+
+    - ``'all'`` enumerates every path between the given classes, and
+      then picks the best one. This is exhaustive, but its cost grows
+      exponentially with the density of the model graph.
+    - ``'shortest'`` runs a best-first search that stops as soon as the
+      cheapest vector is known, see find_shortest_vector_for().
+
+    max_depth limits the number of joins of the vector found by the
+    ``'shortest'`` strategy; None means no limit.
+    """
+    if strategy not in ('all', 'shortest'):
+        raise ValueError('invalid strategy: {}'.format(strategy))
+    key = tuple(search_cls_list), subtype, strategy, max_depth
+    try:
+        return graph.vectors_for[key]
+    except KeyError:
+        pass
+    if strategy == 'shortest':
+        vector = find_shortest_vector_for(search_cls_list, subtype, max_depth)
+    else:
+        vector = _find_vector_for(list(search_cls_list), subtype)
+    graph.vectors_for[key] = vector
+    return vector
+
+def find_shortest_vector_for(search_cls_list, subtype, max_depth=None):
+    """
+    Returns the cheapest vector that connects all of the given classes,
+    or None if there is no such vector within max_depth joins.
+
+    The cost of a vector is ordered like in get_object_vector_for():
+    by the position of the primary (=first) class, then by the length,
+    then by the number of lossy edges. Among the vectors of the lowest
+    position and length, one that visits the classes in the requested
+    order is preferred.
+
+    Partial paths are expanded in the order of a lower bound of that
+    cost, which never decreases as a path grows. The search can
+    therefore stop at the first complete vector, instead of
+    materializing every path through the graph.
     """
+    primary_cls = search_cls_list[0]
+    targets = frozenset(search_cls_list)
+    counter = count()
+    heap = []
+
+    def push(path, lossy):
+        try:
+            pos = path.index(primary_cls)
+        except ValueError:
+            pos = len(path)
+        heapq.heappush(heap, ((pos, len(path), lossy), next(counter), path))
+
+    def is_complete(path):
+        return path[-1] in targets and targets.issubset(path)
+
+    def is_ordered(path):
+        return [c for c in path if c in targets] == search_cls_list
+
+    for thecls in search_cls_list:
+        push((thecls,), 0)
+
+    # Collect the complete vectors of the cheapest (position, length) tier.
+    tier = None
+    candidates = []
+    while heap:
+        (pos, length, lossy), _, path = heapq.heappop(heap)
+        if tier is not None and (pos, length) != tier:
+            break
+        if is_complete(path):
+            tier = pos, length
+            candidates.append((lossy, path))
+            continue
+        if max_depth is not None and length > max_depth:
+            continue
+        last_cls = path[-1]
+        if length > 1 and subtype not in last_cls.__mro__:
+            continue  # Only the endpoints may be of another type.
+        for thecls in graph.get_neighbours(last_cls):
+            if thecls in path:
+                continue
+            if thecls not in targets and subtype not in thecls.__mro__:
+                continue
+            push(path+(thecls,), lossy+relation_is_lossy(last_cls, thecls))
+
+    if not candidates:
+        return None
+
+    # Break ties the way get_object_vector_for() enumerates its paths:
+    # by the position of the end class, then of the start class.
+    def sort_key(candidate):
+        lossy, path = candidate
+        return (lossy,
+                search_cls_list.index(path[-1]),
+                search_cls_list.index(path[0]))
+    candidates.sort(key=sort_key)
+    for lossy, path in candidates:
+        if is_ordered(path):
+            return path
+    return candidates[0][1]
+
+def _find_vector_for(search_cls_list, subtype):
     vectors = list(yield_all_vectors(search_cls_list, subtype))
     matching = list(yield_matching_vectors(vectors, search_cls_list))
     if not matching:
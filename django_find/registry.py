@@ -0,0 +1,64 @@
+"""
+An index of all Searchable models, keyed by class name and app label.
+"""
+from django.db.models.signals import class_prepared
+from .refs import get_subclasses
+
+class ModelRegistry(object):
+    """
+    Maps short class names (e.g. ``"Author"``) and Django app labels
+    (e.g. ``"myapp.Author"``) to the subclasses of the given base class.
+
+    The registry is populated from the existing subclasses once (see
+    :meth:`populate`, called by ``AppConfig.ready()``), and kept current
+    by listening to Django's ``class_prepared`` signal.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.by_label = {}
+        self.by_name = {}
+        self.populated = False
+
+    def register(self, model):
+        if model.__module__ == '__fake__':
+            return  # Historical models created by migrations.
+        label = model._meta.label
+        old = self.by_label.get(label)
+        if old is not None:
+            self.by_name[old.__name__].remove(old)
+        self.by_label[label] = model
+        self.by_name.setdefault(model.__name__, []).append(model)
+
+    def populate(self):
+        """
+        Registers all existing subclasses of the base class, and starts
+        listening for models that are created later on.
+        """
+        if self.populated:
+            return
+        for model in get_subclasses(self.base):
+            if hasattr(model, '_meta'):
+                self.register(model)
+        class_prepared.connect(self._on_class_prepared)
+        self.populated = True
+
+    def _on_class_prepared(self, sender, **kwargs):
+        if issubclass(sender, self.base):
+            self.register(sender)
+
+    def get_by_label(self, label):
+        """
+        Returns the model with the given app label, or None.
+        """
+        if not self.populated:
+            self.populate()
+        return self.by_label.get(label)
+
+    def get_by_name(self, name):
+        """
+        Returns a list of all models that have the given class name.
+        """
+        if not self.populated:
+            self.populate()
+        return self.by_name.get(name, [])
@@ -0,0 +1,276 @@
+"""
+Rewrites query DOMs into equivalent ones that are cheaper to evaluate.
+"""
+from collections import OrderedDict
+from .dom import Group, And, Or, Not, Term
+
+#: Field types whose 'equals' terms are merged into a single 'in' term.
+#: 'in' compares exactly, so LCSTR fields (which compare ignoring the
+#: case) are not included.
+in_types = 'INT', 'STR'
+
+#: Field types whose 'gte' and 'lte' terms are merged into a 'between' term.
+between_types = 'INT', 'DATE', 'DATETIME'
+
+def _is_any(node):
+    return isinstance(node, Term) and node.operator == 'any'
+
+#: Field types whose terms never serialize to a neutral term.
+text_types = 'STR', 'LCSTR', 'JSON'
+
+def _is_valid(db_type, value):
+    if db_type != 'INT':
+        return True
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+def model_resolver(model):
+    """
+    Returns a function for Rewriter that resolves the term names of a
+    query on the given Searchable model to the selector and the type of
+    the field.
+    """
+    def resolve(name):
+        try:
+            target, alias = model.get_class_from_fullname(name)
+            handler = target.get_field_handler_from_alias(alias)
+            selector = model.get_selector_from_fullname(name)
+        except Exception:
+            return None
+        if isinstance(selector, list):
+            selector = tuple(selector)
+        return selector, handler.db_type
+    return resolve
+
+class Rewriter(object):
+    """
+    Rewrites a DOM into an equivalent one. The following rules are
+    applied, children first:
+
+    - Duplicate terms in And and Or groups are removed.
+    - 'any' terms are removed from And groups.
+    - 'equals' terms on the same field within an Or group are merged
+      into one 'in' term (on INT and STR fields only, as 'in' compares
+      exactly).
+    - A 'gte' and an 'lte' term on the same field within an And group
+      are merged into one 'between' term, unless the alias refers to
+      several fields: each term matches if any of the fields does, so
+      the bounds may be met by different fields.
+    - Terms that appear in every branch of an Or group are factored out,
+      e.g. (a and b) or (a and c) becomes a and (b or c), and
+      a or (a and b) becomes a.
+
+    Terms whose value is invalid for the field type (or that may be,
+    such as dates that only the serializer parses) and 'any' terms
+    serialize to a neutral term, which the DjangoSerializer drops from
+    And and Or groups, but which the SQLSerializer compiles to a true
+    condition. So Or groups that contain such a term are not factored,
+    as the result would depend on the serializer.
+
+    resolve is a function that maps a term name to a tuple
+    (key, db_type), where terms with the same key refer to the same
+    field, or to None if the name is unknown. Without it, only terms
+    with the same name are merged, and only the rules that do not
+    depend on the field type are applied.
+    """
+
+    def __init__(self, resolve=None):
+        self.resolve = resolve
+        self.resolved = {}
+        self.neutral = {}
+
+    def _resolve(self, name):
+        result = self.resolved.get(name)
+        if result is None:
+            result = self.resolve(name) if self.resolve else None
+            if result is None:
+                result = name, None
+            self.resolved[name] = result
+        return result
+
+    def _may_be_neutral(self, node):
+        # Returns True if the node may serialize to a neutral term. The
+        # result is kept for every rewritten node (see visit()), so the
+        # children of a group are not visited again.
+        result = self.neutral.get(node)
+        if result is None:
+            if isinstance(node, Term):
+                result = self._term_may_be_neutral(node)
+            else:
+                result = any(self._may_be_neutral(c) for c in node.children)
+            self.neutral[node] = result
+        return result
+
+    def _term_may_be_neutral(self, node):
+        if node.operator == 'any':
+            return True
+        db_type = self._resolve(node.name)[1]
+        values = node.data if isinstance(node.data, tuple) else (node.data,)
+        if db_type == 'INT':
+            return not all(_is_valid(db_type, v) for v in values)
+        if db_type == 'BOOL':
+            return any(v.lower() not in ('true', 'false') for v in values)
+        return db_type not in text_types
+
+    def _term_key(self, term):
+        return self._resolve(term.name)[0], term.operator, term.data
+
+    def _dedupe(self, children):
+        seen = set()
+        result = []
+        for child in children:
+            if isinstance(child, Term):
+                key = self._term_key(child)
+                if key in seen:
+                    continue
+                seen.add(key)
+            result.append(child)
+        return result
+
+    def _make(self, cls, children, is_root=False):
+        if is_root:
+            return cls(children, is_root=True)
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+        return cls(children)
+
+    def _merge_in(self, children):
+        # Merges 'equals' (and 'in') terms on the same field into one
+        # 'in' term, at the position of the first one.
+        merged = OrderedDict()
+        result = []
+        for child in children:
+            if isinstance(child, Term) and child.operator in ('equals', 'in'):
+                key, db_type = self._resolve(child.name)
+                values = child.data if child.operator == 'in' else (child.data,)
+                if db_type in in_types \
+                        and all(_is_valid(db_type, v) for v in values):
+                    slot = merged.get(key)
+                    if slot is None:
+                        merged[key] = [len(result), child, list(values), 1]
+                        result.append(child)
+                    else:
+                        slot[2] += [v for v in values if v not in slot[2]]
+                        slot[3] += 1
+                    continue
+            result.append(child)
+        for index, first, values, count in merged.values():
+            if count > 1:
+                result[index] = Term(first.name, 'in', values)
+        return result
+
+    def _merge_between(self, children):
+        # Merges the first 'gte' and 'lte' terms on the same field into
+        # one 'between' term, at the position of the 'gte' term.
+        bounds = OrderedDict()
+        for index, child in enumerate(children):
+            if not isinstance(child, Term) \
+                    or child.operator not in ('gte', 'lte'):
+                continue
+            key, db_type = self._resolve(child.name)
+            if db_type not in between_types \
+                    or isinstance(key, tuple) \
+                    or not _is_valid(db_type, child.data):
+                continue
+            bounds.setdefault(key, {}).setdefault(child.operator, index)
+        result = list(children)
+        for ops in bounds.values():
+            if len(ops) != 2:
+                continue
+            low, high = children[ops['gte']], children[ops['lte']]
+            result[ops['gte']] = Term(low.name, 'between', (low.data, high.data))
+            result[ops['lte']] = None
+        return [c for c in result if c is not None]
+
+    def _factor(self, children):
+        # Returns the Or group of the given children with the terms that
+        # all of them have in common factored out, or None if there are
+        # none.
+        if any(self._may_be_neutral(c) for c in children):
+            return None
+        branches = [c.children if type(c) is And else (c,) for c in children]
+        common = None
+        for branch in branches:
+            keys = set(self._term_key(m) for m in branch if isinstance(m, Term))
+            common = keys if common is None else (common & keys)
+            if not common:
+                return None
+        factors = [m for m in branches[0]
+                   if isinstance(m, Term) and self._term_key(m) in common]
+        rest = []
+        for branch in branches:
+            remainder = [m for m in branch
+                         if not isinstance(m, Term) or self._term_key(m) not in common]
+            if not remainder:
+                # a or (a and b) is a.
+                return self.conjunction(And, factors)
+            rest.append(self._make(And, remainder))
+        return self.conjunction(And, factors+[self.disjunction(rest)])
+
+    def conjunction(self, cls, children, is_root=False):
+        """
+        Returns the rewritten node for an And (or Group) with the given,
+        already rewritten children.
+        """
+        flat = []
+        for child in children:
+            if type(child) is cls and not is_root:
+                flat.extend(child.children)
+            elif child is not None:
+                flat.append(child)
+        children = [c for c in flat if not _is_any(c)]
+        if not children and flat:
+            children = flat[:1]
+        children = self._dedupe(children)
+        children = self._merge_between(children)
+        return self._make(cls, children, is_root)
+
+    def disjunction(self, children):
+        """
+        Returns the rewritten node for an Or with the given, already
+        rewritten children.
+        """
+        flat = []
+        for child in children:
+            if type(child) is Or:
+                flat.extend(child.children)
+            elif child is not None:
+                flat.append(child)
+        children = self._dedupe(flat)
+        children = self._merge_in(children)
+        if len(children) > 1:
+            factored = self._factor(children)
+            if factored is not None:
+                return factored
+        return self._make(Or, children)
+
+    def visit(self, node, children):
+        result = self._visit(node, children)
+        if result is not None:
+            self._may_be_neutral(result)
+        return result
+
+    def _visit(self, node, children):
+        if isinstance(node, Term):
+            return node
+        if isinstance(node, Not):
+            children = [c for c in children if c is not None]
+            return Not(children, is_root=node.is_root) if children else None
+        if isinstance(node, Or):
+            return self.disjunction(children)
+        return self.conjunction(type(node), children, node.is_root)
+
+    def rewrite(self, dom):
+        return dom.accept(self.visit)
+
+def rewrite(dom, resolve=None):
+    """
+    Returns an equivalent, rewritten copy of the given DOM. See Rewriter.
+    The given DOM is not modified.
+    """
+    return Rewriter(resolve).rewrite(dom)
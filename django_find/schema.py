@@ -0,0 +1,123 @@
+"""
+Precompiled, per-model search schema.
+
+Resolving an alias requires merging the model's default fields with its
+``searchable`` definition and walking ``Model._meta`` for every selector.
+The result is computed once per model and kept in a :class:`SearchSchema`,
+which is rebuilt when the app registry, the settings or the handler
+registry change, or when the ``searchable``, ``searchable_labels`` or
+``searchable_fulltext`` attribute of the model is assigned a new value.
+Modifying these attributes in place is not detected.
+"""
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist
+from django.core.signals import setting_changed
+from django.db import models
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
+from django.utils.translation import get_language
+from .choices import ChoiceIndex
+from .fulltext import fulltext_types, fulltext_field_types
+from .handlers import type_registry
+
+_schemas = {}
+
+def _definition(model):
+    # The attributes of the model that the schema is built from.
+    return (getattr(model, 'searchable', None),
+            getattr(model, 'searchable_labels', None),
+            getattr(model, 'searchable_fulltext', None))
+
+def _first_selector(selector):
+    if isinstance(selector, (list, tuple)):
+        return selector[0]
+    return selector
+
+class SearchSchema(object):
+    """
+    The search metadata of one Searchable model, resolved once.
+
+    Aliases whose selector or handler cannot be resolved are left out of
+    the lookup tables; the Searchable methods then fall back to resolving
+    them the slow way, which raises the same errors as before.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.registry_version = type_registry.version
+        self.definition = _definition(model)
+        self.searchable = tuple(model.get_searchable())
+        self.selectors = OrderedDict(self.searchable)
+        self.aliases = tuple(self.selectors)
+        self.fields = {}
+        self.handlers = {}
+        self.captions = {}
+        self.json_aliases = frozenset()
+        self.choice_indexes = {}
+
+        json_aliases = set()
+        for alias, selector in self.searchable:
+            try:
+                field = model.get_field_from_selector(_first_selector(selector))[1]
+            except FieldDoesNotExist:
+                continue
+            self.fields[alias] = field
+            if isinstance(field, models.JSONField):
+                json_aliases.add(alias)
+            self.captions[alias] = model.get_caption_from_selector(selector)
+            try:
+                self.handlers[alias] = model.get_field_handler_from_field(field)
+            except TypeError:
+                pass
+        self.json_aliases = frozenset(json_aliases)
+
+        # Full-text search is only supported on the columns of text fields
+        # (not, for example, on IP addresses, which are searched as text).
+        self.fulltext = frozenset(
+            alias for alias in model.searchable_fulltext
+            if isinstance(self.fields.get(alias), fulltext_field_types)
+            and getattr(self.handlers.get(alias), 'db_type', None) in fulltext_types)
+
+    def get_choice_index(self, alias):
+        """
+        Returns a ChoiceIndex of the choices of the field with the given
+        alias, or None if the field has no choices. As the labels may be
+        translated, there is one index per language.
+        """
+        field = self.fields.get(alias)
+        if field is None or not field.choices:
+            return None
+        key = alias, get_language()
+        index = self.choice_indexes.get(key)
+        if index is None:
+            index = self.choice_indexes[key] = ChoiceIndex(field.flatchoices)
+        return index
+
+    def is_current(self):
+        if self.registry_version != type_registry.version:
+            return False
+        definition = _definition(self.model)
+        return all(a is b for a, b in zip(self.definition, definition))
+
+def get_schema(model):
+    """
+    Returns the SearchSchema of the given model, building it on first use.
+    """
+    schema = _schemas.get(model)
+    if schema is None or not schema.is_current():
+        schema = _schemas[model] = SearchSchema(model)
+    return schema
+
+def clear_cache():
+    """
+    Drops all cached schemas; they are rebuilt on next use.
+    """
+    _schemas.clear()
+
+@receiver(class_prepared)
+def _on_class_prepared(sender, **kwargs):
+    clear_cache()
+
+@receiver(setting_changed)
+def _on_setting_changed(sender, **kwargs):
+    clear_cache()
@@ -1,6 +1,9 @@
 
 from functools import reduce
+from django.db import connection
 from django.db.models import Q
+from ..fulltext import fulltext_types
+from ..trigram import trigram_operators, use_ilike
 from .serializer import Serializer
 from .util import parse_date, parse_datetime
 
@@ -44,7 +47,24 @@ class DjangoSerializer(Serializer):
         value = data.lower() == 'true'
         return Q(**{selector: value})
 
+    def between_term(self, func, selector, data):
+        return self.logical_and([func(selector, 'gte', data[0]),
+                                 func(selector, 'lte', data[1])])
+
     def int_term(self, selector, operator, data):
+        if operator == 'in':
+            values = []
+            for value in data:
+                try:
+                    values.append(int(value))
+                except ValueError:
+                    pass
+            return Q(**{selector+'__in': values}) if values else Q()
+        if operator == 'between':
+            try:
+                return Q(**{selector+'__range': (int(data[0]), int(data[1]))})
+            except ValueError:
+                return self.between_term(self.int_term, selector, data)
         try:
             value = int(data)
         except ValueError:
@@ -55,11 +75,19 @@ class DjangoSerializer(Serializer):
         return Q(**{selector+'__'+operator: value})
 
     def str_term(self, selector, operator, data):
+        if operator == 'in':
+            return Q(**{selector+'__in': list(data)})
+        if operator == 'search':
+            return Q(**{selector+'__find_search': data})
         operator = str_op_map.get(operator, operator)
         return Q(**{selector+'__'+operator: data})
 
     def lcstr_term(self, selector, operator, data):
+        if operator in ('in', 'search'):
+            return self.str_term(selector, operator, data)
         operator = str_op_map.get(operator, operator)
+        if operator in trigram_operators and use_ilike(connection.vendor):
+            return Q(**{selector+'__find_i'+operator: data})
         return Q(**{selector+'__i'+operator: data})
 
     def date_datetime_common(self, selector, operator, thedatetime):
@@ -73,10 +101,14 @@ class DjangoSerializer(Serializer):
         return Q(**{selector+'__'+operator: thedatetime})
 
     def date_term(self, selector, operator, data):
+        if operator == 'between':
+            return self.between_term(self.date_term, selector, data)
         thedate = parse_date(data)
         return self.date_datetime_common(selector, operator, thedate)
 
     def datetime_term(self, selector, operator, data):
+        if operator == 'between':
+            return self.between_term(self.datetime_term, selector, data)
         thedatetime = parse_datetime(data)
         result = self.date_datetime_common(selector, operator, thedatetime)
         if operator != 'equals' or not result:
@@ -99,7 +131,12 @@ class DjangoSerializer(Serializer):
         cls, alias = self.model.get_class_from_fullname(name)
         handler = cls.get_field_handler_from_alias(alias)
         selector = self.model.get_selector_from_fullname(name)
-        data = handler.prepare(data)
+        if operator == 'search' and handler.db_type not in fulltext_types:
+            operator = 'contains'
+        if isinstance(data, tuple):
+            data = tuple(handler.prepare(d) for d in data)
+        else:
+            data = handler.prepare(data)
 
         type_map = {'BOOL': self.boolean_term,
                     'INT': self.int_term,
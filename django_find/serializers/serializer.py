@@ -4,6 +4,15 @@ class Serializer(object):
     Base class for all serializers.
     """
 
+    def visit(self, node, results):
+        """
+        Called for every node of the DOM, children first, with the
+        serialized children of the node. See Node.accept(). The DOM node
+        classes implement serialize_node(), which returns the serialized
+        node.
+        """
+        return node.serialize_node(self, results)
+
     def logical_root_group(self, root_group, terms):
         return self.logical_group(terms)
 
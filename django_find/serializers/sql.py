@@ -1,6 +1,14 @@
 from builtins import str
 from collections import defaultdict, OrderedDict
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
+from ..cache import get_cache
+from ..fulltext import fulltext_types, search_condition, search_value
+from ..limits import check_joins
 from ..refs import get_join_for
+from ..signals import stage
+from ..trigram import trigram_operators, use_ilike
 from .serializer import Serializer
 from .util import parse_date, parse_datetime
 
@@ -24,39 +32,54 @@ date_op_map = {
     'endswith': 'lte'
 }
 
+# Maps each operator to the SQL condition and to the format of the
+# bound argument.
 operator_map = {
-    'equals': "='{}'",
-    'iequals': " LIKE '{}'",
-    'lt': "<'{}'",
-    'lte': "<='{}'",
-    'gt': ">'{}'",
-    'gte': ">='{}'",
-    'startswith': " LIKE '{}%%'",
-    'endswith': " LIKE '%%{}'",
-    'contains': " LIKE '%%{}%%'",
-    'regex': " RLIKE '{}'"
+    'equals': ('=%s', '{}'),
+    'iequals': (' LIKE %s', '{}'),
+    'lt': ('<%s', '{}'),
+    'lte': ('<=%s', '{}'),
+    'gt': ('>%s', '{}'),
+    'gte': ('>=%s', '{}'),
+    'startswith': (' LIKE %s', '{}%'),
+    'endswith': (' LIKE %s', '%{}'),
+    'contains': (' LIKE %s', '%{}%'),
+    'istartswith': (' ILIKE %s', '{}%'),
+    'iendswith': (' ILIKE %s', '%{}'),
+    'icontains': (' ILIKE %s', '%{}%'),
+    'regex': (' RLIKE %s', '{}')
 }
 
 def _mkcol(tbl, name, alias):
     return tbl+'.'+name+' '+tbl+'_'+alias
 
 def _mk_condition(db_column, operator, data):
-    op = operator_map.get(operator)
-    if not op:
+    """
+    Returns a tuple (condition, args), where condition is an SQL
+    expression with a placeholder for each of the given arguments.
+    """
+    if operator == 'in':
+        return db_column+' IN ('+', '.join(['%s']*len(data))+')', list(data)
+    if operator == 'between':
+        return db_column+' BETWEEN %s AND %s', list(data)
+    try:
+        op, arg_format = operator_map[operator]
+    except KeyError:
         raise Exception('unsupported operator:' + str(operator))
 
-    # I would prefer to use a prepared statement, but collecting arguments
-    # and passing them back along the string everywhere would be awful design.
-    # (Also, I didn't find any API from Django to generate a prepared statement
-    # without already executing it, e.g. django.db.connection.execute())
-    if isinstance(data, int):
-        return db_column+op.format(data)
-    elif isinstance(data, bytes):
+    if isinstance(data, bytes):
         data = data.decode('utf-8')
-    return db_column+op.format(data)
+    if arg_format != '{}':
+        data = arg_format.format(data)
+    return db_column+op, [data]
+
+@receiver(class_prepared)
+def _on_class_prepared(sender, **kwargs):
+    get_cache('SQL').clear()
 
 class SQLSerializer(Serializer):
-    def __init__(self, model, mode='SELECT', fullnames=None, extra_model=None):
+    def __init__(self, model, mode='SELECT', fullnames=None, extra_model=None,
+                 using=None):
         modes = 'SELECT', 'WHERE'
         if mode not in modes:
             raise AttributeError('invalid mode: {}. Must be one of {}'.format(mode, modes))
@@ -65,18 +88,43 @@ class SQLSerializer(Serializer):
         self.mode = mode
         self.fullnames = fullnames
         self.extra_model = extra_model
+        # The vendor of the database that runs the statement, for the
+        # conditions that are not portable.
+        self.vendor = connections[using or DEFAULT_DB_ALIAS].vendor
+        self.args = []
+
+    def _condition(self, db_column, operator, data):
+        # Conditions are created in the same order in which they end up
+        # in the statement, so the arguments can simply be collected.
+        condition, args = _mk_condition(db_column, operator, data)
+        self.args += args
+        return condition
 
     def _create_db_column_list(self, dom):
         fullnames = self.fullnames if self.fullnames else dom.get_term_names()
         result = []
-        for fullname in fullnames:
-            model, alias = self.model.get_class_from_fullname(fullname)
-            selector = model.get_selector_from_alias(alias)
-            target_model, field = model.get_field_from_selector(selector)
-            result.append((target_model, target_model._meta.db_table, field.column))
+        with stage(self.model, 'resolve') as info:
+            for fullname in fullnames:
+                model, alias = self.model.get_class_from_fullname(fullname)
+                selector = model.get_selector_from_alias(alias)
+                target_model, field = model.get_field_from_selector(selector)
+                result.append((target_model, target_model._meta.db_table, field.column))
+            if info is not None:
+                info['columns'] = len(result)
         return result
 
     def _create_select(self, fields):
+        # The SELECT ... FROM ... JOIN part only depends on the selected
+        # columns, so it is compiled once per column list.
+        key = self.model, tuple(fields), self.extra_model
+        cache = get_cache('SQL')
+        select = cache.get(key)
+        if select is None:
+            select = self._compile_select(fields)
+            cache.set(key, select)
+        return select
+
+    def _compile_select(self, fields):
         # Create the "SELECT DISTINCT table1.col1, table2.col2, ..."
         # part of the SQL.
         col_numbers = defaultdict(int)
@@ -98,8 +146,12 @@ class SQLSerializer(Serializer):
         target_models = [r[0] for r in fullfields]
         if self.extra_model:
             target_models.append(self.extra_model)
-        vector = self.model.get_object_vector_for(target_models)
-        join_path = get_join_for(vector)
+        with stage(self.model, 'plan') as info:
+            vector = self.model.get_object_vector_for(target_models)
+            join_path = get_join_for(vector)
+            if info is not None:
+                info['joins'] = len(join_path)-1
+        check_joins(len(join_path)-1)
 
         # Create the "table1 LEFT JOIN table2 ON table1.col1=table2.col1"
         # part of the SQL.
@@ -124,7 +176,8 @@ class SQLSerializer(Serializer):
             select += where
         else:
             select += '('+where+')'
-        return select, []
+        args, self.args = self.args, []
+        return select, args
 
     def logical_group(self, terms):
         terms = [t for t in terms if t]
@@ -152,50 +205,90 @@ class SQLSerializer(Serializer):
         return 'NOT ' + self.logical_and(terms)
 
     def boolean_term(self, db_column, operator, data):
-        value = 'TRUE' if data.lower() == 'true' else 'FALSE'
-        return _mk_condition(db_column, operator, value)
+        value = data.lower() == 'true'
+        return self._condition(db_column, operator, value)
+
+    def between_term(self, func, db_column, data):
+        return self.logical_and([func(db_column, 'gte', data[0]),
+                                 func(db_column, 'lte', data[1])])
 
     def int_term(self, db_column, operator, data):
+        if operator in ('in', 'between'):
+            try:
+                values = [int(v) for v in data]
+            except ValueError:
+                if operator == 'between':
+                    return self.between_term(self.int_term, db_column, data)
+                return self.logical_or(self.int_term(db_column, 'equals', v)
+                                       for v in data)
+            return self._condition(db_column, operator, values)
         try:
             value = int(data)
         except ValueError:
             return '1'
         operator = int_op_map.get(operator, operator)
-        return _mk_condition(db_column, operator, value)
+        return self._condition(db_column, operator, value)
 
     def str_term(self, db_column, operator, data):
         operator = str_op_map.get(operator, operator)
-        return _mk_condition(db_column, operator, data)
+        return self._condition(db_column, operator, data)
 
     def lcstr_term(self, db_column, operator, data):
+        if operator == 'in':
+            return self.str_term(db_column, operator, data)
         operator = str_op_map.get(operator, operator)
+        if operator in trigram_operators and use_ilike(self.vendor):
+            return self._condition(db_column, 'i'+operator, data)
         if operator == 'equals':
             operator = 'iequals'
-        return _mk_condition(db_column, operator, data.lower())
+        return self._condition(db_column, operator, data.lower())
+
+    def search_term(self, model, field, db_column, data):
+        table = model._meta.db_table
+        pk = table+'.'+model._meta.pk.column
+        condition = search_condition(self.vendor, db_column, pk,
+                                     table, field.column)
+        if condition is None:
+            return self.lcstr_term(db_column, 'contains', data)
+        self.args.append(search_value(self.vendor, data))
+        return condition
 
     def date_datetime_common(self, db_column, operator, thedatetime):
         if not thedatetime:
             return ''
         operator = date_op_map.get(operator, operator)
-        return _mk_condition(db_column, operator, thedatetime.isoformat())
+        return self._condition(db_column, operator, thedatetime.isoformat())
+
+    def date_between_term(self, func, parse, db_column, data):
+        values = [parse(v) for v in data]
+        if not all(values):
+            return self.between_term(func, db_column, data)
+        return self._condition(db_column, 'between',
+                               [v.isoformat() for v in values])
 
     def date_term(self, db_column, operator, data):
+        if operator == 'between':
+            return self.date_between_term(self.date_term, parse_date,
+                                          db_column, data)
         thedate = parse_date(data)
         return self.date_datetime_common(db_column, operator, thedate)
 
     def datetime_term(self, db_column, operator, data):
+        if operator == 'between':
+            return self.date_between_term(self.datetime_term, parse_datetime,
+                                          db_column, data)
         thedatetime = parse_datetime(data)
         return self.date_datetime_common(db_column, operator, thedatetime)
 
     def json_term(self, db_column, operator, data, json_path):
         if json_path:
-            column = "JSON_EXTRACT({}, '$.{}')".format(db_column,
-                                                       json_path.replace('__', '.'))
+            column = "JSON_EXTRACT({}, %s)".format(db_column)
+            self.args.append('$.'+json_path.replace('__', '.'))
         else:
             column = db_column
         # Match the JSON document/value as a substring; this is portable
         # across SQLite and MySQL (both store JSON as text and support LIKE).
-        return _mk_condition(column, 'contains', data)
+        return self._condition(column, 'contains', data)
 
     @staticmethod
     def _json_path_from_selector(selector, field):
@@ -220,7 +313,15 @@ class SQLSerializer(Serializer):
         db_column = target_model._meta.db_table + '.' + field.column
         handler = model.get_field_handler_from_alias(alias)
 
-        if handler.db_type == 'JSON':
+        if operator == 'search':
+            if handler.db_type in fulltext_types:
+                return self.search_term(target_model, field, db_column,
+                                        handler.prepare(data))
+            operator = 'contains'
+
+        # The alias may carry a JSON key path, e.g. metadata__loan_id.
+        json_aliases = model.get_schema().json_aliases
+        if alias in json_aliases or alias.split('__', 1)[0] in json_aliases:
             json_path = self._json_path_from_selector(selector, field)
             return self.json_term(db_column, operator,
                                   handler.prepare(data), json_path)
@@ -235,4 +336,8 @@ class SQLSerializer(Serializer):
         func = type_map.get(handler.db_type)
         if not func:
             raise TypeError('unsupported field type: '+repr(handler.db_type))
-        return func(db_column, operator, handler.prepare(data))
+        if isinstance(data, tuple):
+            data = tuple(handler.prepare(d) for d in data)
+        else:
+            data = handler.prepare(data)
+        return func(db_column, operator, data)
@@ -1,15 +1,54 @@
-from dateparser import parse
+from datetime import datetime
+from ..cache import get_cache
+from ..conf import get_setting
 
 DATEPARSER_SETTING = {
     'TIMEZONE': 'UTC',
     'STRICT_PARSING': True
 }
 
+_missing = object()
+
+def parse(thedate, settings=None):
+    # dateparser takes long to import, so it is only imported when a date
+    # can not be parsed otherwise.
+    from dateparser import parse
+    return parse(thedate, settings=settings)
+
+def _parse_fast(thedate):
+    # ISO 8601, and the formats in the DATE_FORMATS setting, are parsed
+    # without involving dateparser.
+    try:
+        return datetime.fromisoformat(thedate)
+    except ValueError:
+        pass
+    for date_format in get_setting('DATE_FORMATS'):
+        try:
+            return datetime.strptime(thedate, date_format)
+        except ValueError:
+            pass
+    return None
+
+def _parse(thedate):
+    thedate = thedate.strip()
+    thedatetime = _parse_fast(thedate)
+    if thedatetime is not None:
+        return thedatetime
+
+    # dateparser is slow, so its results are cached.
+    cache = get_cache('DATE')
+    thedatetime = cache.get(thedate, _missing)
+    if thedatetime is _missing:
+        settings = get_setting('DATEPARSER_SETTINGS')
+        thedatetime = parse(thedate, settings=settings)
+        cache.set(thedate, thedatetime)
+    return thedatetime
+
 def parse_date(thedate):
-    thedatetime = parse(thedate)
+    thedatetime = _parse(thedate)
     if not thedatetime:
         return None
     return thedatetime.date()
 
 def parse_datetime(thedate):
-    return parse(thedate)
+    return _parse(thedate)
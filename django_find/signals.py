@@ -0,0 +1,79 @@
+"""
+Signals for instrumenting the search pipeline.
+"""
+from time import perf_counter
+from django.dispatch import Signal
+
+#: Sent when a stage of the search pipeline is done. The sender is the
+#: Searchable model, and the arguments are:
+#:
+#: - ``stage``: the name of the stage, see below.
+#: - ``duration``: the time spent in the stage, in seconds.
+#: - ``error``: the exception that ended the stage, or None.
+#:
+#: plus the following, stage specific arguments:
+#:
+#: - ``'parse'``: tokenizing and parsing a query into a DOM, in
+#:   Searchable.dom_from_query(). Arguments: ``query``, ``terms``.
+#: - ``'optimize'``: rewriting the DOM (see rewrite.rewrite()).
+#:   Arguments: ``terms``, the number of terms after the rewrite.
+#: - ``'compile'``: serializing the DOM into a Q object or into SQL.
+#:   Arguments: ``target`` (``'q'`` or ``'sql'``), and for SQL, ``joins``.
+#: - ``'resolve'``: resolving the selected fullnames to columns, while
+#:   compiling SQL. Arguments: ``columns``.
+#: - ``'plan'``: finding the join path, while compiling SQL. This is
+#:   skipped when the statement is cached. Arguments: ``joins``.
+#: - ``'execute'``: running a PaginatedRawQuerySet. Arguments: ``kind``
+#:   (``'fetch'``, ``'iterator'`` or ``'count'``), and ``rows``, the
+#:   number of rows fetched or counted.
+#:
+#: The 'resolve' and 'plan' stages are part of the 'compile' stage. When
+#: nobody is connected to the signal, the stages are not measured.
+search_stage = Signal()
+
+class _Stage(object):
+    __slots__ = 'sender', 'name', 'info', 'start'
+
+    def __init__(self, sender, name):
+        self.sender = sender
+        self.name = name
+        self.info = {}
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self.info
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = perf_counter()-self.start
+        search_stage.send(self.sender,
+                          stage=self.name,
+                          duration=duration,
+                          error=exc if isinstance(exc, Exception) else None,
+                          **self.info)
+        return False
+
+class _NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_null_stage = _NullStage()
+
+def stage(sender, name):
+    """
+    Returns a context manager that measures the code it wraps as the
+    stage with the given name, and sends search_stage when it is done.
+    The context manager returns a dict, whose entries are sent as
+    additional arguments of the signal.
+
+    If nobody is connected to search_stage, nothing is measured and the
+    context manager returns None instead of a dict, so the caller can
+    skip computing the arguments.
+    """
+    if not search_stage.receivers:
+        return _null_stage
+    return _Stage(sender, name)
@@ -1,6 +1,10 @@
 
 
 class Node(object):
+    # Children are stored in a list while the tree is built, and in a
+    # tuple once it is optimized.
+    __slots__ = ('is_root', 'children')
+
     def __init__(self, children=None, is_root=False):
         if isinstance(children, Node):
             children = [children]
@@ -16,28 +20,104 @@ class Node(object):
         return False
 
     def add(self, child):
+        if isinstance(self.children, tuple):
+            self.children = list(self.children)
         self.children.append(child)
         return child
 
     def pop(self):
+        if isinstance(self.children, tuple):
+            self.children = list(self.children)
         return self.children.pop()
 
+    def dump_line(self):
+        """
+        Returns the line that represents this node (without its children)
+        in the output of dump().
+        """
+        return self.__class__.__name__ + ('(root)' if self.is_root else '')
+
     def dump(self, indent=0):
-        isroot = '(root)' if self.is_root else ''
-        result = [(indent * '  ') + self.__class__.__name__ + isroot]
-        for child in self.children:
-            result += child.dump(indent+1)
+        result = []
+        for node, depth in self.walk_depth():
+            result.append(((indent+depth) * '  ') + node.dump_line())
         if self.is_root:
             return '\n'.join(result)
         return result
 
+    def walk_depth(self):
+        """
+        Like walk(), but yields (node, depth) tuples, where depth is the
+        distance from this node.
+        """
+        stack = [(self, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            depth += 1
+            stack.extend((child, depth) for child in reversed(node.children))
+
+    def walk(self, node_type=None):
+        """
+        Yields every node in the object tree in depth-first order,
+        starting with this node. If node_type is not None, only nodes
+        with the given type are returned.
+
+        The tree is traversed without recursion, so any depth is
+        supported.
+        """
+        for node, depth in self.walk_depth():
+            if node_type is None or isinstance(node, node_type):
+                yield node
+
     def each(self, func, node_type=None):
         """
         Runs func once for every node in the object tree.
         If node_type is not None, only call func for nodes with the given
         type.
         """
-        if node_type is None or isinstance(self, node_type):
-            func(self)
-        for child in self.children:
-            child.each(func, node_type)
+        for node in self.walk(node_type):
+            func(node)
+
+    def accept(self, visitor):
+        """
+        Calls visitor(node, results) once for every node in the object
+        tree, children first, where results is the list of values
+        returned for the children of the node. Returns the value for
+        this node.
+
+        The tree is traversed without recursion, so any depth is
+        supported.
+        """
+        stack = [(self, iter(self.children), [])]
+        while True:
+            node, children, results = stack[-1]
+            for child in children:
+                if child.children:
+                    stack.append((child, iter(child.children), []))
+                    break
+                results.append(visitor(child, []))
+            else:
+                stack.pop()
+                value = visitor(node, results)
+                if not stack:
+                    return value
+                stack[-1][2].append(value)
+
+    def optimize_node(self, children):
+        """
+        Called by optimize() with the optimized children of this node;
+        returns the node that replaces this one, or None to remove it.
+        """
+        self.children = children
+        return self
+
+    def optimize(self):
+        return self.accept(lambda node, children: node.optimize_node(children))
+
+    def serialize(self, strategy):
+        """
+        Serializes the tree using the given strategy, e.g. a Serializer,
+        whose visit() method is passed to accept().
+        """
+        return self.accept(strategy.visit)
@@ -0,0 +1,109 @@
+"""
+Case-insensitive substring search that can use trigram indexes.
+
+On PostgreSQL, Django compiles case-insensitive pattern lookups such as
+``icontains`` into ``UPPER(column::text) LIKE UPPER(%s)``, which a
+``pg_trgm`` index on the column cannot serve. The serializers instead
+compile the 'contains', 'startswith' and 'endswith' terms of
+case-insensitive text fields into ``column ILIKE %s``, which is served
+by a GIN index with the ``gin_trgm_ops`` operator class on the column.
+get_trigram_indexes() returns these indexes for a Searchable model.
+
+Other databases keep using Django's lookups.
+"""
+from collections import OrderedDict
+from django.db import models
+from django.db.backends.utils import truncate_name
+from django.db.models.lookups import IContains, IStartsWith, IEndsWith
+from .handlers import type_registry
+
+#: The operators that are compiled into ILIKE on PostgreSQL.
+trigram_operators = 'contains', 'startswith', 'endswith'
+
+#: The field types whose columns can have a trigram index.
+trigram_field_types = models.CharField, models.TextField
+
+def use_ilike(vendor):
+    """
+    Returns True if case-insensitive substring searches should be
+    compiled into ILIKE on the given database vendor.
+    """
+    return vendor == 'postgresql'
+
+class _ILikeLookup(object):
+    # Uses ILIKE on the raw column, where supported, or else the
+    # lookup that this class is derived from.
+
+    def as_sql(self, compiler, connection):
+        if not use_ilike(connection.vendor) \
+                or not isinstance(self.lhs.output_field, trigram_field_types) \
+                or hasattr(self.rhs, 'as_sql') \
+                or self.bilateral_transforms:
+            return self.fallback(self.lhs, self.rhs).as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '{} ILIKE {}'.format(lhs, rhs), list(lhs_params)+list(rhs_params)
+
+class TrigramContains(_ILikeLookup, IContains):
+    lookup_name = 'find_icontains'
+    fallback = IContains
+
+class TrigramStartsWith(_ILikeLookup, IStartsWith):
+    lookup_name = 'find_istartswith'
+    fallback = IStartsWith
+
+class TrigramEndsWith(_ILikeLookup, IEndsWith):
+    lookup_name = 'find_iendswith'
+    fallback = IEndsWith
+
+# Registered on all fields, as custom field handlers may treat any field
+# as text. The fields that are not CharFields or TextFields use the
+# fallback.
+for _lookup in (TrigramContains, TrigramStartsWith, TrigramEndsWith):
+    models.Field.register_lookup(_lookup)
+
+def get_trigram_indexes(model, aliases=None):
+    """
+    Returns a list of GinIndexes with the ``gin_trgm_ops`` operator class
+    for the columns of the given Searchable model that are searched as
+    case-insensitive text by the given aliases. By default, all aliases
+    of the model are included.
+
+    Aliases that refer to fields of other models are skipped, as the
+    index belongs to the other model. The app registry need not be
+    ready, so the indexes can be added right after the model class is
+    defined::
+
+        Device._meta.indexes += get_trigram_indexes(Device)
+
+    The indexes require the ``pg_trgm`` extension; see
+    ``django.contrib.postgres.operations.TrigramExtension``.
+    """
+    searchable = OrderedDict((f.name, f.name) for f in model._meta.local_fields)
+    searchable.update(getattr(model, 'searchable', ()))
+    if aliases is None:
+        aliases = searchable
+
+    # Only needed when declaring the indexes.
+    from django.contrib.postgres.indexes import GinIndex
+
+    indexes = []
+    fields = set()
+    for alias in aliases:
+        selector = searchable.get(alias)
+        if isinstance(selector, (list, tuple)):
+            selector = selector[0]
+        if not selector or '__' in selector:
+            continue
+        field = model._meta.get_field(selector)
+        if not isinstance(field, trigram_field_types) or field.name in fields:
+            continue
+        handler = type_registry.get_handler(model, field)
+        if getattr(handler, 'db_type', None) != 'LCSTR':
+            continue
+        fields.add(field.name)
+        name = '{}_{}_trgm'.format(model._meta.db_table, field.column)
+        indexes.append(GinIndex(fields=[field.name],
+                                name=truncate_name(name, models.Index.max_name_length),
+                                opclasses=['gin_trgm_ops']))
+    return indexes
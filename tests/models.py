@@ -1,3 +1,4 @@
+import datetime
 from django.db import models
 from django_find import Searchable
 
@@ -152,6 +153,7 @@ class Library(models.Model, Searchable):
         ('format', ['copies__format', 'collections__copies__format']),
         ('shelfmark', ['copies__shelfmark', 'collections__copies__shelfmark']),
         ('metadata', ['copies__metadata', 'collections__copies__metadata']),
+        ('cid', ['copies__id', 'collections__copies__id']),
     ]
 
     class Meta:
@@ -185,3 +187,34 @@ class Copy(models.Model, Searchable):
 
     class Meta:
         app_label = 'search_tests'
+
+# Choices on fields whose terms do not support the 'in' operator.
+class Schedule(models.Model, Searchable):
+    enabled = models.BooleanField(choices=[(True, 'Enabled'), (False, 'Disabled')])
+    day = models.DateField(choices=[(datetime.date(2020, 1, 1), 'New year'),
+                                    (datetime.date(2020, 12, 24), 'Christmas')])
+
+    searchable = [
+        ('id', 'id'),
+        ('on', 'enabled'),
+        ('d', 'day'),
+    ]
+
+    class Meta:
+        app_label = 'search_tests'
+
+# ---------------------------------------------------------------------------
+# Words without a field name are searched in the title and the body of an
+# article using the full-text search of the database. Rating and ip are not
+# text fields, so they are searched as usual.
+# ---------------------------------------------------------------------------
+class Article(models.Model, Searchable):
+    title = models.CharField(max_length=50)
+    body = models.TextField()
+    rating = models.IntegerField(default=0)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+
+    searchable_fulltext = ['title', 'body', 'rating', 'ip']
+
+    class Meta:
+        app_label = 'search_tests'
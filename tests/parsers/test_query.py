@@ -78,3 +78,29 @@ class QueryParserTest(TestCase):
 
         dom = self.parser.parse(query5)
         self.assertEqual(expected_dom5, dom.dump())
+
+    def testTokenizer(self):
+        self.parser._reset()
+        self.parser.input = 'Host:"a b" OR (x)'
+        result = []
+        token, match = self.parser._get_next_token()
+        while token != 'EOF':
+            result.append((token, match.group(0)))
+            token, match = self.parser._get_next_token()
+        self.assertEqual(result, [('field', 'Host:'),
+                                  ('word', '"a b"'),
+                                  ('whitespace', ' '),
+                                  ('or', 'OR'),
+                                  ('whitespace', ' '),
+                                  ('openbracket', '('),
+                                  ('word', 'x'),
+                                  ('closebracket', ')')])
+        self.assertEqual(self.parser.offset, 17)
+
+        self.parser._reset()
+        self.parser.input = 'host:a b'
+        token, match = self.parser._get_next_token()
+        self.assertEqual((match.group(1), match.group(2)), ('host', ':'))
+        token, match = self.parser._get_next_token()
+        self.assertEqual(match.group(1), 'a')
+        self.assertRaises(IndexError, match.group, 2)
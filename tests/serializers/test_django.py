@@ -12,7 +12,7 @@ expected_query1 = """(AND: ('name__iexact', 'test'), (NOT (AND: ('book__title__i
 expected_query2 = """(AND: ('book__chapter__title__icontains', 'foo'))"""
 
 query3 = 'test and updated:"2018-02-01" or updated:^2018-02-02$ added:"^2018-01-01" added:2018-01-02$'
-expected_query3 = """(OR: (AND: (OR: ('hostname__icontains', 'test'), ('address__icontains', 'test'), ('model__icontains', 'test'), ('hostname__icontains', 'test')), ('updated__day', 1), ('updated__month', 2), ('updated__year', 2018)), (AND: ('updated__day', 2), ('updated__month', 2), ('updated__year', 2018), ('updated__hour', 0), ('updated__minute', 0)), ('added__gte', datetime.date(2018, 1, 1)), ('added__lte', datetime.date(2018, 1, 2)))"""
+expected_query3 = """(OR: (AND: (OR: ('hostname__icontains', 'test'), ('address__icontains', 'test'), ('model__icontains', 'test')), ('updated__day', 1), ('updated__month', 2), ('updated__year', 2018)), (AND: ('updated__day', 2), ('updated__month', 2), ('updated__year', 2018), ('updated__hour', 0), ('updated__minute', 0)), ('added__gte', datetime.date(2018, 1, 1)), ('added__lte', datetime.date(2018, 1, 2)))"""
 
 def to_list_recursive(tpl):
     if not isinstance(tpl, tuple):
@@ -44,3 +44,10 @@ class DjangoSerializerTest(TestCase):
         query = prep_result(str(query))
         expected = prep_result(expected_query3)
         self.assertListEqual(query, expected)
+
+    def testIncompleteDates(self):
+        # Incomplete dates still restrict the search.
+        for query in ('added:2018', 'added:"Jan 2018"', 'updated>"March 5"'):
+            q_obj = DummyModel.q_from_query(query)
+            self.assertTrue(q_obj, query)
+            self.assertIn('added' if 'added' in query else 'updated', str(q_obj))
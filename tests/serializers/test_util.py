@@ -0,0 +1,42 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django_find.cache import get_cache, clear_caches
+from django_find.serializers import util
+from django_find.serializers.util import parse_date, parse_datetime
+
+class DateParserTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        clear_caches()
+
+    def testISOFormat(self):
+        with patch.object(util, 'parse') as parse:
+            self.assertEqual(parse_date('2018-02-01'), date(2018, 2, 1))
+            self.assertEqual(parse_datetime(' 2018-02-01T10:30 '),
+                             datetime(2018, 2, 1, 10, 30))
+        self.assertFalse(parse.called)
+
+    @override_settings(DJANGO_FIND={'DATE_FORMATS': ('%d.%m.%Y',)})
+    def testDateFormats(self):
+        with patch.object(util, 'parse') as parse:
+            self.assertEqual(parse_date('01.02.2018'), date(2018, 2, 1))
+        self.assertFalse(parse.called)
+
+    def testDateparser(self):
+        self.assertEqual(parse_date('1 Feb 2018'), date(2018, 2, 1))
+        self.assertEqual(parse_date('1 Feb 2018'), date(2018, 2, 1))
+        self.assertEqual(get_cache('DATE').info().hits, 1)
+
+        # Incomplete dates are accepted by default.
+        self.assertEqual(parse_date('Feb 2018').replace(day=1), date(2018, 2, 1))
+        self.assertEqual(parse_date('2018').year, 2018)
+        self.assertIsNone(parse_datetime('nonsense'))
+
+    @override_settings(DJANGO_FIND={'DATEPARSER_SETTINGS': {'DATE_ORDER': 'DMY'}})
+    def testDateparserSettings(self):
+        self.assertEqual(parse_date('01/02/2018'), date(2018, 2, 1))
+
+    @override_settings(DJANGO_FIND={'DATEPARSER_SETTINGS': util.DATEPARSER_SETTING})
+    def testStrictParsing(self):
+        self.assertIsNone(parse_date('Feb 2018'))
@@ -0,0 +1,120 @@
+from copy import copy
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django_find.cache import LRUCache, CacheInfo, get_cache, clear_caches
+from django_find.handlers import type_registry, LowerCaseStrFieldHandler
+from .models import Author, DummyModel
+
+class UpperCaseNameHandler(LowerCaseStrFieldHandler):
+    @classmethod
+    def handles(cls, model, field):
+        return model._meta.model_name == 'author' and field.name == 'name'
+
+    @classmethod
+    def prepare(cls, data):
+        return data.upper()
+
+class LRUCacheTest(TestCase):
+    def testGetSet(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 'default'), 'default')
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.info(), CacheInfo(1, 2, 2, 1))
+        self.assertEqual(cache.get('a', count=False), 1)
+        self.assertEqual(cache.get('b', count=False), None)
+        self.assertEqual(cache.info(), CacheInfo(1, 2, 2, 1))
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')       # Makes 'b' the least recently used entry.
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def testTTL(self):
+        cache = LRUCache(2, ttl=10)
+        with patch('django_find.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with patch('django_find.cache.time.monotonic', return_value=109):
+            self.assertEqual(cache.get('a'), 1)
+        with patch('django_find.cache.time.monotonic', return_value=110):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.info().currsize, 0)
+
+    def testDisabled(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def testClear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 2, 0))
+
+class QueryCacheTest(TestCase):
+    def setUp(self):
+        self.old_type_registry = copy(type_registry)
+        clear_caches()
+
+    def tearDown(self):
+        del type_registry[:]
+        type_registry.extend(self.old_type_registry)
+
+    def testHitsAndMisses(self):
+        cache = get_cache('QUERY')
+        q1 = Author.q_from_query('name:foo')
+        self.assertEqual(cache.info().misses, 1)
+        q2 = Author.q_from_query('name:foo')
+        self.assertEqual(cache.info().hits, 1)
+        self.assertEqual(q1, q2)
+        self.assertIsNot(q1, q2)
+
+        Author.q_from_query('name:foo', ['name']) # Same DOM
+        self.assertEqual(cache.info().hits, 2)
+        Author.q_from_query('name:bar')
+        self.assertEqual(cache.info().misses, 2)
+
+        # Repeating a query string reuses its fingerprint.
+        with patch.object(Author, 'dom_from_query') as dom_from_query:
+            Author.q_from_query('name:bar')
+        dom_from_query.assert_not_called()
+        self.assertEqual(cache.info().hits, 3)
+
+    def testCanonicalDOM(self):
+        cache = get_cache('QUERY')
+        q1 = Author.q_from_query('name:foo and rating>3')
+        q2 = Author.q_from_query('rating>3 name:foo name:foo')
+        self.assertEqual(cache.info().hits, 1)
+        self.assertEqual(q1, q2)
+
+    def testDatesAreNotCached(self):
+        # Relative dates are resolved at compile time.
+        cache = get_cache('QUERY')
+        DummyModel.q_from_query('added:2020-01-01')
+        DummyModel.q_from_query('added:2020-01-01')
+        self.assertEqual(cache.info().misses, 2)
+        DummyModel.q_from_query('host:foo')
+        DummyModel.q_from_query('host:foo')
+        self.assertEqual(cache.info().hits, 1)
+
+    def testSchemaChangeInvalidates(self):
+        self.assertEqual(str(Author.q_from_query('name:foo')),
+                         "(AND: ('name__icontains', 'foo'))")
+        type_registry.insert(0, UpperCaseNameHandler)
+        self.assertEqual(str(Author.q_from_query('name:foo')),
+                         "(AND: ('name__icontains', 'FOO'))")
+
+    def testSettings(self):
+        with override_settings(DJANGO_FIND={'QUERY_CACHE_SIZE': 0}):
+            Author.q_from_query('name:foo')
+            Author.q_from_query('name:foo')
+            self.assertEqual(get_cache('QUERY').info(), CacheInfo(0, 2, 0, 0))
+        with override_settings(DJANGO_FIND={'QUERY_CACHE_TTL': None}):
+            self.assertIsNone(get_cache('QUERY').ttl)
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from django.utils import translation
+from django_find.choices import ChoiceIndex
+from .models import Copy, Library
+
+choices = [('HC', 'Hardcover edition'),
+           ('PB', 'Paperback edition'),
+           ('AU', 'Audiobook'),
+           ('ed', 'Other')]
+
+class ChoiceIndexTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        self.index = ChoiceIndex(choices)
+
+    def testFindExact(self):
+        self.assertEqual(self.index.find('hc', exact=True), ['HC'])
+        self.assertEqual(self.index.find('AUDIOBOOK', exact=True), ['AU'])
+        self.assertEqual(self.index.find('edition', exact=True), [])
+
+    def testFindSubstring(self):
+        self.assertEqual(self.index.find('EDITION'), ['HC', 'PB'])
+        self.assertEqual(self.index.find('ed'), ['HC', 'PB', 'ed'])
+        self.assertEqual(self.index.find('k edi'), ['PB'])
+        self.assertEqual(self.index.find('xyz'), [])
+        self.assertEqual(self.index.find(''), ['HC', 'PB', 'AU', 'ed'])
+
+    def testCandidates(self):
+        self.assertEqual(list(self.index._candidates('book')), [2])
+        self.assertEqual(list(self.index._candidates('edition')), [0, 1])
+
+    def testLargeIndex(self):
+        index = ChoiceIndex(('C{}'.format(i), 'Country {}'.format(i))
+                            for i in range(5000))
+        self.assertEqual(len(index), 5000)
+        self.assertEqual(index.find('country 4999'), ['C4999'])
+        self.assertEqual(len(index.find('country 12')), 111)
+
+class SchemaChoiceIndexTest(TestCase):
+    def testGetChoiceIndex(self):
+        schema = Copy.get_schema()
+        index = schema.get_choice_index('format')
+        self.assertIs(index, schema.get_choice_index('format'))
+        self.assertEqual(index.find('edition'), ['HC', 'PB', 'EB'])
+        self.assertIsNone(schema.get_choice_index('shelfmark'))
+        self.assertIsNone(schema.get_choice_index('nonexistent'))
+
+    def testIndexPerLanguage(self):
+        schema = Library.get_schema()
+        with translation.override('de'):
+            index = schema.get_choice_index('status')
+        self.assertIsNot(index, schema.get_choice_index('status'))
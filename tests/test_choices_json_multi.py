@@ -9,9 +9,10 @@ Tests for three search features added on top of django-find:
   3. Choice translation: search a choices field by its human-readable label,
      expanding to every matching stored code (format:edition -> HC/PB/EB).
 """
+import datetime
 from django.test import TestCase
 from django_find.parsers.query import QueryParser
-from .models import Library, Collection, Copy
+from .models import Library, Collection, Copy, Schedule
 
 
 class ChoiceTranslationTest(TestCase):
@@ -53,30 +54,57 @@ class ChoiceTranslationTest(TestCase):
         # Exclude every *edition* code; only the audiobook copy remains.
         self.assertEqual(['AU'], self._formats('format!:edition'))
 
+    def testSerializesToIn(self):
+        self.assertEqual(str(Copy.q_from_query('format:edition')),
+                         "(AND: ('format__in', ['HC', 'PB', 'EB']))")
+        sql, args, fields = Copy.sql_from_query('format:edition')
+        self.assertIn('search_tests_copy.format IN (%s, %s, %s)', sql)
+        self.assertEqual(args, ['HC', 'PB', 'EB'])
+        query, fields = Copy.by_query_raw('format:edition')
+        self.assertEqual(sorted(row[0] for row in query), ['EB', 'HC'])
+
     def testOwnFieldChoiceOnLibrary(self):
         result = Library.objects.filter(Library.q_from_query('status:Open'))
         self.assertEqual([self.l1.pk], [lib.pk for lib in result])
 
-    def testParserExpandsLabelToOrOfCodes(self):
+    def testParserExpandsLabelToInOfCodes(self):
         parser = QueryParser({'format': 'Copy.format'}, ('format',))
         expected = """Group(root)
-  Or
-    Term: Copy.format equals 'HC'
-    Term: Copy.format equals 'PB'
-    Term: Copy.format equals 'EB'"""
+  Term: Copy.format in ('HC', 'PB', 'EB')"""
         self.assertEqual(expected, parser.parse('format:edition').dump())
 
     def testParserNegatesExpandedCodes(self):
         parser = QueryParser({'format': 'Copy.format'}, ('format',))
         expected = """Group(root)
   Not
-    Or
-      Term: Copy.format equals 'HC'
-      Term: Copy.format equals 'PB'
-      Term: Copy.format equals 'EB'"""
+    Term: Copy.format in ('HC', 'PB', 'EB')"""
         self.assertEqual(expected, parser.parse('format!:edition').dump())
 
 
+class ChoiceTypesTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        Schedule.objects.create(enabled=True, day=datetime.date(2020, 1, 1))
+        Schedule.objects.create(enabled=False, day=datetime.date(2020, 12, 24))
+
+    def _pks(self, query):
+        q_pks = sorted(s.pk for s in Schedule.by_query(query))
+        result, fields = Schedule.by_query_raw(query, fullnames=['Schedule.id'])
+        self.assertEqual(sorted(row[0] for row in result), q_pks)
+        return q_pks
+
+    def testBooleanChoices(self):
+        self.assertEqual(Schedule.dom_from_query('on:enabled').dump(), """Group(root)
+  Term: Schedule.on equals 'True'""")
+        self.assertEqual(self._pks('on:enabled'), [1])
+        self.assertEqual(self._pks('on:abled'), [1, 2])
+        self.assertEqual(self._pks('on!:disabled'), [1])
+
+    def testDateChoices(self):
+        self.assertEqual(self._pks('d:new'), [1])
+        self.assertEqual(self._pks('d:christmas or d:new'), [1, 2])
+        self.assertEqual(self._pks('d!:new'), [2])
+
 class JsonSearchTest(TestCase):
     def setUp(self):
         self.maxDiff = None
@@ -0,0 +1,118 @@
+import sys
+from django.test import TestCase
+from django_find.dom import Group, And, Or, Not, Term
+from django_find.parsers.query import QueryParser
+from django_find.serializers.sql import SQLSerializer
+from .models import Author
+
+def nested(depth):
+    # Alternating groups, which optimize() can not flatten.
+    root = Group(is_root=True)
+    node = root
+    for i in range(depth):
+        node = node.add(And() if i % 2 else Or())
+        node.add(Term('Author.name', 'contains', str(i)))
+    return root
+
+class DOMTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+
+    def testWalk(self):
+        dom = Group([Or([Term('a', 'equals', '1'), Not(Term('b', 'equals', '2'))]),
+                     Term('c', 'equals', '3')], is_root=True)
+        self.assertEqual([type(n).__name__ for n in dom.walk()],
+                         ['Group', 'Or', 'Term', 'Not', 'Term', 'Term'])
+        self.assertEqual([n.name for n in dom.walk(Term)], ['a', 'b', 'c'])
+        self.assertEqual(dom.get_term_names(), ['a', 'b', 'c'])
+
+    def testAccept(self):
+        dom = Group([Or([Term('a', 'equals', '1'), Term('b', 'equals', '2')]),
+                     Term('c', 'equals', '3')], is_root=True)
+        def visitor(node, results):
+            if isinstance(node, Term):
+                return node.name
+            return type(node).__name__ + '(' + ','.join(results) + ')'
+        self.assertEqual(dom.accept(visitor), 'Group(Or(a,b),c)')
+
+    def testOptimize(self):
+        dom = Group([And([And([Term('a', 'equals', '1')]), Or()]),
+                     Not(Group())], is_root=True)
+        self.assertEqual(dom.optimize().dump(), """Group(root)
+  Term: a equals '1'""")
+
+    def testCompact(self):
+        dom = Group([Or([Term('a', 'equals', 1), Term('b', 'equals', '2')]),
+                     Term('c', 'equals', '3')], is_root=True).optimize()
+        for node in dom.walk():
+            self.assertFalse(hasattr(node, '__dict__'))
+            self.assertIsInstance(node.children, tuple)
+        self.assertEqual(dom.children[0].children[0].data, '1')
+        dom.add(Term('d', 'equals', '4'))
+        self.assertEqual(len(dom.children), 3)
+
+    def testDeepNesting(self):
+        depth = sys.getrecursionlimit()*2
+        dom = nested(depth).optimize()
+        self.assertEqual(len(list(dom.walk(Term))), depth)
+        # The innermost group is replaced by its only term.
+        self.assertEqual(len(dom.dump().split('\n')), depth*2)
+        select, args = dom.serialize(SQLSerializer(Author))
+        self.assertEqual(len(args), depth)
+        self.assertEqual(select.count('('), select.count(')'))
+        self.assertTrue(select.endswith(')'*(depth-1)))
+
+class CanonicalTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        self.parser = QueryParser({'a': 'A.a', 'b': 'A.b', 'c': 'A.c'}, ('a',))
+
+    def parse(self, query):
+        return self.parser.parse(query)
+
+    def fingerprint(self, query):
+        return self.parse(query).fingerprint()
+
+    def testEqual(self):
+        # Nodes are mutable, so they compare by identity.
+        dom = self.parse('a:1')
+        self.assertEqual(dom, dom)
+        self.assertNotEqual(dom, self.parse('a:1'))
+        self.assertEqual(len({dom, self.parse('a:1')}), 2)
+
+    def testFingerprint(self):
+        self.assertEqual(self.fingerprint('a:1 and b:2'), self.fingerprint('b:2 and a:1'))
+        self.assertEqual(self.fingerprint('a:1 or b:2'), self.fingerprint('b:2 or a:1'))
+        self.assertEqual(self.fingerprint('a:1 a:1 b:2'), self.fingerprint('b:2 a:1'))
+        self.assertEqual(self.fingerprint('(a:1 and (b:2 and c:3))'),
+                         self.fingerprint('c:3 b:2 a:1'))
+        self.assertEqual(self.fingerprint('not (not a:1)'), self.fingerprint('a:1'))
+        self.assertEqual(Term('A.a', 'equals', '1').fingerprint(),
+                         Term('A.a', 'equals', 1).fingerprint())
+        self.assertNotEqual(self.fingerprint('a:1 or b:2'), self.fingerprint('a:1 and b:2'))
+        self.assertNotEqual(self.fingerprint('a:1'), self.fingerprint('not a:1'))
+        self.assertNotEqual(self.fingerprint('a:1'), self.fingerprint('a=1'))
+
+        queries = ['a:1 b:2', 'b:2 a:1', 'b:2 and a:1 and a:1', 'a:1 or b:2']
+        self.assertEqual(len(set(self.fingerprint(q) for q in queries)), 2)
+        # The fingerprint does not depend on the process.
+        self.assertEqual(Term('A.a', 'equals', '1').fingerprint(),
+                         '74610b3cd24e78f31578cba1b35f80802592e6e8')
+
+    def testCanonical(self):
+        dom = self.parse('c:3 or not (not (b:2 a:1)) or c:3')
+        self.assertEqual(dom.canonical().dump(), """Group(root)
+  Or
+    And
+      Term: A.a contains '1'
+      Term: A.b contains '2'
+    Term: A.c contains '3'""")
+        self.assertEqual(dom.dump(), """Group(root)
+  Or
+    Term: A.c contains '3'
+    Not
+      Not
+        Group
+          Term: A.b contains '2'
+          Term: A.a contains '1'
+    Term: A.c contains '3'""")
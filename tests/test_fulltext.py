@@ -0,0 +1,121 @@
+from io import StringIO
+from django.core.management import call_command
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.db import connections
+from django.test import TestCase
+from django_find.fulltext import search_condition, search_value
+from django_find.model_helpers import sql_from_dom
+from django_find.rawquery import PaginatedRawQuerySet
+from .models import Article, Author
+
+class FullTextTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+
+    def create_indexes(self, *args):
+        call_command('find_fulltext', *args, verbosity=0)
+
+    def search(self, query):
+        return sorted(a.title for a in Article.by_query(query, ['title', 'body']))
+
+    def search_all(self, query):
+        return sorted(a.title for a in Article.by_query(query))
+
+    def search_raw(self, query):
+        dom = Article.dom_from_query(query, ['title', 'body'])
+        sql, args, fields = sql_from_dom(Article, dom, fullnames=['Article.title'])
+        return sorted(row[0] for row in PaginatedRawQuerySet(Article, sql, args))
+
+    def testParser(self):
+        self.assertEqual(Article.get_schema().fulltext, frozenset(['title', 'body']))
+        self.assertEqual(Article.dom_from_query('foo').dump(), """Group(root)
+  Or
+    Term: Article.title search 'foo'
+    Term: Article.body search 'foo'
+    Term: Article.rating contains 'foo'
+    Term: Article.ip contains 'foo'""")
+        self.assertEqual(Article.dom_from_query('title:bar').dump(), """Group(root)
+  Term: Article.title contains 'bar'""")
+        self.assertEqual(Article.dom_from_query('^baz').dump(), """Group(root)
+  Or
+    Term: Article.title startswith 'baz'
+    Term: Article.body startswith 'baz'
+    Term: Article.rating startswith 'baz'
+    Term: Article.ip startswith 'baz'""")
+
+        # Other models are not affected.
+        self.assertEqual(Author.dom_from_query('foo', ['name']).dump(), """Group(root)
+  Term: search_tests.Author.name contains 'foo'""")
+
+    def testSearch(self):
+        self.create_indexes()
+        Article.objects.create(title='First', body='Hello world', rating=3)
+        Article.objects.create(title='Second', body='hello again')
+        Article.objects.create(title='Third', body='Othello')
+
+        for search in (self.search, self.search_raw):
+            self.assertEqual(search('hello'), ['First', 'Second'])
+            self.assertEqual(search('WORLD'), ['First'])
+            self.assertEqual(search('"hello again"'), ['Second'])
+            self.assertEqual(search('again'), ['Second'])
+            self.assertEqual(search('"a"" OR b"'), [])
+
+            # Words with a field name keep their meaning.
+            self.assertEqual(search('body:ello'), ['First', 'Second', 'Third'])
+            self.assertEqual(search('^oth'), ['Third'])
+
+        # The index follows changes of the table.
+        Article.objects.filter(title='First').update(body='Goodbye')
+        Article.objects.filter(title='Second').delete()
+        self.assertEqual(self.search('hello'), [])
+        self.assertEqual(self.search_raw('goodbye'), ['First'])
+
+    def testOtherFields(self):
+        # Fields that are searched as text, but that are not text columns,
+        # are searched as usual, and the lookup falls back to icontains.
+        self.create_indexes()
+        Article.objects.create(title='First', body='Hello', ip='10.0.0.1')
+        self.assertEqual(self.search_all('10.0.0'), ['First'])
+        self.assertEqual(sorted(a.title for a in Article.objects.filter(ip__find_search='0.0.1')),
+                         ['First'])
+        self.assertEqual(sorted(a.title for a in Article.objects.filter(rating__find_search='0')),
+                         ['First'])
+
+    def testUsing(self):
+        # The SQL is in the dialect of the given database.
+        databases = {'default': connections['default'],
+                     'other': SimpleNamespace(vendor='postgresql')}
+        with patch('django_find.serializers.sql.connections', databases):
+            default = Article.sql_from_query('hello', mode='WHERE')[0]
+            other = Article.sql_from_query('hello', mode='WHERE', using='other')[0]
+        self.assertIn('MATCH', default)
+        self.assertIn('plainto_tsquery', other)
+
+    def testCommand(self):
+        out = StringIO()
+        call_command('find_fulltext', 'search_tests', dry_run=True, stdout=out)
+        statements = out.getvalue().splitlines()
+        self.assertIn('CREATE VIRTUAL TABLE "search_tests_article_fts" USING '
+                      'fts5("title", "body", content="search_tests_article", '
+                      'content_rowid="id");', statements)
+        self.assertEqual(statements[-1], 'INSERT INTO "search_tests_article_fts"'
+                                         '("search_tests_article_fts") VALUES (\'rebuild\');')
+
+        Article.objects.create(title='First', body='Hello world')
+        self.create_indexes()
+        self.create_indexes() # Recreated, and rebuilt from the table.
+        self.assertEqual(self.search('hello'), ['First'])
+
+        self.create_indexes('--drop')
+        self.assertRaises(Exception, self.search, 'hello')
+
+    def testConditions(self):
+        self.assertEqual(search_condition('postgresql', 't.c', 't.id', 't', 'c'),
+                         "to_tsvector('simple'::regconfig, t.c) @@ "
+                         "plainto_tsquery('simple'::regconfig, %s)")
+        self.assertEqual(search_condition('sqlite', 't.c', 't.id', 't', 'c'),
+                         't.id IN (SELECT rowid FROM t_fts WHERE t_fts.c MATCH %s)')
+        self.assertIsNone(search_condition('mysql', 't.c', 't.id', 't', 'c'))
+        self.assertEqual(search_value('sqlite', 'a"b'), '"a""b"')
+        self.assertEqual(search_value('postgresql', 'a"b'), 'a"b')
@@ -1,8 +1,10 @@
 
 from copy import copy
+from django.db import models
 from django.test import TestCase
-from django_find.handlers import type_registry, LowerCaseStrFieldHandler
-from .models import Author
+from django_find.handlers import type_registry, FieldHandler, \
+        LowerCaseStrFieldHandler, IntegerFieldHandler
+from .models import Author, Book
 
 nicknames = {'robbie': 'Robert Frost'}
 
@@ -15,6 +17,18 @@ class AuthorNameFieldHandler(LowerCaseStrFieldHandler):
     def prepare(cls, data):
         return nicknames.get(data, data)
 
+class CountingHandler(LowerCaseStrFieldHandler):
+    calls = 0
+
+    @classmethod
+    def handles(cls, model, field):
+        cls.calls += 1
+        return False
+
+class SlugFieldHandler(FieldHandler):
+    db_type = 'STR'
+    field_types = models.SlugField,
+
 class HandlersTest(TestCase):
     def setUp(self):
         self.maxDiff = None
@@ -38,3 +52,43 @@ class HandlersTest(TestCase):
         type_registry.insert(0, AuthorNameFieldHandler)
         query = str(Author.q_from_query('name:robbie'))
         self.assertEqual(query, "(AND: ('name__icontains', 'Robert Frost'))")
+
+    def testRegister(self):
+        func = Author.get_field_handler_from_alias
+        version = type_registry.version
+        type_registry.register(AuthorNameFieldHandler)
+        self.assertGreater(type_registry.version, version)
+        self.assertEqual(type_registry[0], AuthorNameFieldHandler)
+        self.assertEqual(func('name'), AuthorNameFieldHandler)
+
+        type_registry.unregister(AuthorNameFieldHandler)
+        self.assertEqual(func('name'), LowerCaseStrFieldHandler)
+
+    def testFieldTypes(self):
+        self.assertTrue(IntegerFieldHandler.handles_by_type())
+        self.assertFalse(AuthorNameFieldHandler.handles_by_type())
+
+        # Subclasses of the field types are resolved through their MRO.
+        field = models.SlugField(name='slug')
+        self.assertEqual(type_registry.get_handler(Author, field),
+                         LowerCaseStrFieldHandler)
+        type_registry.register(SlugFieldHandler)
+        self.assertEqual(type_registry.get_handler(Author, field),
+                         SlugFieldHandler)
+        self.assertIsNone(type_registry.get_handler(Author, models.Field(name='x')))
+
+    def testMemoized(self):
+        type_registry.register(CountingHandler)
+        CountingHandler.calls = 0
+        field = Author._meta.get_field('name')
+        for i in range(3):
+            self.assertEqual(type_registry.get_handler(Author, field),
+                             LowerCaseStrFieldHandler)
+        self.assertEqual(CountingHandler.calls, 1)
+        type_registry.get_handler(Book, Book._meta.get_field('title'))
+        self.assertEqual(CountingHandler.calls, 2)
+
+        # Modifying the list drops the memo.
+        type_registry.append(IntegerFieldHandler)
+        type_registry.get_handler(Author, field)
+        self.assertEqual(CountingHandler.calls, 3)
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+from django.test import SimpleTestCase
+
+script = '''
+import sys
+import django
+django.setup()
+import django_find.models
+print(' '.join(sorted(m for m in sys.modules if m.startswith(('dateparser', 'django_find')))))
+'''
+
+importtime_script = '''
+import django
+django.setup()
+import django_find.models
+import dateparser
+'''
+
+class ImportTest(SimpleTestCase):
+    def run_script(self, script, *args):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ,
+                   PYTHONPATH=root,
+                   DJANGO_SETTINGS_MODULE='tests.settings')
+        result = subprocess.run([sys.executable]+list(args)+['-c', script],
+                                cwd=root,
+                                env=env,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                check=True)
+        return result.stdout.decode('utf-8').split(), result.stderr.decode('utf-8')
+
+    def import_times(self, script):
+        # Returns the cumulative import time of each module, as reported
+        # by "python -X importtime".
+        times = {}
+        for line in self.run_script(script, '-X', 'importtime')[1].splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                times[parts[2].strip()] = int(parts[1])
+        return times
+
+    def testLazyImports(self):
+        modules = self.run_script(script)[0]
+        self.assertIn('django_find.models', modules)
+        self.assertNotIn('dateparser', modules)
+        self.assertNotIn('django_find.parsers.json', modules)
+        self.assertNotIn('django_find.rawquery', modules)
+        self.assertNotIn('django_find.serializers.sql', modules)
+
+    def testImportTime(self):
+        # Compared to dateparser rather than to a fixed number of seconds,
+        # so that the check does not depend on the speed of the machine.
+        # dateparser took about 90% of the time to import django_find.models
+        # when it was still imported eagerly.
+        times = self.import_times(importtime_script)
+        self.assertLess(times['django_find.models']*2, times['dateparser'])
@@ -13,6 +13,7 @@ The test models (see ``tests/models.py``) reproduce the original scenario:
     Part <- Alarm  -> FarDevice    (Alarm.part is a reverse relation: lossy)
 """
 import json
+from unittest.mock import patch
 
 from django.test import TestCase
 
@@ -61,11 +62,21 @@ class ObjectVectorSelectionTest(TestCase):
         self.assertEqual(vector, (Part, Gadget, FarDevice))
         self.assertNotIn(Alarm, vector)
 
+    def test_shortest_strategy_prefers_lossless_path(self):
+        vector = get_object_vector_for(Part, [Part, FarDevice], Searchable,
+                                       strategy='shortest')
+        self.assertEqual(vector, (Part, Gadget, FarDevice))
+
     def test_classmethod_prefers_lossless_path(self):
         vector = Part.get_object_vector_for([Part, FarDevice])
         self.assertEqual(vector, (Part, Gadget, FarDevice))
         self.assertNotIn(Alarm, vector)
 
+    def test_classmethod_honours_join_strategy(self):
+        with patch.object(Part, 'searchable_join_strategy', 'shortest'), \
+             patch.object(Part, 'searchable_join_max_depth', 1):
+            self.assertIsNone(Part.get_object_vector_for([Part, FarDevice]))
+
 
 class SQLJoinPathTest(TestCase):
     """The generated SQL must join FarDevice through Gadget, not Alarm."""
@@ -0,0 +1,148 @@
+import pickle
+from contextlib import contextmanager
+from unittest.mock import patch
+from django.db import OperationalError, connection, models
+from django.test import TestCase, override_settings
+from django_find import limits
+from django_find.exceptions import QueryTooComplex, QueryTimeout
+from django_find.limits import statement_timeout, with_statement_timeout, \
+        mysql_statement_timeout, TimeoutQuerySet, TimeoutQuerySetMixin
+from django_find.rawquery import PaginatedRawQuerySet
+from .models import Author, Book
+
+slow_query = '''WITH RECURSIVE c(x) AS (
+    SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < 100000000
+) SELECT x FROM c'''
+
+class CustomQuerySet(models.QuerySet):
+    pass
+
+def limit(**kwargs):
+    return override_settings(DJANGO_FIND=kwargs)
+
+class LimitsTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+
+    def testMaxTerms(self):
+        with limit(MAX_TERMS=2):
+            Author.q_from_query('name:a rating=1')
+            self.assertRaises(QueryTooComplex, Author.q_from_query, 'name:a name:b name:c')
+            self.assertRaises(QueryTooComplex, Author.by_json_raw,
+                              '{"Author":{"name":[[["contains","a"]],'
+                              '[["contains","b"]],[["contains","c"]]]}}')
+
+    def testMaxDepth(self):
+        with limit(MAX_DEPTH=3):
+            Author.q_from_query('name:a and (rating=1 or name:b)')
+            self.assertRaises(QueryTooComplex, Author.q_from_query,
+                              'name:a and (rating=1 or (name:b and not name:c))')
+
+    def testMaxAliasFanout(self):
+        with limit(MAX_ALIAS_FANOUT=2):
+            Author.q_from_query('foo', ['name', 'author'])
+            Author.q_from_query('name:foo')
+            self.assertRaises(QueryTooComplex, Author.q_from_query, 'foo')
+
+    def testMaxJoins(self):
+        fullnames = ['Book.title', 'Author.name']
+        with limit(MAX_JOINS=1):
+            Book.sql_from_query('title:a', fullnames=fullnames)
+        with limit(MAX_JOINS=0):
+            self.assertRaises(QueryTooComplex, Book.sql_from_query,
+                              'title:a', fullnames=fullnames)
+            Book.sql_from_query('title:a', fullnames=['Book.title'])
+
+    def testStatementTimeout(self):
+        query = PaginatedRawQuerySet(Author, slow_query)
+        with limit(STATEMENT_TIMEOUT=10):
+            # The progress handler aborts the query at its first call.
+            with patch.object(limits, 'SQLITE_PROGRESS_STEPS', 1), \
+                 patch.object(limits, 'monotonic', side_effect=range(0, 10**6, 100)):
+                self.assertRaises(QueryTimeout, query.get_count)
+                self.assertRaises(QueryTimeout, list, query[:10**9])
+                self.assertRaises(QueryTimeout, list, query.iterator())
+            self.assertEqual(list(query[:2]), [(1,), (2,)])
+
+        # Other errors are passed through.
+        with statement_timeout(10):
+            with self.assertRaises(OperationalError) as cm:
+                list(PaginatedRawQuerySet(Author, 'SELECT foo FROM bar'))
+        self.assertNotIsInstance(cm.exception, QueryTimeout)
+
+    def testByQueryTimeout(self):
+        for i in range(10):
+            Author.objects.create(name='Foo'+str(i), rating=i)
+        self.assertEqual(type(Author.by_query('name:foo')).__name__, 'QuerySet')
+
+        with limit(STATEMENT_TIMEOUT=10):
+            query = Author.by_query('name:foo')
+            self.assertEqual(query.count(), 10)
+            self.assertEqual(len(query.filter(rating__gt=4)), 5)
+            self.assertTrue(query.exists())
+
+            # The progress handler aborts the query at its first call.
+            with patch.object(limits, 'SQLITE_PROGRESS_STEPS', 1), \
+                 patch.object(limits, 'monotonic', side_effect=range(0, 10**6, 100)):
+                self.assertRaises(QueryTimeout, list, Author.by_query('name:foo'))
+            self.assertEqual(len(Author.by_query('name:foo')), 10)
+
+            # The QuerySet can be pickled, e.g. by Django's cache.
+            query = pickle.loads(pickle.dumps(Author.by_query('name:foo')))
+            self.assertIsInstance(query, TimeoutQuerySet)
+            self.assertEqual(query.count(), 10)
+
+            # Custom QuerySet classes get a subclass, which is created
+            # once, and pickled by the custom class.
+            query = with_statement_timeout(CustomQuerySet(Author).filter(name='Foo1'))
+            self.assertIsInstance(query, CustomQuerySet)
+            self.assertIsInstance(query, TimeoutQuerySetMixin)
+            self.assertIs(type(query), type(with_statement_timeout(CustomQuerySet(Author))))
+            self.assertIs(with_statement_timeout(query), query)
+            query = pickle.loads(pickle.dumps(query))
+            self.assertIsInstance(query, CustomQuerySet)
+            self.assertIsInstance(query, TimeoutQuerySetMixin)
+            self.assertEqual(query.count(), 1)
+            with patch.object(limits, 'SQLITE_PROGRESS_STEPS', 1), \
+                 patch.object(limits, 'monotonic', side_effect=range(0, 10**6, 100)):
+                self.assertRaises(QueryTimeout, list, query.all())
+
+    def testAbandonedIterator(self):
+        # The timeout is not in effect while the rows are yielded.
+        active = []
+
+        @contextmanager
+        def timeout(connection, seconds):
+            active.append(True)
+            try:
+                yield
+            finally:
+                active.pop()
+
+        for i in range(3):
+            Author.objects.create(name='Foo'+str(i), rating=i)
+        with limit(STATEMENT_TIMEOUT=10), \
+             patch.dict(limits._timeouts, {connection.vendor: timeout}):
+            rows = Author.by_query('name:foo').iterator(chunk_size=1)
+            next(rows)
+            self.assertEqual(active, [])
+            rows = PaginatedRawQuerySet(Author, 'SELECT name FROM search_tests_author').iterator(1)
+            next(rows)
+            self.assertEqual(active, [])
+
+    def testMySQLStatementTimeout(self):
+        def statement(sql, mariadb=False):
+            with patch.object(connection, 'vendor', 'mysql'), \
+                 patch.object(connection, 'mysql_is_mariadb', mariadb, create=True), \
+                 mysql_statement_timeout(sql, 1.5) as result:
+                return result
+        self.assertEqual(statement('SELECT * FROM a'),
+                         'SELECT /*+ MAX_EXECUTION_TIME(1500) */ * FROM a')
+        self.assertEqual(statement(' select 1 union select 2'),
+                         ' select /*+ MAX_EXECUTION_TIME(1500) */ 1 union select 2')
+        self.assertEqual(statement('SELECT * FROM a', mariadb=True),
+                         'SET STATEMENT max_statement_time=1.5 FOR SELECT * FROM a')
+        self.assertEqual(statement('WITH c AS (SELECT 1) SELECT * FROM c'),
+                         'WITH c AS (SELECT 1) SELECT * FROM c')
+        with mysql_statement_timeout('SELECT 1', 1.5) as result:
+            self.assertEqual(result, 'SELECT 1')
@@ -1,7 +1,13 @@
 
+import datetime
+import decimal
+from unittest.mock import patch
 from django.test import TestCase
-from django_find.rawquery import PaginatedRawQuerySet
-from .models import Author
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_find.rawquery import PaginatedRawQuerySet, CappedCount, \
+        encode_cursor, decode_cursor
+from .models import Author, Book
 
 class PaginatedRawQuerySetTest(TestCase):
     def setUp(self):
@@ -51,6 +57,17 @@ class PaginatedRawQuerySetTest(TestCase):
         self.assertEqual(len(self.query[:]), 10)
         self.assertEqual(len(self.query[1:]), 9)
 
+        # The rows of a slice are counted, not fetched.
+        query = PaginatedRawQuerySet(Author, self.query.raw_query)
+        page = query[2:6]
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(page), 4)
+            self.assertEqual(len(query[8:12]), 2)
+        self.assertIsNone(page.result_cache)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('COUNT(*)', ctx.captured_queries[0]['sql'])
+        self.assertIn('LIMIT 7', ctx.captured_queries[0]['sql'])
+
     def testCount(self):
         self.assertEqual(self.query.count, 10)
         self.assertEqual(self.query.count, 10) # Cached
@@ -58,3 +75,217 @@ class PaginatedRawQuerySetTest(TestCase):
         self.assertEqual(self.query[:8].count, 8)
         self.assertEqual(self.query[:].count, 10)
         self.assertEqual(self.query[1:].count, 9)
+
+    def testSharedWindows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            page = self.query[2:6]
+            # list(page) would count the rows first, see testLen().
+            self.assertEqual(len(list(iter(page))), 4)
+            self.assertEqual(list(self.query[3:5]), [('Foo3', 10), ('Foo4', 10)])
+            self.assertEqual(self.query[5], ('Foo5', 10))
+            self.assertEqual(page[1], ('Foo3', 10))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(list(self.query[5:8]), [('Foo5', 10), ('Foo6', 10), ('Foo7', 10)])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def testSharedWindowsExhausted(self):
+        with CaptureQueriesContext(connection) as ctx:
+            list(self.query[6:])
+            self.assertEqual(list(self.query[8:20]), [('Foo8', 10), ('Foo9', 10)])
+            self.assertEqual(list(self.query[12:]), [])
+            self.assertEqual(len(self.query[7:]), 3)
+            self.assertRaises(IndexError, self.query.__getitem__, 10)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def testIterator(self):
+        rows = list(self.query[1:].iterator(chunk_size=3))
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[0], ('Foo1', 10))
+        self.assertEqual(list(self.query.iterator()), list(self.query))
+
+        query = self.query[:]
+        list(query.iterator())
+        self.assertIsNone(query.result_cache)
+        self.assertEqual(query.columns, ('name', 'rating'))
+
+    def testIteratorNamedCursor(self):
+        # Like a PostgreSQL named cursor, which has no description until
+        # the first rows are fetched.
+        class NamedCursor(object):
+            def __init__(self, cursor):
+                self.cursor = cursor
+                self.description = None
+
+            def execute(self, *args):
+                return self.cursor.execute(*args)
+
+            def fetchmany(self, size):
+                self.description = self.cursor.description
+                return self.cursor.fetchmany(size)
+
+            def close(self):
+                self.cursor.close()
+
+        query = self.query[:]
+        with patch.object(connection, 'chunked_cursor',
+                          lambda: NamedCursor(connection.cursor())):
+            rows = list(query.iterator(chunk_size=4))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(query.columns, ('name', 'rating'))
+
+        # The query runs through Django's cursor wrapper.
+        with CaptureQueriesContext(connection) as ctx:
+            list(self.query[:].iterator())
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def testCountStrategies(self):
+        self.assertEqual(self.query.get_count('exact'), 10)
+        self.assertEqual(self.query[8:20].get_count('exact'), 2)
+        self.assertEqual(self.query.get_count('estimate'), 10) # Exact on SQLite
+        self.assertRaises(ValueError, self.query.get_count, 'foo')
+
+        count = self.query.get_count('capped', cap=5)
+        self.assertIsInstance(count, CappedCount)
+        self.assertEqual((count, str(count)), (5, '5+'))
+        count = self.query[:3].get_count('capped', cap=5)
+        self.assertEqual((count, str(count)), (3, '3'))
+        count = self.query[3:].get_count('capped', cap=5)
+        self.assertEqual((count, str(count)), (2, '2+'))
+        count = self.query.get_count('capped', cap=10)
+        self.assertEqual((count, str(count)), (10, '10'))
+
+    def testCountWithoutLimit(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.query[2:5].get_count()
+        self.assertNotIn('LIMIT', ctx.captured_queries[0]['sql'])
+
+    def testCountIsShared(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.query[4:]), 6)
+            self.assertEqual(len(self.query[2:5]), 3)
+            self.assertEqual(self.query.count, 10)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        for i in range(10):
+            author = Author.objects.create(name='Foo'+str(i), rating=i%3)
+            if i % 2:
+                Book.objects.create(author=author, title='B'+str(i%5),
+                                    comment='', rating=1)
+        sql = 'SELECT a.name, a.rating, b.title FROM ' \
+            + Author._meta.db_table + ' a LEFT JOIN ' \
+            + Book._meta.db_table + ' b ON b.author_id=a.id'
+        self.query = PaginatedRawQuerySet(Author, sql)
+
+    def _pages(self, query, size, **kwargs):
+        pages = []
+        cursor = None
+        while True:
+            page = query.seek(cursor, **kwargs)[:size]
+            rows = list(page)
+            if not rows:
+                return pages
+            pages.append(rows)
+            cursor = page.next_cursor
+
+    def testSeekAllColumns(self):
+        self.assertEqual(self.query.get_columns(), ('name', 'rating', 'title'))
+        pages = self._pages(self.query, 3)
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 1])
+        rows = [row for page in pages for row in page]
+        self.assertEqual(rows, sorted(rows))
+        self.assertEqual(len(set(rows)), 10)
+
+    def testSeekWithNulls(self):
+        pages = self._pages(self.query, 4, key=('title', 'name'))
+        rows = [row for page in pages for row in page]
+        self.assertEqual(len(rows), 10)
+        # NULL values come first.
+        self.assertEqual([r[2] for r in rows[:5]], [None]*5)
+        self.assertEqual([r[0] for r in rows[:5]],
+                         ['Foo0', 'Foo2', 'Foo4', 'Foo6', 'Foo8'])
+        self.assertEqual([r[2] for r in rows[5:]], ['B0', 'B1', 'B2', 'B3', 'B4'])
+
+    def testSeekQuery(self):
+        page = self.query.seek(encode_cursor(['Foo3', 0, None]))[:2]
+        self.assertIn('ORDER BY seek."name" IS NOT NULL, seek."name"', page.query)
+        self.assertTrue(page.query.endswith('LIMIT 2 OFFSET 0'), page.query)
+        self.assertEqual(page.query_args, ['Foo3', 'Foo3', 0, 0])
+        # NULL sorts first, so the row with a title comes after the cursor.
+        self.assertEqual(list(page), [('Foo3', 0, 'B3'), ('Foo4', 1, None)])
+
+    def testSeekToManyJoin(self):
+        # The primary key of the model is repeated for every joined row,
+        # so the whole row is the default key.
+        author = Author.objects.get(name='Foo1')
+        for title in ('x1', 'x2', 'x3'):
+            Book.objects.create(author=author, title=title, rating=1)
+        sql = 'SELECT DISTINCT a.id, b.title FROM {} a LEFT JOIN {} b ' \
+              'ON b.author_id=a.id WHERE a.name IN (%s, %s)'.format(
+                  Author._meta.db_table, Book._meta.db_table)
+        query = PaginatedRawQuerySet(Author, sql, ['Foo1', 'Foo2'])
+        self.assertEqual(query.seek().key, ('id', 'title'))
+        rows, cursor = [], None
+        while True:
+            page = query.seek(cursor)[:2]
+            rows += list(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(sorted(rows, key=str), sorted(query, key=str))
+        self.assertEqual(len(set(rows)), len(rows))
+
+    def testSeekPrimaryKey(self):
+        sql = 'SELECT a.name, a.id FROM '+Author._meta.db_table+' a'
+        query = PaginatedRawQuerySet(Author, sql)
+        page = query.seek(key=['id'], not_null=['id'])[:4]
+        self.assertIn('ORDER BY seek."id" LIMIT', page.query)
+        self.assertEqual([row[0] for row in page], ['Foo0', 'Foo1', 'Foo2', 'Foo3'])
+        page = page.seek(page.next_cursor)[:4]
+        self.assertEqual(page.key, ('id',))
+        self.assertEqual([row[0] for row in page], ['Foo4', 'Foo5', 'Foo6', 'Foo7'])
+
+    def testSeekNotNull(self):
+        page = self.query.seek(key=('name', 'title'), not_null=('name',))[:2]
+        self.assertIn('ORDER BY seek."name", seek."title" IS NOT NULL, seek."title"',
+                      page.query)
+        self.assertEqual(page[:1].key, ('name', 'title'))
+        self.assertIn('ORDER BY seek."name",', page.seek(page.next_cursor)[:2].query)
+
+    def testCursor(self):
+        self.assertEqual(decode_cursor(encode_cursor(['a', 1, None])),
+                         ('a', 1, None))
+        values = [datetime.date(2020, 1, 2),
+                  datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+                  datetime.time(3, 4),
+                  decimal.Decimal('1.50')]
+        self.assertEqual(decode_cursor(encode_cursor(values)), tuple(values))
+        self.assertRaises(ValueError, encode_cursor, [object()])
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([{'a': 1}]))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([{'date': 'x'}]))
+        self.assertRaises(ValueError, decode_cursor, 'invalid')
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([])[:-1]+'!')
+        self.assertRaises(ValueError, self.query.seek, encode_cursor(['a']))
+        self.assertRaises(ValueError, self.query.get_cursor, ('a', 1, None))
+        self.assertIsNone(self.query.seek(encode_cursor(['Foo9', 2, None])).next_cursor)
+
+    def testSeekCount(self):
+        query = self.query.seek(encode_cursor(['Foo3', 0, None]), key=('name', 'rating', 'title'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(query), 7)
+            self.assertEqual(len(query[5:]), 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]['sql']
+        self.assertNotIn('ORDER BY', sql)
+        self.assertNotIn('SELECT *', sql)
+
+    def testSeekByQueryRaw(self):
+        query, fields = Author.by_query_raw('foo')
+        page = query.seek()[:4]
+        self.assertEqual([row[0] for row in page], ['Foo0', 'Foo1', 'Foo2', 'Foo3'])
+        page = query.seek(page.next_cursor)[:4]
+        self.assertEqual([row[0] for row in page], ['Foo4', 'Foo5', 'Foo6', 'Foo7'])
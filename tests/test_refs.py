@@ -2,7 +2,8 @@
 from django.test import TestCase
 from django_find import Searchable
 from django_find.refs import get_subclasses, child_classes, parent_classes, \
-        get_field_to, get_join_for, get_object_vector_to
+        get_field_to, get_join_for, get_object_vector_to, \
+        get_object_vector_for, graph, clear_cache
 from .models import Author, DerivedAuthor, SecondAuthor, Book, Chapter
 
 class RefsTest(TestCase):
@@ -55,6 +56,58 @@ class RefsTest(TestCase):
                           (Author, Book, SecondAuthor),
                           (Author, DerivedAuthor, Book, SecondAuthor)])
 
+    def testGetObjectVectorToAvoid(self):
+        self.assertEqual(get_object_vector_to(Author, Book, Searchable,
+                                              avoid=set([DerivedAuthor])),
+                         [(Author, Book),
+                          (Author, SecondAuthor, Book)])
+
+    def testGetObjectVectorToIsMemoized(self):
+        clear_cache()
+        result = get_object_vector_to(Author, Chapter, Searchable)
+        self.assertIn((Author, Chapter, Searchable), graph.vectors_to)
+        self.assertEqual(result, get_object_vector_to(Author, Chapter, Searchable))
+
+        # Callers get their own copy of the list.
+        result.pop()
+        self.assertEqual(len(get_object_vector_to(Author, Chapter, Searchable)), 4)
+
+    def testGetObjectVectorForIsMemoized(self):
+        clear_cache()
+        vector = get_object_vector_for(Author, [Author, Chapter], Searchable)
+        self.assertEqual(vector, (Author, Book, Chapter))
+        self.assertEqual(len(graph.vectors_for), 1)
+        self.assertIs(get_object_vector_for(Author, [Author, Chapter], Searchable),
+                      vector)
+
+        clear_cache()
+        self.assertEqual(graph.vectors_for, {})
+        self.assertEqual(graph.neighbours, {})
+
+    def testShortestStrategy(self):
+        func = get_object_vector_for
+        self.assertEqual(func(Author, [Author, Chapter], Searchable,
+                              strategy='shortest'),
+                         (Author, Book, Chapter))
+        self.assertEqual(func(Chapter, [Chapter, Author, SecondAuthor], Searchable,
+                              strategy='shortest'),
+                         (Chapter, Book, Author, SecondAuthor))
+        self.assertEqual(func(Author, [Author], Searchable, strategy='shortest'),
+                         (Author,))
+        self.assertRaises(ValueError, func, Author, [Author], Searchable,
+                          strategy='foo')
+
+    def testShortestStrategyMaxDepth(self):
+        func = get_object_vector_for
+        self.assertEqual(func(Author, [Author, Chapter], Searchable,
+                              strategy='shortest', max_depth=2),
+                         (Author, Book, Chapter))
+        self.assertIsNone(func(Author, [Author, Chapter], Searchable,
+                               strategy='shortest', max_depth=1))
+
+    def testGetNeighbours(self):
+        self.assertEqual(graph.get_neighbours(Book), (Chapter, SecondAuthor, Author))
+
     def testGetJoinFor(self):
         expected = [('search_tests_author', None, None),
                     ('search_tests_book', 'author_id', 'search_tests_author.id'),
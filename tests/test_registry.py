@@ -0,0 +1,51 @@
+from django.db import models
+from django.test import TestCase
+from django.test.utils import isolate_apps
+from django_find import Searchable
+from django_find.models import searchable_models
+from django_find.registry import ModelRegistry
+from .models import Author, Book, DerivedAuthor
+from .other_app.models import Author as OtherAppAuthor
+
+class ModelRegistryTest(TestCase):
+    def testPopulated(self):
+        self.assertTrue(searchable_models.populated)
+        self.assertIs(searchable_models.get_by_label('search_tests.Book'), Book)
+        self.assertIs(searchable_models.get_by_label('other_app.Author'),
+                      OtherAppAuthor)
+        self.assertIsNone(searchable_models.get_by_label('search_tests.Foo'))
+
+    def testGetByName(self):
+        self.assertEqual(searchable_models.get_by_name('Book'), [Book])
+        self.assertEqual(searchable_models.get_by_name('DerivedAuthor'),
+                         [DerivedAuthor])
+        self.assertEqual(set(searchable_models.get_by_name('Author')),
+                         set([Author, OtherAppAuthor]))
+        self.assertEqual(searchable_models.get_by_name('Foo'), [])
+
+    def testLazyPopulate(self):
+        registry = ModelRegistry(Searchable)
+        self.assertFalse(registry.populated)
+        self.assertIs(registry.get_by_label('search_tests.Book'), Book)
+        self.assertTrue(registry.populated)
+
+    @isolate_apps('tests')
+    def testRegisterOnClassPrepared(self):
+        registry = ModelRegistry(Searchable)
+        registry.populate()
+
+        class RegistryProbe(models.Model, Searchable):
+            name = models.CharField(max_length=10)
+
+            class Meta:
+                app_label = 'search_tests'
+
+        self.assertIs(registry.get_by_label('search_tests.RegistryProbe'),
+                      RegistryProbe)
+        self.assertEqual(registry.get_by_name('RegistryProbe'), [RegistryProbe])
+
+        class NotSearchable(models.Model):
+            class Meta:
+                app_label = 'search_tests'
+
+        self.assertEqual(registry.get_by_name('NotSearchable'), [])
@@ -0,0 +1,153 @@
+import sys
+from django.test import TestCase
+from django_find.dom import Group, Or, Term
+from django_find.rawquery import PaginatedRawQuerySet
+from django_find.rewrite import rewrite, model_resolver
+from django_find.serializers.django import DjangoSerializer
+from django_find.serializers.sql import SQLSerializer
+from .models import Author, Book, DummyModel, Library, Collection, Copy
+
+class RewriteTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+
+    def rewrite(self, model, query):
+        dom = model.dom_from_query(query)
+        return rewrite(dom, model_resolver(model)).dump()
+
+    def testMergeIn(self):
+        self.assertEqual(self.rewrite(Author, 'rating=1 or rating=2 or name:x or rating=1'),
+                         """Group(root)
+  Or
+    Term: search_tests.Author.rating in ('1', '2')
+    Term: search_tests.Author.name contains 'x'""")
+
+        # Invalid integers are not merged.
+        self.assertEqual(self.rewrite(Author, 'rating=1 or rating=x'),
+                         """Group(root)
+  Or
+    Term: search_tests.Author.rating equals '1'
+    Term: search_tests.Author.rating equals 'x'""")
+
+    def testMergeBetween(self):
+        self.assertEqual(self.rewrite(Author, 'rating>=1 and name:x and rating<=3'),
+                         """Group(root)
+  And
+    Term: search_tests.Author.rating between ('1', '3')
+    Term: search_tests.Author.name contains 'x'""")
+
+        # On strings, >= means "starts with".
+        self.assertEqual(self.rewrite(Author, 'name>=a and name<=b'),
+                         """Group(root)
+  And
+    Term: search_tests.Author.name gte 'a'
+    Term: search_tests.Author.name lte 'b'""")
+
+    def testDedupe(self):
+        # Both aliases refer to the same field.
+        self.assertEqual(self.rewrite(DummyModel, 'host:a or hostname:a'),
+                         """Group(root)
+  Term: DummyModel.host contains 'a'""")
+
+    def testFactor(self):
+        self.assertEqual(self.rewrite(Author, '(name:a and rating=1) or (rating=1 and name:b)'),
+                         """Group(root)
+  And
+    Term: search_tests.Author.rating equals '1'
+    Or
+      Term: search_tests.Author.name contains 'a'
+      Term: search_tests.Author.name contains 'b'""")
+        self.assertEqual(self.rewrite(Author, 'name:a or (name:a and rating=1)'),
+                         """Group(root)
+  Term: search_tests.Author.name contains 'a'""")
+
+    def testAny(self):
+        dom = Group([Or([Term('Author.name', 'any', ''), Term('Author.name', 'equals', 'a')]),
+                     Term('Author.rating', 'equals', '1')], is_root=True)
+        self.assertEqual(rewrite(dom).dump(), """Group(root)
+  Or
+    Term: Author.name any ''
+    Term: Author.name equals 'a'
+  Term: Author.rating equals '1'""")
+
+        dom = Group([Term('Author.name', 'any', '')], is_root=True)
+        self.assertEqual(rewrite(dom).dump(), """Group(root)
+  Term: Author.name any ''""")
+
+    def testResults(self):
+        for i in range(5):
+            author = Author.objects.create(name='Foo'+str(i), rating=i)
+            Book.objects.create(author=author, title='B'+str(i), comment='', rating=i)
+        queries = (('rating=1 or rating=3', ['Foo1', 'Foo3']),
+                   ('rating>=1 rating<=2', ['Foo1', 'Foo2']),
+                   ('name=foo1 or name=FOO2', ['Foo1', 'Foo2']),
+                   ('(name:foo rating=1) or (rating=1 and name:3)', ['Foo1']))
+        for query, expected in queries:
+            result = Author.by_query(query).order_by('name')
+            self.assertEqual([a.name for a in result], expected, query)
+
+            result, fields = Author.by_query_raw(query, fullnames=['search_tests.Author.name'])
+            self.assertEqual(sorted(row[0] for row in result), expected, query)
+
+    def testEquivalence(self):
+        # The rewritten DOM matches the same rows as the original one, in
+        # both serializers.
+        for i in range(5):
+            Author.objects.create(name='Foo'+str(i), rating=i)
+        queries = ('(name:foo and rating:x) or (name:foo and rating:1)',
+                   '(name:foo1 and rating:1) or (name:foo2 and rating:1)',
+                   'name:foo1 or (name:foo1 and rating:x)',
+                   'rating:x or (rating:x and name:foo2)',
+                   '(rating:x and name:foo2) or (rating:x and rating=3)',
+                   'rating=1 or rating=x or rating=2',
+                   'rating>=1 and rating<=x',
+                   'not (rating:x or name:foo3)')
+        doms = [Author.dom_from_query(q) for q in queries]
+        doms.append(Group([Or([Term('search_tests.Author.name', 'any', ''),
+                               Term('search_tests.Author.name', 'equals', 'foo1')])],
+                          is_root=True))
+        fullnames = ['search_tests.Author.name']
+
+        for dom in doms:
+            rewritten = rewrite(dom, model_resolver(Author))
+
+            def names(dom):
+                q = dom.serialize(DjangoSerializer(Author))
+                return sorted(a.name for a in Author.objects.filter(q))
+            self.assertEqual(names(rewritten), names(dom), dom.dump())
+
+            def raw_names(dom):
+                serializer = SQLSerializer(Author, fullnames=fullnames)
+                sql, args = dom.serialize(serializer)
+                return sorted(row[0] for row in PaginatedRawQuerySet(Author, sql, args))
+            self.assertEqual(raw_names(rewritten), raw_names(dom), dom.dump())
+
+    def testMultiSelectorEquivalence(self):
+        # A term on an alias with several selectors matches if any of
+        # them does, so the bounds may be met by different fields.
+        library = Library.objects.create(status='o')
+        collection = Collection.objects.create(library=library)
+        Copy.objects.create(id=1, library=library, format='bok', shelfmark='a')
+        Copy.objects.create(id=12, collection=collection, format='bok', shelfmark='b')
+        Library.objects.create(status='c')
+
+        for query in ('cid>=5 and cid<=8', 'cid>=1 and cid<=1', 'cid>=13 and cid<=20'):
+            dom = Library.dom_from_query(query)
+            rewritten = rewrite(dom, model_resolver(Library))
+
+            def ids(dom):
+                q = dom.serialize(DjangoSerializer(Library))
+                return sorted(set(Library.objects.filter(q).values_list('id', flat=True)))
+            self.assertEqual(ids(rewritten), ids(dom), query)
+        self.assertEqual(list(Library.by_query('cid>=5 and cid<=8').distinct()), [library])
+
+    def testDeepNesting(self):
+        depth = sys.getrecursionlimit()*2
+        query = ''
+        for i in range(depth):
+            operator = 'and' if i%2 else 'or'
+            query += 'name:a{} {} ('.format(i, operator)
+        query += 'name:x' + ')'*depth
+        select, args = Author.sql_from_query(query, mode='WHERE')[:2]
+        self.assertEqual(len(args), depth+1)
+        self.assertEqual(select.count('('), select.count(')'))
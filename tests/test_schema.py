@@ -0,0 +1,75 @@
+from copy import copy
+from django.test import TestCase, override_settings
+from django_find.handlers import type_registry, LowerCaseStrFieldHandler, \
+        IntegerFieldHandler, JSONFieldHandler
+from django_find.schema import SearchSchema, get_schema, clear_cache
+from .models import Author, Book, Copy, SecondAuthor
+
+class AuthorNameFieldHandler(LowerCaseStrFieldHandler):
+    @classmethod
+    def handles(cls, model, field):
+        return model._meta.model_name == 'author' and field.name == 'name'
+
+class SearchSchemaTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        self.old_type_registry = copy(type_registry)
+
+    def tearDown(self):
+        del type_registry[:]
+        type_registry.extend(self.old_type_registry)
+
+    def testSchema(self):
+        schema = SearchSchema(Book)
+        self.assertEqual(schema.aliases,
+                         ('author', 'title', 'comment', 'rating', 'something'))
+        self.assertEqual(schema.selectors['author'], 'author__name')
+        self.assertEqual(schema.fields['author'], Author._meta.get_field('name'))
+        self.assertEqual(schema.handlers['author'], LowerCaseStrFieldHandler)
+        self.assertEqual(schema.handlers['rating'], IntegerFieldHandler)
+        self.assertEqual(schema.captions['title'], 'The title')
+        self.assertEqual(schema.json_aliases, frozenset())
+
+        schema = SearchSchema(Copy)
+        self.assertEqual(schema.json_aliases, frozenset(['metadata']))
+        self.assertEqual(schema.handlers['metadata'], JSONFieldHandler)
+
+    def testUnresolvableAliasIsSkipped(self):
+        # SecondAuthor.book points to a selector that does not exist.
+        schema = SearchSchema(SecondAuthor)
+        self.assertIn('book', schema.aliases)
+        self.assertNotIn('book', schema.fields)
+        self.assertRaises(Exception, SecondAuthor.get_field_from_alias, 'book')
+
+    def testGetSchemaIsCached(self):
+        schema = get_schema(Author)
+        self.assertIs(schema, get_schema(Author))
+        self.assertIs(schema, Author.get_schema())
+        self.assertIsNot(schema, get_schema(Book))
+
+    def testClearCache(self):
+        schema = get_schema(Author)
+        clear_cache()
+        self.assertIsNot(schema, get_schema(Author))
+
+    def testSettingChangedInvalidates(self):
+        schema = get_schema(Author)
+        with override_settings(DEBUG=True):
+            self.assertIsNot(schema, get_schema(Author))
+
+    def testRegistryChangeInvalidates(self):
+        func = Author.get_field_handler_from_alias
+        self.assertEqual(func('name'), LowerCaseStrFieldHandler)
+        type_registry.insert(0, AuthorNameFieldHandler)
+        self.assertEqual(func('name'), AuthorNameFieldHandler)
+
+    def testDefinitionChangeInvalidates(self):
+        schema = get_schema(Author)
+        old_searchable = Author.searchable
+        Author.searchable = old_searchable+[('nickname', 'name')]
+        try:
+            self.assertIsNot(schema, get_schema(Author))
+            self.assertIn('nickname', get_schema(Author).aliases)
+        finally:
+            Author.searchable = old_searchable
+        self.assertNotIn('nickname', get_schema(Author).aliases)
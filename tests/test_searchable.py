@@ -105,7 +105,8 @@ class SearchableTest(TestCase):
     def testByQueryRaw(self):
         query, fields = SimpleModel.by_query_raw('testme AND comment:foo')
         self.assertTrue('WHERE ' in query.raw_query)
-        self.assertTrue('%testme%' in query.raw_query)
+        self.assertTrue('%testme%' in query.args)
+        self.assertFalse('testme' in query.raw_query)
         self.assertFalse('SimpleModel' in query.raw_query)
         self.assertEqual(['SimpleModel.title',
                           'SimpleModel.comment',
@@ -113,7 +114,7 @@ class SearchableTest(TestCase):
 
         query, fields = Author.by_query_raw('testme AND name:foo')
         self.assertTrue('WHERE ' in query.raw_query)
-        self.assertTrue('%testme%' in query.raw_query)
+        self.assertTrue('%testme%' in query.args)
         self.assertFalse('search_tests.Author' in query.raw_query)
         self.assertFalse('Book' in query.raw_query)
         self.assertEqual(['search_tests.Author.name', 'search_tests.Author.rating',
@@ -121,7 +122,7 @@ class SearchableTest(TestCase):
 
         query, fields = Book.by_query_raw('rating:5')
         self.assertTrue('WHERE ' in query.raw_query)
-        self.assertTrue('5' in query.raw_query)
+        self.assertEqual([5], query.args)
         self.assertFalse('Author' in query.raw_query)
         self.assertFalse('Book' in query.raw_query)
         self.assertEqual(['Book.rating'], fields)
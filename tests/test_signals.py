@@ -0,0 +1,67 @@
+from django.test import TestCase
+from django_find.cache import clear_caches
+from django_find.signals import search_stage, stage
+from .models import Author, Book
+
+class SignalsTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+        self.stages = []
+        clear_caches()
+        search_stage.connect(self.receiver)
+
+    def tearDown(self):
+        search_stage.disconnect(self.receiver)
+
+    def receiver(self, sender, signal, stage, duration, error, **info):
+        self.assertGreaterEqual(duration, 0)
+        self.stages.append((sender, stage, error, info))
+
+    def testQFromQuery(self):
+        Author.q_from_query('name:foo or name:bar')
+        self.assertEqual(self.stages, [
+            (Author, 'parse', None, {'query': 'name:foo or name:bar', 'terms': 2}),
+            (Author, 'optimize', None, {'terms': 2}),
+            (Author, 'compile', None, {'target': 'q'})])
+
+    def testSQLFromQuery(self):
+        Book.sql_from_query('title:foo', fullnames=['Book.title', 'Author.name'])
+        self.assertEqual([s[1] for s in self.stages],
+                         ['parse', 'optimize', 'resolve', 'plan', 'compile'])
+        self.assertEqual(self.stages[2][3], {'columns': 2})
+        self.assertEqual(self.stages[3][3], {'joins': 1})
+        self.assertEqual(self.stages[4][3], {'target': 'sql', 'joins': 1})
+
+        # The join path is cached.
+        del self.stages[:]
+        Book.sql_from_query('title:bar', fullnames=['Book.title', 'Author.name'])
+        self.assertEqual([s[1] for s in self.stages],
+                         ['parse', 'optimize', 'resolve', 'compile'])
+
+    def testExecute(self):
+        for i in range(3):
+            Author.objects.create(name='Foo'+str(i), rating=i)
+        query, fields = Author.by_query_raw('name:foo', fullnames=['Author.name'])
+        del self.stages[:]
+
+        list(query[:2])
+        query.get_count()
+        list(query.iterator(chunk_size=2))
+        self.assertEqual(self.stages, [
+            (Author, 'execute', None, {'kind': 'fetch', 'rows': 2}),
+            (Author, 'execute', None, {'kind': 'count', 'rows': 3}),
+            (Author, 'execute', None, {'kind': 'iterator', 'rows': 3})])
+
+    def testError(self):
+        error = ValueError('foo')
+        with self.assertRaises(ValueError):
+            with stage(Author, 'parse') as info:
+                raise error
+        self.assertEqual(self.stages, [(Author, 'parse', error, {})])
+
+    def testNoReceivers(self):
+        search_stage.disconnect(self.receiver)
+        with stage(Author, 'parse') as info:
+            self.assertIsNone(info)
+        Author.q_from_query('name:foo')
+        self.assertEqual(self.stages, [])
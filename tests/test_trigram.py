@@ -0,0 +1,68 @@
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase
+from django_find.trigram import get_trigram_indexes
+from .models import Author, Book, DummyModel, SimpleModel
+
+class TrigramTest(TestCase):
+    def setUp(self):
+        self.maxDiff = None
+
+    def testIndexes(self):
+        indexes = get_trigram_indexes(DummyModel)
+        self.assertEqual([i.fields for i in indexes],
+                         [['hostname'], ['address'], ['model']])
+        self.assertEqual([i.name for i in indexes],
+                         ['search_tests_dummymodel_hof7e6',
+                          'search_tests_dummymodel_ad1e35',
+                          'search_tests_dummymodel_mo573e'])
+        for index in indexes:
+            self.assertEqual(index.opclasses, ['gin_trgm_ops'])
+            self.assertLessEqual(len(index.name), index.max_name_length)
+
+        # Aliases of the same field share the index, and fields of other
+        # models, or that are not text, are skipped.
+        self.assertEqual([i.fields for i in get_trigram_indexes(Author)],
+                         [['name']])
+        self.assertEqual([i.fields for i in get_trigram_indexes(Book)],
+                         [['title'], ['comment']])
+        self.assertEqual([i.fields for i in get_trigram_indexes(SimpleModel, ['comment', 'yesno'])],
+                         [['comment']])
+
+    def testLookups(self):
+        Author.objects.create(name='Robert', rating=1)
+        Author.objects.create(name='Robbie', rating=2)
+        Author.objects.create(name='Emily', rating=3)
+
+        def names(**kwargs):
+            return sorted(a.name for a in Author.objects.filter(**kwargs))
+
+        # Other databases use the fallback.
+        self.assertEqual(names(name__find_icontains='OB'), ['Robbie', 'Robert'])
+        self.assertEqual(names(name__find_istartswith='rob'), ['Robbie', 'Robert'])
+        self.assertEqual(names(name__find_iendswith='LY'), ['Emily'])
+        self.assertEqual(names(rating__find_icontains='2'), ['Robbie'])
+        self.assertEqual(str(Author.objects.filter(name__find_icontains='x').query),
+                         str(Author.objects.filter(name__icontains='x').query))
+
+        with patch.object(connection, 'vendor', 'postgresql'):
+            query = str(Author.objects.filter(name__find_istartswith='x%').query)
+        self.assertTrue(query.endswith('WHERE "search_tests_author"."name" ILIKE x\\%%'), query)
+
+    def testSerializers(self):
+        self.assertEqual(str(Author.q_from_query('name:^foo')),
+                         "(AND: ('name__istartswith', 'foo'))")
+        self.assertEqual(Author.sql_from_query('name:foo', mode='WHERE')[:2],
+                         ('(search_tests_author.name LIKE %s)', ['%foo%']))
+
+        with patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(str(Author.q_from_query('name:^Foo')),
+                             "(AND: ('name__find_istartswith', 'Foo'))")
+            self.assertEqual(str(Author.q_from_query('name:Foo$')),
+                             "(AND: ('name__find_iendswith', 'Foo'))")
+            self.assertEqual(str(Author.q_from_query('name=Foo')),
+                             "(AND: ('name__iexact', 'Foo'))")
+            self.assertEqual(Author.sql_from_query('name:Foo', mode='WHERE')[:2],
+                             ('(search_tests_author.name ILIKE %s)', ['%Foo%']))
+            self.assertEqual(Author.sql_from_query('name=Foo', mode='WHERE')[:2],
+                             ('(search_tests_author.name LIKE %s)', ['foo']))